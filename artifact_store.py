@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from typing import List
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+ARTIFACT_DIR    = os.path.join("data", "artifacts")
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "parquet")        # or "arrow" (Arrow IPC)
+CATEGORICAL     = ("ticker", "source", "signal")
+
+# name -> (partition columns, row order restored on read)
+ARTIFACTS = {
+    "raw_data":         (["date"], ["timestamp"]),
+    "clean_data":       (["date"], ["timestamp"]),
+    "sentiment_scored": (["date"], ["timestamp"]),
+    "signals":          (["window", "date"], ["window", "ticker", "timestamp"]),
+    "signal_hourly":    (["ticker"], ["ticker", "timestamp"]),
+    "signal_kpis":      ([], ["ticker"]),
+}
+_PARTITION_TYPES = {"date": pa.string(), "window": pa.int64(), "ticker": pa.string()}
+_FORMATS         = {"parquet": ("parquet", "parquet"), "arrow": ("ipc", "arrow")}
+
+
+def _partitioning(cols: List[str]):
+    if not cols:
+        return None
+    return ds.partitioning(pa.schema([(c, _PARTITION_TYPES[c]) for c in cols]), flavor="hive")
+
+
+def _utc(value):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+
+def _values(value) -> list:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def normalize_artifact(df: pd.DataFrame) -> pd.DataFrame:
+    """UTC `timestamp`, categorical ticker/source/signal columns (on a copy)."""
+    df = df.copy()
+    if "timestamp" in df:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True).dt.as_unit("ns")
+    for c in CATEGORICAL:
+        if c in df and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    return df
+
+
+def _finish(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Sorted categories of the rows read (stable across partitions) and the artifact's row order."""
+    for c in CATEGORICAL:
+        if c in df:
+            # partition columns come back as plain strings
+            used  = df[c].astype("category").cat.remove_unused_categories()
+            df[c] = used.cat.set_categories(sorted(used.cat.categories))
+    keys = [k for k in ARTIFACTS[name][1] if k in df]
+    if keys:
+        df = df.sort_values(keys, kind="stable")
+    return df.reset_index(drop=True)
+
+
+class ArtifactStore:
+    """
+    Pipeline artifacts (raw/clean data, scored sentiment, signals and their
+    dashboard summaries) as partitioned Parquet or Arrow IPC datasets:
+
+      <root>/<name> -> <name>@<version>               symlink to the current version
+      <root>/<name>@<version>/[window=W/]date=YYYY-MM-DD/part-0.parquet
+      <root>/signal_hourly@<version>/ticker=T/part-0.parquet
+      <root>/signal_panel@<version>/{days,scores,counts}.npy    (write_arrays)
+
+    Timestamps are stored as native UTC timestamps and ticker/source/signal
+    as dictionary columns, so loads need no parsing and come back
+    categorical. Reads take equality filters and a time range; partition
+    columns (date, window, ticker) prune whole directories and the rest is
+    pushed down into the Parquet scan. Every write goes to a new version
+    directory and is published by atomically replacing the `<name>`
+    symlink, so readers see either the old or the new version, never a
+    half-written or missing one. The version before the current one is
+    kept for readers still scanning it; older ones are deleted. Dense
+    arrays (write_arrays) are .npy files opened memory-mapped.
+
+    Artifacts that have no dataset yet are read from their CSV export.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, fmt: str = ARTIFACT_FORMAT):
+        self.root = root
+        self.fmt  = fmt
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isdir(self.path(name))
+
+    def mtime(self, name: str) -> float:
+        """Time the dataset was last written (0.0 if there is none); a cache key for readers."""
+        return os.path.getmtime(self.path(name)) if self.exists(name) else 0.0
+
+    def version(self, name: str) -> str:
+        """
+        Id of the dataset's current version ("" if there is none): the
+        directory its symlink points at, which changes on every write and
+        is unaffected by checkouts touching mtimes.
+        """
+        path = self.path(name)
+        if os.path.islink(path):
+            return os.path.basename(os.readlink(path))
+        return str(os.stat(path).st_mtime_ns) if self.exists(name) else ""   # legacy plain directory
+
+    def _dataset(self, name: str, eq: dict):
+        """
+        (dataset, pinned) to scan for the filters `eq`. Leading partition
+        columns pinned to a single value are opened as their sub-directory,
+        so e.g. a one-ticker read never lists the other tickers' partitions.
+        """
+        parts, path, pinned = ARTIFACTS[name][0], self.path(name), {}
+        for col in parts:
+            values = _values(eq[col]) if col in eq else []
+            if len(values) != 1:
+                break
+            path = os.path.join(path, f"{col}={quote(str(values[0]), safe='')}")
+            pinned[col] = values[0]
+        if not os.path.isdir(path):
+            path, pinned = self.path(name), {}
+
+        # the format comes from the files, so datasets written before a
+        # switch between parquet and arrow stay readable
+        fmt = self.fmt
+        for _, _, files in os.walk(path):
+            ext = next((f.rsplit(".", 1)[-1] for f in files if f.startswith("part-")), None)
+            if ext:
+                fmt = next(f for f, (_, e) in _FORMATS.items() if e == ext)
+                break
+        partitioning = _partitioning(parts[len(pinned):])
+        return ds.dataset(path, format=_FORMATS[fmt][0], partitioning=partitioning), pinned
+
+    # --- write ----------------------------------------------------------------
+    def write(self, name: str, df: pd.DataFrame, csv_path: str = None):
+        """Replace artifact `name` with `df`, and its CSV export at `csv_path` if given."""
+        df   = normalize_artifact(df)
+        data = df.assign(date=df["timestamp"].dt.strftime("%Y-%m-%d")) if "date" in ARTIFACTS[name][0] else df
+        fmt, ext = _FORMATS[self.fmt]
+        version = self._new_version(name)
+        ds.write_dataset(pa.Table.from_pandas(data, preserve_index=False), version, format=fmt,
+                         partitioning=_partitioning(ARTIFACTS[name][0]),
+                         basename_template=f"part-{{i}}.{ext}", max_partitions=100_000)
+        self._swap(name, version)
+
+        if csv_path:
+            df.to_csv(csv_path, index=False)
+
+    def write_arrays(self, name: str, arrays: dict, meta: dict):
+        """Replace artifact `name` with one .npy file per array plus meta.json."""
+        version = self._new_version(name)
+        os.makedirs(version)
+        for key, arr in arrays.items():
+            np.save(os.path.join(version, f"{key}.npy"), arr)
+        with open(os.path.join(version, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        self._swap(name, version)
+
+    def _new_version(self, name: str) -> str:
+        """A fresh version directory for `name`; nothing points to it until _swap."""
+        version = f"{self.path(name)}@{time.time_ns()}.{os.getpid()}.{threading.get_ident()}"
+        shutil.rmtree(version, ignore_errors=True)
+        return version
+
+    def _swap(self, name: str, version: str):
+        """Point `name` at `version` (one atomic rename) and drop all but the previous version."""
+        dest = self.path(name)
+        prev = os.readlink(dest) if os.path.islink(dest) else None
+        if os.path.isdir(dest) and prev is None:
+            # a dataset from before versioning: move it aside once so the link can take its place
+            prev = os.path.basename(self._new_version(name))
+            os.replace(dest, os.path.join(self.root, prev))
+        link = f"{dest}.{os.getpid()}.{threading.get_ident()}.link"
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.basename(version), link)
+        os.replace(link, dest)
+
+        keep = {os.path.basename(version), prev}
+        for entry in os.listdir(self.root):
+            if entry.startswith(f"{name}@") and entry not in keep:
+                shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+
+    # --- read -----------------------------------------------------------------
+    def read(self, name: str, columns: List[str] = None, start=None, end=None,
+             csv_path: str = None, **eq) -> pd.DataFrame:
+        """
+        Rows of artifact `name` with start <= timestamp < end (either bound
+        optional) and column == value for every `eq` item (a list matches any
+        of its values), e.g. read("signals", ticker="AAPL", window=3).
+        """
+        start, end = _utc(start), _utc(end)
+        if not self.exists(name):
+            if csv_path is None or not os.path.exists(csv_path):
+                raise FileNotFoundError(f"No {name} artifact in {self.root} and no CSV export")
+            return self._read_csv(name, csv_path, columns, start, end, eq)
+
+        dataset, pinned = self._dataset(name, eq)
+
+        # date partitions prune directories; the timestamp bounds then trim rows
+        by_date = "date" in ARTIFACTS[name][0] and "date" not in pinned
+        exprs   = [ds.field(c).isin(_values(v)) for c, v in eq.items() if c not in pinned]
+        if start is not None:
+            exprs += [ds.field("date") >= start.strftime("%Y-%m-%d")] if by_date else []
+            exprs += [ds.field("timestamp") >= pa.scalar(start.value, pa.timestamp("ns", "UTC"))]
+        if end is not None:
+            exprs += [ds.field("date") <= end.strftime("%Y-%m-%d")] if by_date else []
+            exprs += [ds.field("timestamp") < pa.scalar(end.value, pa.timestamp("ns", "UTC"))]
+        expr = None
+        for e in exprs:
+            expr = e if expr is None else expr & e
+
+        wanted = None
+        if columns is not None:
+            wanted = list(dict.fromkeys(list(columns) + [k for k in ARTIFACTS[name][1]
+                                                         if k in dataset.schema.names or k in pinned]))
+        table = dataset.to_table(columns=[c for c in wanted if c not in pinned] if wanted else None,
+                                 filter=expr)
+        for col, value in pinned.items():
+            if wanted is None or col in wanted:
+                table = table.append_column(col, pa.array([value] * table.num_rows, _PARTITION_TYPES[col]))
+        if columns is None and by_date and "date" in table.column_names:
+            table = table.drop_columns(["date"])
+        df = _finish(table.to_pandas(), name)
+        return df[list(columns)] if columns is not None else df
+
+    def read_meta(self, name: str) -> dict:
+        """meta.json of an artifact written by write_arrays ({} if there is none)."""
+        try:
+            with open(os.path.join(self.path(name), "meta.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def read_arrays(self, name: str):
+        """(arrays opened memory-mapped, meta) of an artifact written by write_arrays."""
+        path = self.path(name)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {fn[:-4]: np.load(os.path.join(path, fn), mmap_mode="r")
+                  for fn in os.listdir(path) if fn.endswith(".npy")}
+        return arrays, meta
+
+    def _read_csv(self, name, path, columns, start, end, eq) -> pd.DataFrame:
+        df   = normalize_artifact(pd.read_csv(path))
+        keep = pd.Series(True, index=df.index)
+        for col, value in eq.items():
+            keep &= df[col].isin(_values(value))
+        if start is not None:
+            keep &= df["timestamp"] >= start
+        if end is not None:
+            keep &= df["timestamp"] < end
+        df = _finish(df[keep], name)
+        return df[list(columns)] if columns is not None else df
+
+
+def default_store() -> ArtifactStore:
+    return ArtifactStore()
+
+
+def save_artifact(name: str, df: pd.DataFrame, csv_path: str = None):
+    """Write artifact `name` to the default store (and its CSV export)."""
+    default_store().write(name, df, csv_path)
+
+
+def read_artifact(name: str, columns: List[str] = None, start=None, end=None,
+                  csv_path: str = None, **eq) -> pd.DataFrame:
+    """ArtifactStore.read on the default store."""
+    return default_store().read(name, columns, start, end, csv_path, **eq)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the datasets (and dashboard summaries) from the CSVs in data/.")
+    parser.add_argument("--format", choices=sorted(_FORMATS), default=ARTIFACT_FORMAT)
+    args = parser.parse_args()
+
+    store = ArtifactStore(fmt=args.format)
+    for name in ("raw_data", "clean_data", "sentiment_scored"):
+        path = os.path.join("data", f"{name}.csv")
+        if os.path.exists(path):
+            store.write(name, pd.read_csv(path))
+            print(f"{path} -> {store.path(name)}")
+    windows = [pd.read_csv(p) for p in (os.path.join("data", f"signals_{w}d.csv") for w in (1, 3, 5))
+               if os.path.exists(p)]
+    if windows:
+        from signal_summary import write_summaries
+
+        signals = pd.concat(windows, ignore_index=True)
+        store.write("signals", signals)
+        write_summaries(store, signals)
+        print(f"data/signals_*d.csv -> {store.path('signals')} (and the dashboard summaries)")
@@ -2,8 +2,9 @@ import numpy as np
 import pandas as pd
 import backtrader as bt
 from datetime import timedelta
-from functools import lru_cache
-import yfinance as yf
+
+from price_store import default_store
+from vector_backtest import PricePanel, run_native_backtest
 
 # ─── Configuration ─────────────────────────────────────────────────────────────
 START_CASH     = 100_000
@@ -13,15 +14,15 @@ TIME_EXIT_DAYS = 5
 # global price cache
 price_cache = {}
 
-@lru_cache(maxsize=None)
+# last aligned panel, reused while the same price frames are passed in
+_panel_memo = {'key': None, 'frames': None, 'panel': None}
+
 def fetch_price_data(ticker: str, start: str, end: str) -> pd.DataFrame:
     """
-    Download OHLCV history for `ticker` between `start` and `end`.
+    OHLCV history for `ticker` between `start` and `end`, served from the
+    local price store (only missing edges are downloaded).
     """
-    hist = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=False)
-    df = hist[['Open','High','Low','Close','Volume']].rename(columns=str.lower)
-    df.dropna(inplace=True)
-    return df
+    return default_store().get(ticker, start, end)
 
 class SignalStrategy(bt.Strategy):
     params = (
@@ -129,14 +130,32 @@ class SignalStrategy(bt.Strategy):
     def stop(self):
         pass  # no CLI output
 
+def price_panel(pc: dict) -> PricePanel:
+    """
+    Date x ticker panel for a price cache, rebuilt only when the cached
+    frames change (the memo holds the frames, so their ids stay valid).
+    """
+    key = tuple((t, id(h)) for t, h in pc.items())
+    if _panel_memo['key'] != key:
+        _panel_memo.update(key=key, frames=list(pc.values()),
+                           panel=PricePanel.from_price_cache(pc))
+    return _panel_memo['panel']
+
 def run_backtest(
     signals_df: pd.DataFrame,
     stop_loss: float = 0.02,
     take_profit: float = 0.04,
     external_price_cache: dict = None,
+    engine: str = 'backtrader',
+    panel: PricePanel = None,
 ) -> tuple:
     """
-    Run a Cerebro backtest and return (cerebro, strat, start_date, end_date).
+    Run a backtest and return (cerebro, strat, start_date, end_date).
+
+    engine='native' runs the same strategy on NumPy arrays (vector_backtest)
+    and returns a result object in place of both cerebro and strat, which
+    summarize_performance reads the same way. A prebuilt `panel` (e.g. one
+    backed by shared memory-mapped arrays) replaces the price cache there.
     """
     pc = external_price_cache or price_cache
     df = signals_df.copy()
@@ -144,9 +163,18 @@ def run_backtest(
     start = df['timestamp'].min().date()
     end   = df['timestamp'].max().date() + timedelta(days=1)
 
-    if pc is price_cache and not pc:
-        for t in df['ticker'].unique():
-            pc[t] = fetch_price_data(t, start.isoformat(), end.isoformat())
+    if pc is price_cache and not pc and panel is None:
+        pc.update(default_store().get_many(df['ticker'].unique(), start.isoformat(), end.isoformat()))
+
+    if engine == 'native':
+        panel = panel if panel is not None else price_panel(pc)
+        res   = run_native_backtest(
+            signals_df, panel, stop_loss, take_profit,
+            start_cash=START_CASH, commission=COMMISSION, time_exit_days=TIME_EXIT_DAYS,
+        )
+        return res, (res if panel.tickers else None), start, end
+    if engine != 'backtrader':
+        raise ValueError(f"Unknown backtest engine: {engine!r}")
 
     cerebro = bt.Cerebro()
     cerebro.broker.setcash(START_CASH)
@@ -1,136 +1,218 @@
-import os
 import pandas as pd
 import streamlit as st
 import altair as alt
 from datetime import datetime, timezone
 
+from artifact_store import ArtifactStore
+from signal_summary import SignalPanel, refresh_summaries, signals_mtime
+
+SIGNAL_CSVS = [f"data/signals_{w}d.csv" for w in (1, 3, 5)]   # read if there is no signals dataset
+artifacts   = ArtifactStore()
+
 # ─── Helper ───────────────────────────────────────────────────────────────────
+# Everything shown is precomputed by signals.save_all_signals; each loader is
+# keyed on the version of the dataset it reads, so a refresh invalidates it.
 
 @st.cache_data
-def load_signals_data() -> pd.DataFrame:
-    """
-    Load the combined signals.csv with columns:
-      timestamp, ticker, agg_score, signal, (optional window)
-    """
-    path = "data/signals.csv"
-    df = pd.read_csv(path, parse_dates=["timestamp"])
-    if "signal" not in df.columns:
-        df["signal"] = "Neutral"
-    return df
+def load_kpis(version: str) -> pd.DataFrame:
+    """Per-ticker KPIs (avg_score, signal_count, first_ts, last_ts), indexed by ticker."""
+    return artifacts.read("signal_kpis").set_index("ticker")
+
+
+@st.cache_data(max_entries=64)
+def load_hourly(ticker: str, version: str) -> pd.DataFrame:
+    """One ticker's hourly avg_score / signal_count; only its partition is read."""
+    return artifacts.read("signal_hourly", columns=["timestamp", "avg_score", "signal_count"],
+                          ticker=ticker)
+
+
+@st.cache_resource(max_entries=2)
+def load_panel(version: str) -> SignalPanel:
+    """The memory-mapped date x ticker panel behind the overview (shared across sessions)."""
+    return SignalPanel(artifacts)
 
 # ─── Rendering functions ──────────────────────────────────────────────────────
 
-def render_kpis(df: pd.DataFrame, ticker: str):
+def render_kpis(kpis: pd.Series, ticker: str):
     """
     Display average sentiment & total trade signals for a ticker.
     """
-    d   = df[df["ticker"] == ticker]
-    avg = d["agg_score"].mean() if not d.empty else float("nan")
-    cnt = int((d["signal"] != "Neutral").sum())
     t, c1, c2 = st.columns(3)
     t.metric("Stock", f"{ticker}")
-    c1.metric("Avg. Sentiment", f"{avg:.3f}")
-    c2.metric("Total Signals",   f"{cnt}")
+    c1.metric("Avg. Sentiment", f"{kpis['avg_score']:.3f}")
+    c2.metric("Total Signals",   f"{int(kpis['signal_count'])}")
 
-# ─── Main ─────────────────────────────────────────────────────────────────────
 
-st.set_page_config(
-    page_title="Alt Data Alpha Engine",
-    page_icon="🤖",
-    layout="wide",
-    initial_sidebar_state="auto"
-)
+def render_ticker_view(kpis: pd.DataFrame):
+    """
+    One ticker: KPI cards and hourly sentiment / signal charts over a date range.
+    """
+    tickers = kpis.index.tolist()
+    ticker  = st.sidebar.selectbox("Select Ticker", tickers)
+
+    # Date range based on that ticker alone
+    min_date  = kpis.at[ticker, "first_ts"].date()
+    max_date  = kpis.at[ticker, "last_ts"].date()
+    if min_date == max_date:
+        # Only one date available
+        start_date = end_date = min_date
+        st.sidebar.write(f"Date: {min_date}")
+    else:
+        start_date, end_date = st.sidebar.slider(
+            "Date range",
+            min_value=min_date,
+            max_value=max_date,
+            value=(min_date, max_date),
+            format="YYYY-MM-DD"
+        )
 
-st.sidebar.title("⚙️ Signal Explorer")
-st.title("📊 Alt Data Alpha Engine (NASDAQ-100)")
+    # Apply date filter: hourly rows are sorted, so the range is two binary searches
+    df_hourly = load_hourly(ticker, artifacts.version("signal_hourly"))
+    hours     = df_hourly["timestamp"]
+    df_hourly = df_hourly.iloc[hours.searchsorted(pd.Timestamp(start_date, tz="UTC")):
+                               hours.searchsorted(pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1))]
+
+    # KPI cards
+    render_kpis(kpis.loc[ticker], ticker)
+    st.markdown("---")
+
+    if not df_hourly.empty:
+        # ─── Average Sentiment Line ────────────────────────────
+        line = (
+            alt.Chart(df_hourly)
+            .mark_line(point=True)
+            .encode(
+                x=alt.X("timestamp:T", title="Hour / Date"),
+                y=alt.Y("avg_score:Q", title="Avg. Sentiment"),
+                tooltip=[
+                    alt.Tooltip("timestamp:T", title="Timestamp"),
+                    alt.Tooltip("avg_score:Q", title="Avg Sentiment", format=".3f"),
+                    alt.Tooltip("signal_count:Q", title="Signal Count")
+                ]
+            )
+            .properties(height=200, title="Hourly Avg. Sentiment")
+        )
 
-# Load & filter
-df_all = load_signals_data()
+        # ─── Signal Count Bar ──────────────────────────────────
+        bar = (
+            alt.Chart(df_hourly)
+            .mark_bar(opacity=0.3)
+            .encode(
+                x=alt.X("timestamp:T", title="Hour / Date"),
+                y=alt.Y("signal_count:Q", title="Signal Count"),
+            )
+            .properties(height=100, title="Signals per Hour")
+        )
 
-tickers = sorted(df_all["ticker"].unique())
-ticker  = st.sidebar.selectbox("Select Ticker", tickers)
+        # ─── Combine & Render ──────────────────────────────────
+        chart = alt.vconcat(line, bar).configure_axis(grid=False)
+        st.altair_chart(chart, use_container_width=True)
 
-# Date range based on that ticker alone
-df_ticker = df_all[df_all["ticker"] == ticker]
-min_date  = df_ticker["timestamp"].dt.date.min()
-max_date  = df_ticker["timestamp"].dt.date.max()
-if min_date == max_date:
-    # Only one date available
-    start_date = end_date = min_date
-    st.sidebar.write(f"Date: {min_date}")
-else:
-    start_date, end_date = st.sidebar.slider(
-        "Date range",
-        min_value=min_date,
-        max_value=max_date,
-        value=(min_date, max_date),
-        format="YYYY-MM-DD"
-    )
+    else:
+        st.write("No sentiment data in this range.")
 
-# Apply date filter
-filtered = df_ticker[
-    (df_ticker["timestamp"].dt.date >= start_date) &
-    (df_ticker["timestamp"].dt.date <= end_date)
-]
 
-# KPI cards
-render_kpis(df_all, ticker)
-st.markdown("---")
+def render_overview(panel: SignalPanel):
+    """
+    The whole universe for one window: sentiment heatmap, top movers by
+    agg_score change and signal counts per window, over a date range.
+    """
+    window = st.sidebar.selectbox("Window (days)", panel.windows)
+    min_date, max_date = panel.days[0].item(), panel.days[-1].item()
+    if min_date == max_date:
+        start_date = end_date = min_date
+        st.sidebar.write(f"Date: {min_date}")
+    else:
+        start_date, end_date = st.sidebar.slider(
+            "Date range",
+            min_value=min_date,
+            max_value=max_date,
+            value=(min_date, max_date),
+            format="YYYY-MM-DD"
+        )
+    rows = panel.day_range(start_date, end_date)
 
-if not filtered.empty:
-    # ─── Hourly aggregation ────────────────────────────────
-    df_hourly = (
-        filtered
-        .set_index("timestamp")
-        .resample("1h")
-        .agg(
-            avg_score    = ("agg_score", "mean"),
-            signal_count = ("signal", lambda s: (s != "Neutral").sum())
+    # ─── Sentiment heatmap ─────────────────────────────────
+    heat = panel.heatmap(window, rows)
+    st.altair_chart(
+        alt.Chart(heat)
+        .mark_rect()
+        .encode(
+            x=alt.X("date:T", title="Date"),
+            y=alt.Y("ticker:N", title=None, sort="ascending"),
+            color=alt.Color("score:Q", title="Sentiment",
+                            scale=alt.Scale(scheme="redblue", domainMid=0)),
+            tooltip=[
+                alt.Tooltip("ticker:N", title="Ticker"),
+                alt.Tooltip("date:T", title="From"),
+                alt.Tooltip("score:Q", title="Avg Sentiment", format=".3f")
+            ]
         )
-        .dropna(subset=["avg_score"])
-        .reset_index()
+        .properties(height=max(200, 12 * heat["ticker"].nunique()),
+                    title=f"{window}-day sentiment across the universe"),
+        use_container_width=True
     )
 
-    # ─── Average Sentiment Line ────────────────────────────
-    line = (
-        alt.Chart(df_hourly)
-        .mark_line(point=True)
+    left, right = st.columns(2)
+
+    # ─── Top movers ────────────────────────────────────────
+    movers = panel.movers(window, rows)
+    left.altair_chart(
+        alt.Chart(movers)
+        .mark_bar()
         .encode(
-            x=alt.X("timestamp:T", title="Hour / Date"),
-            y=alt.Y("avg_score:Q", title="Avg. Sentiment"),
+            x=alt.X("change:Q", title="Change in agg_score"),
+            y=alt.Y("ticker:N", title=None, sort="-x"),
+            color=alt.condition(alt.datum.change > 0, alt.value("#2b8cbe"), alt.value("#e34a33")),
             tooltip=[
-                alt.Tooltip("timestamp:T", title="Timestamp"),
-                alt.Tooltip("avg_score:Q", title="Avg Sentiment", format=".3f"),
-                alt.Tooltip("signal_count:Q", title="Signal Count")
+                alt.Tooltip("ticker:N", title="Ticker"),
+                alt.Tooltip("start:Q", title="First", format=".3f"),
+                alt.Tooltip("end:Q", title="Last", format=".3f"),
+                alt.Tooltip("change:Q", title="Change", format=".3f")
             ]
         )
-        .properties(height=200, title="Hourly Avg. Sentiment")
+        .properties(height=300, title="Top movers"),
+        use_container_width=True
     )
 
-    # ─── Signal Count Bar ──────────────────────────────────
-    bar = (
-        alt.Chart(df_hourly)
-        .mark_bar(opacity=0.3)
+    # ─── Signal counts by window ───────────────────────────
+    right.altair_chart(
+        alt.Chart(panel.signal_counts(rows))
+        .mark_line()
         .encode(
-            x=alt.X("timestamp:T", title="Hour / Date"),
-            y=alt.Y("signal_count:Q", title="Signal Count"),
+            x=alt.X("date:T", title="Date"),
+            y=alt.Y("signals:Q", title="Long/Short signals"),
+            color=alt.Color("window:N", title="Window")
         )
-        .properties(height=100, title="Signals per Hour")
+        .properties(height=300, title="Signals by window"),
+        use_container_width=True
     )
 
-    # ─── Combine & Render ──────────────────────────────────
-    chart = alt.vconcat(line, bar).configure_axis(grid=False)
-    st.altair_chart(chart, use_container_width=True)
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+st.set_page_config(
+    page_title="Alt Data Alpha Engine",
+    page_icon="🤖",
+    layout="wide",
+    initial_sidebar_state="auto"
+)
+
+st.sidebar.title("⚙️ Signal Explorer")
+st.title("📊 Alt Data Alpha Engine (NASDAQ-100)")
 
+# Load (a no-op once the deploy step has built the summaries; data/artifacts/ is untracked)
+refresh_summaries(artifacts, SIGNAL_CSVS)
+view = st.sidebar.radio("View", ["Ticker", "Overview"], horizontal=True)
+if view == "Overview":
+    render_overview(load_panel(artifacts.version("signal_panel")))
 else:
-    st.write("No sentiment data in this range.")
+    render_ticker_view(load_kpis(artifacts.version("signal_kpis")))
 
 st.markdown("---")
 
 # ─── Footer ───────────────────────────────────────────────────────────────────
 
-signals_path = "data/signals.csv"
-mtime = os.path.getatime(signals_path)
+mtime = signals_mtime(artifacts, SIGNAL_CSVS)
 last_updated_dt = datetime.fromtimestamp(mtime, tz=timezone.utc)
 last_updated_str = last_updated_dt.strftime("%B %d, %Y")
 
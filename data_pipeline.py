@@ -1,15 +1,32 @@
 import os
 import re
+import glob
+import gzip
+import json
+import time
+import codecs
+import hashlib
+import argparse
 import requests
+import numpy as np
 import pandas as pd
 import praw
 import yfinance as yf
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
+from urllib.parse import urlsplit, urlunsplit
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
 from sec_cik_mapper import StockMapper
 
+from http_utils import http_get, throttle, stats
+from edgar_cache import FilingCache, conditional_get_json
+from record_store import RecordStore, source_family
+from artifact_store import save_artifact
+
 # ─── Config ────────────────────────────────────────────────────────────────────
 load_dotenv()
 DATA_DIR = "data"
@@ -24,8 +41,24 @@ SEC_USER_AGENT       = os.getenv("SEC_USER_AGENT")
 MAX_NEWS_PER_TICKER = 20
 MAX_REDDIT_WORDS = 75
 MAX_SEC_WORDS    = 75
+SEC_CHUNK_BYTES  = 64 * 1024  # streaming read size for 8-K submissions
 CUTOFF_DAYS      = 7  # keep last 7 days only
 
+# multi-subreddit Reddit ingestion
+REDDIT_SUBREDDITS  = ['stocks']
+REDDIT_LISTINGS    = ('hot',)
+REDDIT_PAGE_LIMIT  = None      # posts per listing; None = as many as Reddit pages out (~1000)
+REDDIT_TOP_WINDOW  = "week"    # time_filter for the 'top' listing
+REDDIT_CHUNK_ROWS  = 5_000     # records per yielded DataFrame
+REDDIT_STATE_PATH  = os.path.join(DATA_DIR, "state", "reddit_watermarks.json")
+
+# concurrent fetch mode
+FETCH_WORKERS  = 16  # per-ticker Yahoo / SEC submissions
+FILING_WORKERS = 8   # 8-K filing downloads
+
+# accession-keyed filing cache (filings never change once published)
+filing_cache = FilingCache()
+
 # ticker -> CIK mapper
 mapper       = StockMapper()
 all_mappings = mapper.ticker_to_cik
@@ -59,13 +92,185 @@ def extract_html_document(document_text):
     return None
 
 
-def extract_key_items_full_text(document_text):
-    """Extracts truncated text for key Item X.XX sections."""
+_DOC_RE      = re.compile(r'<DOCUMENT>', re.IGNORECASE)
+_TYPE_RE     = re.compile(r'<TYPE>\s*8-K', re.IGNORECASE)
+_FILENAME_RE = re.compile(r'<FILENAME>.*\.htm', re.IGNORECASE)
+_TEXT_RE     = re.compile(r'<TEXT>(.*?)</TEXT>', re.DOTALL | re.IGNORECASE)
+_TEXT_OPEN   = re.compile(r'<TEXT>', re.IGNORECASE)
+_TEXT_CLOSE  = re.compile(r'</TEXT>', re.IGNORECASE)
+
+
+def _match_block(block):
+    """`extract_html_document`'s test for a single, complete <DOCUMENT> block."""
+    if _TYPE_RE.search(block) and _FILENAME_RE.search(block):
+        m = _TEXT_RE.search(block)
+        if m:
+            return m.group(1)
+    return None
+
+
+def stream_html_document(chunks):
+    """
+    Incremental `extract_html_document` over an iterable of text chunks.
+
+    Only the current <DOCUMENT> block is buffered and every marker search
+    resumes where the previous chunk left off. If <TYPE> 8-K and an .htm
+    <FILENAME> appear ahead of <TEXT>, the block is returned as soon as its
+    </TEXT> arrives; any other block is judged once the next <DOCUMENT> starts.
+    Stops consuming `chunks` on a match so the caller can drop the rest.
+    """
+    buf, seen_any = "", False
+    doc_scan = text_scan = 0
+    text_start = head_ok = None
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        seen_any = True
+        buf     += chunk
+
+        # complete blocks: everything before the latest <DOCUMENT> marker
+        while True:
+            m = _DOC_RE.search(buf, max(0, doc_scan - len("<DOCUMENT>") + 1))
+            if not m:
+                break
+            html = _match_block(buf[:m.start()])
+            if html is not None:
+                return html
+            buf      = buf[m.end():]
+            doc_scan = text_scan = 0
+            text_start = head_ok = None
+        doc_scan = len(buf)
+
+        # early exit inside the current block
+        if text_start is None:
+            m = _TEXT_OPEN.search(buf, max(0, text_scan - len("<TEXT>") + 1))
+            if m:
+                head       = buf[:m.start()]
+                head_ok    = bool(_TYPE_RE.search(head) and _FILENAME_RE.search(head))
+                text_start = text_scan = m.end()
+            else:
+                text_scan = len(buf)
+        if head_ok:
+            m = _TEXT_CLOSE.search(buf, max(text_start, text_scan - len("</TEXT>") + 1))
+            if m:
+                return buf[text_start:m.start()]
+            text_scan = len(buf)
+
+    if not seen_any:
+        return ""
+    return _match_block(buf)
+
+
+def iter_response_text(r, chunk_size: int = SEC_CHUNK_BYTES):
+    """Decode a streamed `requests` response into text chunks."""
+    decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    for raw in r.iter_content(chunk_size=chunk_size):
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+
+# ─── Fast HTML → text ──────────────────────────────────────────────────────────
+# One regex pass over the markup that reproduces BeautifulSoup("html.parser")
+# .get_text(separator=' ') for the well-formed subset EDGAR filers emit: tags,
+# comments and declarations become separators, <style>/<script> bodies are
+# dropped and character references are decoded. Anything outside that subset
+# (bare '&name', stray '</', CDATA, <template>, ...) makes `fast_html_text`
+# return None and the caller falls back to BeautifulSoup.
+_SIG_RE = re.compile(r'(SIGNATURE|Pursuant to the requirements of the Securities Exchange Act)', re.IGNORECASE)
+
+_TAG_NAME = r'[a-zA-Z][-.a-zA-Z0-9:_]*'
+_ATTRS    = r'''(?:\s+[^\s<>"'=/]+(?:\s*=\s*(?:"[^"<>]*"|'[^'<>]*'|[^\s<>"'=`]+))?)*\s*/?>'''
+_HTML_TOKEN_RE = re.compile(
+    r'(?P<text>[^<&]+)'
+    r'|(?P<skip><(?P<skipname>(?i:style|script))(?=[\s/>])' + _ATTRS + r'[^<]*</(?P=skipname)\s*>)'
+    r'|(?P<rcdata><(?P<rcname>(?i:title|textarea))(?=[\s/>])' + _ATTRS + r'(?P<rctext>[^<&]*)</(?P=rcname)\s*>)'
+    r'|(?P<tag><(?P<name>' + _TAG_NAME + r')' + _ATTRS + r'|</(?P<endname>' + _TAG_NAME + r')\s*>)'
+    r'|(?P<comment><!--(?![->])(?:[^-]|-(?!-))*-->)'
+    r'|(?P<decl><!(?i:doctype)[^<>"\']*>|<\?[^<>]*>)'
+    r'|&(?P<entity>[a-zA-Z][a-zA-Z0-9]*);'
+    r'|&\#(?P<dec>[0-9]{1,7});'
+    r'|&\#[xX](?P<hex>[0-9a-fA-F]{1,6});'
+    r'|(?P<lit>&(?![a-zA-Z#])|<(?![a-zA-Z/!?]))'
+)
+# tags that html.parser or bs4 treat specially outside the patterns above
+_SPECIAL_TAGS    = {'style', 'script', 'title', 'textarea', 'template', 'rt', 'rp',
+                    'plaintext', 'xmp', 'iframe', 'noembed', 'noframes', 'noscript'}
+# end tags of void elements (e.g. a stray '</br>'): html.parser versions disagree on them
+_VOID_TAGS       = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                    'param', 'source', 'track', 'wbr'}
+_SIG_CHECK_CHARS = 16 * 1024
+
+
+def _safe_charref(n: int):
+    """chr(n) for code points every html.parser/bs4 version decodes that way, else None."""
+    if n in (9, 10, 13) or 0x20 <= n <= 0x7E or 0xA0 <= n <= 0xD7FF or 0xE000 <= n <= 0xFFFD:
+        return chr(n)
+    return None
+
+
+def fast_html_text(document_text: str):
+    """
+    Text of `document_text` as BeautifulSoup(..., "html.parser").get_text(' ')
+    yields it, or None if the markup needs the real parser. Scanning stops
+    once the signature block has been seen, so only that prefix is returned.
+    """
+    entities = EntitySubstitution.HTML_ENTITY_TO_CHARACTER
+    parts, checked, pending, tail, pos = [], 0, 0, "", 0
+
+    for m in _HTML_TOKEN_RE.finditer(document_text):
+        if m.start() != pos:
+            return None
+        pos  = m.end()
+        kind = m.lastgroup
+        if kind == "text":
+            piece = m.group("text")
+        elif kind == "tag":
+            name, end = m.group("name"), m.group("endname")
+            if name and name.lower() in _SPECIAL_TAGS or end and end.lower() in _VOID_TAGS:
+                return None
+            piece = " "
+        elif kind == "rcdata":
+            piece = f" {m.group('rctext')} "
+        elif kind in ("skip", "comment", "decl"):
+            piece = " "
+        elif kind == "entity":
+            piece = entities.get(m.group("entity"))
+            if piece is None:
+                return None
+        elif kind in ("dec", "hex"):
+            piece = _safe_charref(int(m.group(kind), 10 if kind == "dec" else 16))
+            if piece is None:
+                return None
+        else:
+            piece = m.group("lit")
+        parts.append(piece)
+
+        # look for the signature in the newly collapsed text (plus a short overlap)
+        pending += len(piece)
+        if pending >= _SIG_CHECK_CHARS:
+            seg = re.sub(r'\s+', ' ', tail + "".join(parts[checked:]))
+            if _SIG_RE.search(seg):
+                return "".join(parts)
+            checked, pending, tail = len(parts), 0, seg[-100:]
+
+    if pos != len(document_text):
+        return None
+    return "".join(parts)
+
+
+def extract_key_items_full_text(document_text, fast: bool = True):
+    """
+    Extracts truncated text for key Item X.XX sections. `fast=False` always
+    takes the BeautifulSoup path (the reference for the fast tokenizer).
+    """
     important = {'1.01','2.02','4.02','5.02','5.07','8.01'}
-    soup        = BeautifulSoup(document_text, "html.parser")
-    txt         = re.sub(r'\s+',' ', soup.get_text(separator=' '))
+    raw         = fast_html_text(document_text) if fast else None
+    if raw is None:
+        raw = BeautifulSoup(document_text, "html.parser").get_text(separator=' ')
+    txt         = re.sub(r'\s+',' ', raw)
     # drop after signature
-    sig_match   = re.search(r'(SIGNATURE|Pursuant to the requirements of the Securities Exchange Act)', txt, re.IGNORECASE)
+    sig_match   = _SIG_RE.search(txt)
     if sig_match:
         txt = txt[:sig_match.start()].strip()
     pattern     = re.compile(r'(Item[\s\xa0]*([1-9]\.\d{2}))', re.IGNORECASE)
@@ -81,11 +286,78 @@ def extract_key_items_full_text(document_text):
         parts.append(f"({m.group(1)}) " + " ".join(section))
     return "\n\n".join(parts)
 
+
+# ─── 8-K extraction benchmark ─────────────────────────────────────────────────
+
+_BENCH_ITEMS = ['1.01', '2.02', '2.03', '4.02', '5.02', '5.07', '7.01', '8.01', '9.01']
+_BENCH_WORDS = ("the company entered into agreement revenue quarter results board director officer "
+                "shareholders vote approved financial statements restatement &amp; &#8217; &nbsp; "
+                "<b>material</b>").split() + ['<span style="font-weight:bold">definitive</span>']
+
+
+def _synthetic_8k(rng, paragraphs: int) -> str:
+    """An inline-XBRL-style 8-K: styled blocks, tables, entities, items and a signature block."""
+    body = []
+    for item in rng.choice(_BENCH_ITEMS, size=rng.integers(2, 6), replace=False):
+        body.append(f'<p style="margin:0pt"><b>Item&#160;{item}</b>&nbsp;Section heading</p>')
+        for _ in range(paragraphs):
+            # word runs in styled spans, as filing tools emit them
+            words = rng.choice(_BENCH_WORDS, size=rng.integers(20, 80))
+            spans = "".join(f'<span style="color:#000000;font-family:\'Times New Roman\';font-size:10pt">'
+                            f'{" ".join(words[i:i + 4])} </span>' for i in range(0, len(words), 4))
+            body.append(f'<div style="margin-top:6pt;text-align:justify">{spans}</div>')
+        body.append('<table><tr><td><ix:nonFraction name="us-gaap:Revenues" contextRef="c1">'
+                    f'{rng.integers(1, 10**6):,}</ix:nonFraction></td><td>USD</td></tr></table>')
+    body.append('<p>SIGNATURE</p><p>Pursuant to the requirements of the Securities Exchange Act of 1934</p>')
+    body.extend('<div style="page-break-after:always"><p>Exhibit 99.1 press release text</p></div>'
+                for _ in range(paragraphs * 4))
+    return ('<?xml version="1.0" encoding="utf-8"?><html><head><title>8-K</title>'
+            '<style type="text/css">p { margin: 0 }</style></head><body><!-- Document -->'
+            + "".join(body) + '</body></html>')
+
+
+def benchmark_key_items(root: str = None, synthetic: int = 50, seed: int = 0) -> dict:
+    """
+    Key-item extraction on the fast tokenizer vs the BeautifulSoup path over
+    the primary documents in the filing cache plus `synthetic` generated
+    8-Ks: seconds per MB of HTML for each, the speedup, and the documents
+    whose extracted items differ (must be 0) or that fell back to bs4.
+    """
+    docs = []
+    for path in sorted(glob.glob(os.path.join(root or filing_cache.root, "filings", "*", "*.txt.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            text = f.read()
+        if text:
+            docs.append(text)
+    rng   = np.random.default_rng(seed)
+    docs += [_synthetic_8k(rng, int(rng.integers(5, 60))) for _ in range(synthetic)]
+    mb    = sum(len(d.encode("utf-8")) for d in docs) / 2 ** 20
+    if docs:    # warm up (regex and entity tables) outside the timed runs
+        extract_key_items_full_text(docs[0])
+        extract_key_items_full_text(docs[0], fast=False)
+
+    t0   = time.perf_counter()
+    fast = [extract_key_items_full_text(d) for d in docs]
+    t1   = time.perf_counter()
+    ref  = [extract_key_items_full_text(d, fast=False) for d in docs]
+    t2   = time.perf_counter()
+    return {
+        "documents":   len(docs),
+        "mb":          round(mb, 2),
+        "fast_s_mb":   round((t1 - t0) / mb, 4) if mb else None,
+        "bs4_s_mb":    round((t2 - t1) / mb, 4) if mb else None,
+        "speedup":     round((t2 - t1) / (t1 - t0), 1) if t1 > t0 else None,
+        "mismatches":  sum(a != b for a, b in zip(fast, ref)),
+        "fallbacks":   sum(fast_html_text(d) is None for d in docs),
+    }
+
 # ─── Data‐fetching functions ──────────────────────────────────────────────────
 
 def fetch_yahoo_news(ticker: str) -> pd.DataFrame:
+    throttle("finance.yahoo.com")
     try:
-        raw = yf.Ticker(ticker).get_news(count=MAX_NEWS_PER_TICKER, tab="all") or []
+        with stats.timed("yahoo"):
+            raw = yf.Ticker(ticker).get_news(count=MAX_NEWS_PER_TICKER, tab="all") or []
     except Exception as e:
         print(f"yfinance news failed {ticker}: {e}")
         return pd.DataFrame()
@@ -104,55 +376,212 @@ def fetch_yahoo_news(ticker: str) -> pd.DataFrame:
     return pd.DataFrame(recs)
 
 
-def fetch_reddit_posts_for_tickers(subreddit: str, tickers: list, limit: int = 100) -> pd.DataFrame:
+class TickerMatcher:
     """
-    Fetch hot posts from `subreddit` once, then for each post,
-    emit one record per ticker that appears in the post (as word or cashtag).
+    Finds the tickers a text mentions as a word or cashtag, giving the same
+    result as running the case-insensitive word-boundary and `$TICKER`
+    regexes for every ticker.
+
+    For a ticker made only of ASCII word characters both regexes match exactly
+    when some maximal run of word characters equals it, so the text is tokenized
+    once and each token costs one dict lookup, however many tickers there are.
+    Tickers with other characters (e.g. 'BRK.B') keep their own regexes.
     """
-    reddit = praw.Reddit(
+
+    _WORD_RE = re.compile(r'\w+')
+    # non-ASCII characters that `re.IGNORECASE` matches against ASCII letters
+    _ASCII_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+
+    def __init__(self, tickers: list):
+        self.tickers  = list(tickers)
+        self._index   = {}  # upper-case ticker -> positions in self.tickers
+        self._regexes = []  # (position, word pattern, cashtag pattern)
+        for i, t in enumerate(self.tickers):
+            if t.isascii() and re.fullmatch(r'\w+', t):
+                self._index.setdefault(t.upper(), []).append(i)
+            else:
+                self._regexes.append((i,
+                                      re.compile(rf'\b{re.escape(t)}\b', re.IGNORECASE),
+                                      re.compile(rf'\${re.escape(t)}\b', re.IGNORECASE)))
+
+    def match(self, text: str) -> list:
+        """Tickers mentioned in `text`, in the order they were given."""
+        hits = set()
+        for tok in set(self._WORD_RE.findall(text)):
+            if not tok.isascii():
+                tok = tok.translate(self._ASCII_FOLD)
+                if not tok.isascii():
+                    continue
+            hits.update(self._index.get(tok.upper(), ()))
+        for i, word_rx, cash_rx in self._regexes:
+            if word_rx.search(text) or cash_rx.search(text):
+                hits.add(i)
+        return [self.tickers[i] for i in sorted(hits)]
+
+
+@lru_cache(maxsize=None)
+def get_reddit_client() -> praw.Reddit:
+    """Shared read-only PRAW client, created on first use."""
+    return praw.Reddit(
         client_id=REDDIT_CLIENT_ID,
         client_secret=REDDIT_CLIENT_SECRET,
         user_agent=REDDIT_USER_AGENT
     )
+
+
+def _reddit_post_records(post, subreddit: str, matcher: TickerMatcher) -> list:
+    """One record per ticker mentioned in `post`."""
+    ts   = datetime.fromtimestamp(post.created_utc, tz=timezone.utc).isoformat()
+    body = post.title + (f" - {post.selftext}" if post.selftext else "")
+    if not body.strip():
+        return []
+    # Truncate to first MAX_REDDIT_WORDS words
+    text = " ".join(body.split()[:MAX_REDDIT_WORDS])
+    return [{
+        "timestamp": ts,
+        "ticker":    ticker,
+        "source":    f"reddit.com/r/{subreddit}",
+        "text":      text
+    } for ticker in matcher.match(body)]
+
+
+def fetch_reddit_posts_for_tickers(subreddit: str, tickers: list, limit: int = 100) -> pd.DataFrame:
+    """
+    Fetch hot posts from `subreddit` once, then for each post,
+    emit one record per ticker that appears in the post (as word or cashtag).
+    """
+    reddit = get_reddit_client()
     try:
         posts = reddit.subreddit(subreddit).hot(limit=limit)
     except Exception as e:
         print(f"Error fetching Reddit posts: {e}")
         return pd.DataFrame()
 
-    # Precompile patterns for speed
-    word_patterns    = {t: re.compile(rf'\b{re.escape(t)}\b', re.IGNORECASE) for t in tickers}
-    cashtag_patterns = {t: re.compile(rf'\${re.escape(t)}\b', re.IGNORECASE) for t in tickers}
+    matcher = TickerMatcher(tickers)
 
     records = []
     for post in posts:
-        ts   = datetime.fromtimestamp(post.created_utc, tz=timezone.utc).isoformat()
-        body = post.title + (f" - {post.selftext}" if post.selftext else "")
-        if not body.strip():
-            continue
-        # Truncate to first MAX_REDDIT_WORDS words
-        text = " ".join(body.split()[:MAX_REDDIT_WORDS])
-
-        # Check each ticker
-        for ticker in tickers:
-            if word_patterns[ticker].search(body) or cashtag_patterns[ticker].search(body):
-                records.append({
-                    "timestamp": ts,
-                    "ticker":    ticker,
-                    "source":    f"reddit.com/r/{subreddit}",
-                    "text":      text
-                })
+        records.extend(_reddit_post_records(post, subreddit, matcher))
     if not records:
         return pd.DataFrame()
     return pd.DataFrame(records)
 
 
-def fetch_sec_transcripts(cik: str, ticker: str, max_filings: int = 10) -> pd.DataFrame:
+def load_reddit_watermarks(path: str = REDDIT_STATE_PATH) -> dict:
+    """Per-subreddit newest `created_utc` seen by earlier runs."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_reddit_watermarks(watermarks: dict, path: str = REDDIT_STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _reddit_listing(sub, listing: str, limit):
+    if listing == "top":
+        return sub.top(time_filter=REDDIT_TOP_WINDOW, limit=limit)
+    if listing in ("hot", "new", "rising", "controversial"):
+        return getattr(sub, listing)(limit=limit)
+    raise ValueError(f"Unknown Reddit listing: {listing}")
+
+
+def iter_reddit_records(subreddits: list, tickers: list, listings=REDDIT_LISTINGS,
+                        limit: int = REDDIT_PAGE_LIMIT, chunk_size: int = REDDIT_CHUNK_ROWS,
+                        watermarks: dict = None):
+    """
+    Stream ticker-mention records from several subreddits and listings as
+    DataFrames of at most `chunk_size` rows, so memory stays bounded however
+    many posts are pulled. PRAW pages each listing lazily; posts are
+    deduplicated by id across listings and subreddits.
+
+    With `watermarks` (see `load_reddit_watermarks`), posts no newer than a
+    subreddit's mark are skipped, the 'new' listing stops at the first such
+    post, and the dict is advanced in place once each subreddit is done.
+    """
+    reddit  = get_reddit_client()
+    matcher = TickerMatcher(tickers)
+    seen, buf = set(), []
+
+    for name in subreddits:
+        since  = (watermarks or {}).get(name, 0.0)
+        newest = since
+        for listing in listings:
+            try:
+                for post in _reddit_listing(reddit.subreddit(name), listing, limit):
+                    if post.created_utc <= since:
+                        if listing == "new":
+                            break
+                        continue
+                    if post.id in seen:
+                        continue
+                    seen.add(post.id)
+                    newest = max(newest, post.created_utc)
+                    buf.extend(_reddit_post_records(post, name, matcher))
+                    while len(buf) >= chunk_size:
+                        yield pd.DataFrame(buf[:chunk_size])
+                        buf = buf[chunk_size:]
+            except Exception as e:
+                print(f"Error fetching Reddit r/{name}/{listing}: {e}")
+        if watermarks is not None:
+            watermarks[name] = newest
+
+    if buf:
+        yield pd.DataFrame(buf)
+
+
+def _fetch_sec_filing(cik: str, ticker: str, acc: str, date: str, headers: dict,
+                      primary_doc: str = None):
+    """
+    Return the record for one 8-K, or None if it has no key items. Extracted
+    items are served from `filing_cache` when present, so only unseen
+    accession numbers are downloaded. The full submission is streamed and
+    abandoned once the 8-K document has arrived; if that download fails, the
+    `primary_doc` from the submissions feed is fetched directly instead.
+    """
+    txt = filing_cache.get_items(acc)
+    if txt is None:
+        base    = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{acc.replace('-','')}"
+        txt_url = f"{base}/{acc}.txt"
+        try:
+            with http_get(txt_url, "sec-filing", headers=headers, stream=True) as r:
+                r.raise_for_status()
+                html = stream_html_document(iter_response_text(r))
+        except Exception:
+            if not primary_doc:
+                return None
+            try:
+                r = http_get(f"{base}/{primary_doc}", "sec-primary-doc", headers=headers)
+                r.raise_for_status()
+                html = r.text
+            except Exception:
+                return None
+        filing_cache.put_text(acc, html or "")
+        txt  = extract_key_items_full_text(html) if html else ""
+        filing_cache.put_items(acc, txt)
+    if not txt.strip():
+        return None
+    dt   = datetime.fromisoformat(date).replace(tzinfo=timezone.utc).isoformat()
+    return {"timestamp": dt, "ticker": ticker, "source":"SEC-EDGAR-8K", "text": txt}
+
+
+def fetch_sec_transcripts(cik: str, ticker: str, max_filings: int = 10,
+                          executor: ThreadPoolExecutor = None) -> pd.DataFrame:
+    """
+    Fetch up to `max_filings` of the latest 8-Ks with key items for `cik`.
+    With an `executor`, filings are downloaded in parallel batches sized to the
+    number still needed, so the same filings are kept as in the sequential path.
+    """
     feed_url = f"https://data.sec.gov/submissions/CIK{cik.zfill(10)}.json"
     headers  = {"User-Agent": SEC_USER_AGENT}
     try:
-        r    = requests.get(feed_url, headers=headers); r.raise_for_status()
-        subs = r.json()
+        subs = conditional_get_json(feed_url, "sec-submissions", headers)
     except Exception as e:
         print(f"SEC feed error {cik}: {e}")
         return pd.DataFrame()
@@ -160,25 +589,18 @@ def fetch_sec_transcripts(cik: str, ticker: str, max_filings: int = 10) -> pd.Da
     forms      = subs.get("filings",{}).get("recent",{}).get("form", [])
     accessions = subs.get("filings",{}).get("recent",{}).get("accessionNumber", [])
     dates      = subs.get("filings",{}).get("recent",{}).get("filingDate", [])
+    primaries  = subs.get("filings",{}).get("recent",{}).get("primaryDocument", []) or [None] * len(forms)
+    candidates = [(acc, date, doc) for form, acc, date, doc in zip(forms, accessions, dates, primaries)
+                  if form.upper()=="8-K"]
 
-    recs, cnt = [], 0
-    for form, acc, date in zip(forms, accessions, dates):
-        if form.upper()!="8-K" or cnt>=max_filings:
-            continue
-        txt_url = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{acc.replace('-','')}/{acc}.txt"
-        try:
-            full = requests.get(txt_url, headers=headers).text
-        except Exception:
-            continue
-        html = extract_html_document(full)
-        if not html:
-            continue
-        txt  = extract_key_items_full_text(html)
-        if not txt.strip():
-            continue
-        dt   = datetime.fromisoformat(date).replace(tzinfo=timezone.utc).isoformat()
-        recs.append({"timestamp": dt, "ticker": ticker, "source":"SEC-EDGAR-8K", "text": txt})
-        cnt += 1
+    fetch = lambda c: _fetch_sec_filing(cik, ticker, c[0], c[1], headers, primary_doc=c[2])
+    _map  = executor.map if executor is not None else map
+
+    recs, i = [], 0
+    while len(recs) < max_filings and i < len(candidates):
+        batch = candidates[i:i + max_filings - len(recs)]
+        recs.extend(rec for rec in _map(fetch, batch) if rec is not None)
+        i += len(batch)
 
     return pd.DataFrame(recs)
 
@@ -207,27 +629,115 @@ def get_nasdaq100_tickers():
 
 # ─── Orchestrator ─────────────────────────────────────────────────────────────
 
-def build_pipeline():
-    # Latest NASDAQ-100 tickers
-    tickers = get_nasdaq100_tickers()
-    cik_map = {t: all_mappings.get(t) for t in tickers}
+def _fetch_all_sources(tickers: list, cik_map: dict, concurrent: bool = False,
+                       fetch_reddit=None) -> list:
+    """
+    Fetch Yahoo news, Reddit and SEC frames in the same order regardless of
+    `concurrent`, so the combined output is identical in both modes.
+    `fetch_reddit` returns the Reddit frame (default: r/stocks hot posts).
+    """
+    if fetch_reddit is None:
+        fetch_reddit = lambda: fetch_reddit_posts_for_tickers('stocks', tickers)
+
+    def fetch_sec(t):
+        cik = cik_map.get(t)
+        return fetch_sec_transcripts(cik, t, executor=filing_pool) if cik else None
 
     frames = []
+    if not concurrent:
+        filing_pool = None
+        # 1) news per ticker
+        for t in tickers:
+            frames.append(fetch_yahoo_news(t))
+        # 2) reddit posts once, then split
+        reddit_df = fetch_reddit()
+        if not reddit_df.empty:
+            frames.append(reddit_df)
+        # 3) SEC filings per ticker
+        sec_frames = [fetch_sec(t) for t in tickers]
+    else:
+        with ThreadPoolExecutor(FETCH_WORKERS) as pool, ThreadPoolExecutor(FILING_WORKERS) as filing_pool:
+            news_futs  = [pool.submit(fetch_yahoo_news, t) for t in tickers]
+            reddit_fut = pool.submit(fetch_reddit)
+            sec_futs   = [pool.submit(fetch_sec, t) for t in tickers]
+            frames.extend(f.result() for f in news_futs)
+            reddit_df = reddit_fut.result()
+            if not reddit_df.empty:
+                frames.append(reddit_df)
+            sec_frames = [f.result() for f in sec_futs]
+
+    frames.extend(f for f in sec_frames if f is not None)
+    return frames
+
+
+def canonical_url(url: str) -> str:
+    """Drop query, fragment and trailing slash; lower-case scheme and host."""
+    parts = urlsplit(str(url).strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), '', ''))
+
+
+def article_ids(news: pd.DataFrame) -> pd.Series:
+    """Article key per news row: hash of the canonical URL, or of the title when there is none."""
+    def key(row):
+        url = row['url'] if isinstance(row['url'], str) and row['url'].strip() else None
+        basis = canonical_url(url) if url else "title:" + " ".join(str(row['text']).lower().split())
+        return hashlib.sha1(basis.encode('utf-8')).hexdigest()[:16]
+    return news.apply(key, axis=1) if not news.empty else pd.Series(dtype=object)
+
+
+def _clean(df: pd.DataFrame):
+    """
+    Drop duplicate and empty texts. Yahoo news rows are collapsed to one row
+    per article (keyed by `article_id`, same story under the same timestamp
+    and title counting as one); the returned link table maps each article to
+    every ticker it was fetched for, for fan-out at signal time.
+    """
+    df      = df.copy()
+    is_news = df['source'].map(source_family) == 'yahoo'
+    df['article_id'] = None
+    if is_news.any():
+        news = df[is_news]
+        ids  = article_ids(news)
+        df.loc[is_news, 'article_id'] = ids.groupby([news['timestamp'], news['text']]).transform('first')
+    links = df.loc[is_news, ['article_id', 'ticker']].drop_duplicates()
+
+    clean = df.drop_duplicates(subset=['timestamp','text'])
+    clean = clean[clean['text'].str.strip().astype(bool)]
+    links = links[links['article_id'].isin(clean['article_id'])]
+    return clean, links
 
-    # 1) news per ticker
-    for t in tickers:
-        frames.append(fetch_yahoo_news(t))
 
-    # 2) reddit hot posts once, then split
-    reddit_df = fetch_reddit_posts_for_tickers('stocks', tickers)
-    if not reddit_df.empty:
-        frames.append(reddit_df)
+def build_pipeline(concurrent: bool = False, subreddits: list = None,
+                   listings=REDDIT_LISTINGS, since_last: bool = False,
+                   incremental: bool = False):
+    """
+    Fetch all sources and write raw_data.csv / clean_data.csv. Passing
+    `subreddits` switches Reddit to the paged multi-listing ingestion; with
+    `since_last` it only pulls posts newer than each subreddit's watermark;
+    that delta is merged into the record store, so it implies `incremental`
+    (otherwise the earlier posts would drop out of raw/clean_data.csv).
+
+    With `incremental`, fetched records are merged into the append-only
+    `RecordStore`; raw/clean_data.csv become the last CUTOFF_DAYS view of the
+    store and new_data.csv holds only the cleaned records this run added.
+    """
+    since_last  = since_last or incremental
+    incremental = since_last
 
-    # 3) SEC filings per ticker
-    for t in tickers:
-        cik = cik_map.get(t)
-        if cik:
-            frames.append(fetch_sec_transcripts(cik, t))
+    # Latest NASDAQ-100 tickers
+    tickers = get_nasdaq100_tickers()
+    cik_map = {t: all_mappings.get(t) for t in tickers}
+
+    fetch_reddit = None
+    watermarks   = load_reddit_watermarks() if since_last else None
+    if subreddits or since_last:
+        subreddits = subreddits or REDDIT_SUBREDDITS
+        def fetch_reddit():
+            chunks = list(iter_reddit_records(subreddits, tickers, listings, watermarks=watermarks))
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    frames = _fetch_all_sources(tickers, cik_map, concurrent=concurrent, fetch_reddit=fetch_reddit)
+    stats.report()
 
     if not frames:
         print("No data frames to concatenate.")
@@ -239,19 +749,55 @@ def build_pipeline():
     combined['timestamp'] = pd.to_datetime(combined['timestamp'], utc=True, errors='coerce')
     combined = combined.dropna(subset=['timestamp']).sort_values('timestamp')
 
-    # —— apply cutoff ——
-    cutoff   = datetime.now(timezone.utc) - timedelta(days=CUTOFF_DAYS)
-    combined = combined[combined['timestamp'] >= cutoff]
+    if incremental:
+        store    = RecordStore()
+        delta    = store.append(combined)
+        # —— retention as a view over the store ——
+        combined = store.view(CUTOFF_DAYS)
+        clean, links = _clean(combined)
+        new      = clean[clean['record_id'].isin(delta['record_id'])]
+        new_path = os.path.join(DATA_DIR, 'new_data.csv')
+        new.to_csv(new_path, index=False)
+        print(f"Stored {len(delta)} new records; saved {len(new)} clean new rows to {new_path}")
+    else:
+        # —— apply cutoff ——
+        cutoff   = datetime.now(timezone.utc) - timedelta(days=CUTOFF_DAYS)
+        combined = combined[combined['timestamp'] >= cutoff]
+        clean, links = _clean(combined)
 
     raw_path   = os.path.join(DATA_DIR, 'raw_data.csv')
-    combined.to_csv(raw_path, index=False)
+    save_artifact('raw_data', combined, raw_path)
     print(f"Saved raw_data (last {CUTOFF_DAYS} days) to {raw_path}")
 
-    clean = combined.drop_duplicates(subset=['timestamp','text'])
-    clean = clean[clean['text'].str.strip().astype(bool)]
     clean_path = os.path.join(DATA_DIR, 'clean_data.csv')
-    clean.to_csv(clean_path, index=False)
+    save_artifact('clean_data', clean, clean_path)
     print(f"Saved clean_data (last {CUTOFF_DAYS} days) to {clean_path}")
 
+    links_path = os.path.join(DATA_DIR, 'article_tickers.csv')
+    links.to_csv(links_path, index=False)
+    print(f"Saved {links['article_id'].nunique()} articles -> {len(links)} ticker links to {links_path}")
+
+    if watermarks is not None:
+        save_reddit_watermarks(watermarks)
+
 if __name__ == '__main__':
-    build_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch news, Reddit and SEC data.")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="fetch sources in parallel (rate-limited per host)")
+    parser.add_argument("--subreddits", nargs="+",
+                        help=f"subreddits to ingest with paging (default: {' '.join(REDDIT_SUBREDDITS)} hot only)")
+    parser.add_argument("--listings", nargs="+", default=list(REDDIT_LISTINGS),
+                        choices=["hot", "new", "top", "rising", "controversial"])
+    parser.add_argument("--since-last", action="store_true",
+                        help="only pull Reddit posts newer than the saved per-subreddit watermark (implies --incremental)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="merge into the append-only store and emit only the delta to new_data.csv")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time and check 8-K key-item extraction (fast tokenizer vs BeautifulSoup) and exit")
+    args = parser.parse_args()
+    if args.benchmark:
+        print(benchmark_key_items())
+    else:
+        build_pipeline(concurrent=args.concurrent, subreddits=args.subreddits,
+                       listings=tuple(args.listings), since_last=args.since_last,
+                       incremental=args.incremental)
\ No newline at end of file
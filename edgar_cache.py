@@ -0,0 +1,92 @@
+import os
+import gzip
+import json
+import threading
+
+from http_utils import http_get
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+EDGAR_CACHE_DIR = os.path.join("data", "edgar_cache")
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write via a temp file + rename so concurrent readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class FilingCache:
+    """
+    Immutable on-disk cache of EDGAR filings keyed by accession number.
+
+    A published filing never changes, so entries are never invalidated:
+      filings/<acc[:10]>/<acc>.txt.gz    compressed primary 8-K document text
+      filings/<acc[:10]>/<acc>.items.gz  extracted key-item text ('' = no key items)
+    """
+
+    def __init__(self, root: str = EDGAR_CACHE_DIR):
+        self.root = root
+
+    def _path(self, acc: str, suffix: str) -> str:
+        return os.path.join(self.root, "filings", acc[:10], f"{acc}.{suffix}.gz")
+
+    def _read(self, path: str):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return f.read()
+        except (FileNotFoundError, EOFError, OSError):
+            return None
+
+    def get_text(self, acc: str):
+        return self._read(self._path(acc, "txt"))
+
+    def put_text(self, acc: str, text: str):
+        _atomic_write(self._path(acc, "txt"), gzip.compress(text.encode("utf-8")))
+
+    def get_items(self, acc: str):
+        """Extracted key-item text, '' if the filing had none, None if not cached."""
+        return self._read(self._path(acc, "items"))
+
+    def put_items(self, acc: str, items: str):
+        _atomic_write(self._path(acc, "items"), gzip.compress(items.encode("utf-8")))
+
+
+def conditional_get_json(url: str, source: str, headers: dict, root: str = EDGAR_CACHE_DIR):
+    """
+    GET a JSON feed with If-None-Match / If-Modified-Since revalidation.
+    On 304 the cached body is returned; on a fresh 200 the body and validators
+    are stored. Raises on HTTP errors when nothing usable is cached.
+    """
+    name = url.rstrip("/").rsplit("/", 1)[-1]
+    path = os.path.join(root, "feeds", f"{name}.gz")
+
+    cached = None
+    if os.path.exists(path):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (EOFError, OSError, ValueError):
+            cached = None
+
+    req_headers = dict(headers)
+    if cached:
+        if cached.get("etag"):
+            req_headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            req_headers["If-Modified-Since"] = cached["last_modified"]
+
+    r = http_get(url, source, headers=req_headers)
+    if r.status_code == 304 and cached:
+        return cached["body"]
+    r.raise_for_status()
+    body = r.json()
+    entry = {
+        "etag":          r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "body":          body,
+    }
+    _atomic_write(path, gzip.compress(json.dumps(entry).encode("utf-8")))
+    return body
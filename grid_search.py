@@ -1,11 +1,24 @@
 import os
+import csv
+import json
+import math
+import time
+import hashlib
+import shutil
+import argparse
 import itertools
+import tempfile
+import numpy as np
 import pandas as pd
 from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from backtest import run_backtest, fetch_price_data
-from signals import load_signals, add_conviction_signals, screen_tickers
+from backtest import run_backtest, price_panel
+from signals import load_conviction_table, load_signals, screen_tickers
 from metrics import summarize_performance
+from price_store import default_store
+from search_cache import SearchCache, result_key
+from vector_backtest import PricePanel
 
 # ─── Hyperparameter grids ─────────────────────────────────────────────────
 WINDOWS  = [1, 3, 5]
@@ -13,75 +26,363 @@ QOPTS    = [0.025, 0.05, 0.075]
 SL_PCTS  = [0.02, 0.0225, 0.025]
 TP_PCTS  = [0.04, 0.045, 0.05]
 
-# ─── File map for pre‑saved signals ──────────────────────────────────────────
-SIG_FILES = {
-    1: 'data/signals_1d.csv',
-    3: 'data/signals_3d.csv',
-    5: 'data/signals_5d.csv'
-}
-
-# 1) Build a shared price cache (so we don’t re‑download every backtest)
-all_sigs = []
-for fn in SIG_FILES.values():
-    tmp = pd.read_csv(fn, parse_dates=['timestamp'])
-    all_sigs.append(tmp[['timestamp','ticker']])
-all_sigs = pd.concat(all_sigs, ignore_index=True)
-start_dt = all_sigs['timestamp'].min().date().isoformat()
-end_dt   = (all_sigs['timestamp'].max().date() + timedelta(days=1)).isoformat()
-
-price_cache = {
-    t: fetch_price_data(t, start_dt, end_dt)
-    for t in all_sigs['ticker'].unique()
-}
-
-# 2) Screen tickers using standalone 3‑day signals
-baseline = pd.read_csv(SIG_FILES[3], parse_dates=['timestamp'])
-good_tickers = screen_tickers(
-    baseline,
-    stop_loss_pct=0.0225,
-    take_profit_pct=0.045,
-    price_cache=price_cache,
-    min_sharpe=0.0
-)
-print(f"Screened tickers: {len(baseline['ticker'].unique())} → {len(good_tickers)} kept")
-
-# 3) Grid search over (window, SL, TP, q_low, q_high)
-results = []
-for window, sl, tp, ql, qh in itertools.product(
-    WINDOWS, SL_PCTS, TP_PCTS, QOPTS, QOPTS
-):
-    if ql >= qh:
-        continue
-
-    # 3.1) Load the pre‑saved signals for this window
-    df = load_signals(window)
-    df = df[df['ticker'].isin(good_tickers)].copy()
-
-    # 3.2) Add conviction‐based signals
-    df = add_conviction_signals(df, ql, qh)
-
-    # 3.3) Run the backtest & summarize
-    cerebro, strat, start_date, end_date = run_backtest(
-        df, stop_loss=sl, take_profit=tp, external_price_cache=price_cache
-    )
-    perf = summarize_performance(cerebro, strat, start_date, end_date)
+RESULTS_CSV    = 'data/grid_search.csv'
+RESULT_COLUMNS = ['window', 'q_low', 'q_high', 'stop_loss', 'take_profit', 'signal_count',
+                  'cagr', 'sharpe', 'max_dd', 'trades', 'win_rate']
+TASK_FIELDS    = ['window', 'q_low', 'q_high', 'stop_loss', 'take_profit', 'span_end']
+SIGNAL_LABELS  = np.array(['Neutral', 'Long', 'Short'])
+
+
+# ─── Inputs ──────────────────────────────────────────────────────────────────
+
+def load_price_cache() -> dict:
+    """1) Prices for every ticker across all signal windows, from the local price store."""
+    all_sigs = pd.concat([load_signals(w, columns=['timestamp', 'ticker']) for w in WINDOWS],
+                         ignore_index=True)
+    start_dt = all_sigs['timestamp'].min().date().isoformat()
+    end_dt   = (all_sigs['timestamp'].max().date() + timedelta(days=1)).isoformat()
+    return default_store().get_many(all_sigs['ticker'].unique(), start_dt, end_dt)
+
+
+def grid_tasks() -> list:
+    """(window, q_low, q_high, stop_loss, take_profit) in grid order, q_low < q_high."""
+    return [(window, ql, qh, sl, tp)
+            for window, sl, tp, ql, qh in itertools.product(WINDOWS, SL_PCTS, TP_PCTS, QOPTS, QOPTS)
+            if ql < qh]
+
+
+def random_tasks(n: int, seed: int = 0) -> list:
+    """
+    `n` distinct random configurations: window and quantile pair from the
+    grid, SL and TP uniform over the grid's ranges (rounded to 1e-4, so
+    repeated draws hit the result cache).
+    """
+    rng   = np.random.default_rng(seed)
+    pairs = [(ql, qh) for ql in QOPTS for qh in QOPTS if ql < qh]
+    tasks = {}
+    for _ in range(100 * n):
+        if len(tasks) >= n:
+            break
+        ql, qh = pairs[rng.integers(len(pairs))]
+        task   = (int(rng.choice(WINDOWS)), ql, qh,
+                  round(float(rng.uniform(min(SL_PCTS), max(SL_PCTS))), 4),
+                  round(float(rng.uniform(min(TP_PCTS), max(TP_PCTS))), 4))
+        tasks.setdefault(task, None)
+    return list(tasks)
+
+
+def signal_sets(good_tickers) -> dict:
+    """{(window, q_low, q_high): conviction signals restricted to good_tickers}."""
+    sets = {}
+    for window, ql, qh, _, _ in grid_tasks():
+        if (window, ql, qh) not in sets:
+            df = load_conviction_table(window, tuple(QOPTS)).signals(ql, qh)
+            sets[(window, ql, qh)] = df[df['ticker'].isin(good_tickers)]
+    return sets
+
+
+class SharedInputs:
+    """
+    Price panel and conviction signals stored once as .npy files in `root`
+    and opened memory-mapped, so every worker process shares the same pages
+    instead of receiving pickled DataFrames with each task.
+
+    Signals for all (window, q_low, q_high) keys are concatenated into flat
+    columns (timestamp ns, ticker code, signal code, conv) with a row range
+    per key.
+    """
+
+    ARRAYS = ('days', 'open', 'high', 'low', 'close', 'ts', 'ticker', 'signal', 'conv')
+
+    def __init__(self, root: str, arrays: dict, meta: dict):
+        self.root    = root
+        self.arrays  = arrays
+        self.tickers = meta['tickers']
+        self.ranges  = {tuple(k): v for k, v in meta['ranges']}
+        self.panel   = PricePanel(meta['panel_tickers'], arrays['days'], arrays['open'],
+                                  arrays['high'], arrays['low'], arrays['close'])
+        self._spans  = {}
+
+    @classmethod
+    def create(cls, root: str, panel: PricePanel, sets: dict) -> 'SharedInputs':
+        tickers = sorted({t for df in sets.values() for t in df['ticker'].unique()})
+        codes   = {t: i for i, t in enumerate(tickers)}
+        cols, ranges, lo = {'ts': [], 'ticker': [], 'signal': [], 'conv': []}, [], 0
+        for key, df in sets.items():
+            cols['ts'].append(pd.to_datetime(df['timestamp'], utc=True).dt.as_unit('ns').array.asi8)
+            cols['ticker'].append(df['ticker'].map(codes).to_numpy(np.int32))
+            cols['signal'].append(pd.Categorical(df['signal'], categories=SIGNAL_LABELS).codes.astype(np.int8))
+            cols['conv'].append(df['conv'].to_numpy(np.float64))
+            ranges.append([list(key), [lo, lo + len(df)]])
+            lo += len(df)
+
+        arrays = {'days': panel.days, 'open': panel.open, 'high': panel.high,
+                  'low': panel.low, 'close': panel.close}
+        arrays.update({k: np.concatenate(v) if v else np.empty(0) for k, v in cols.items()})
+        os.makedirs(root, exist_ok=True)
+        for name in cls.ARRAYS:
+            np.save(os.path.join(root, f'{name}.npy'), arrays[name])
+        with open(os.path.join(root, 'meta.json'), 'w') as f:
+            json.dump({'tickers': tickers, 'panel_tickers': panel.tickers, 'ranges': ranges}, f)
+        return cls.open(root)
+
+    @classmethod
+    def open(cls, root: str) -> 'SharedInputs':
+        with open(os.path.join(root, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(root, f'{name}.npy'), mmap_mode='r') for name in cls.ARRAYS}
+        return cls(root, arrays, meta)
+
+    def signals(self, window: int, q_low: float, q_high: float, span_end: str = None) -> pd.DataFrame:
+        """Signals of one key, only those before `span_end` (ISO date) if given."""
+        lo, hi = self.ranges[(window, q_low, q_high)]
+        a  = self.arrays
+        ts = a['ts'][lo:hi]
+        keep = slice(None) if span_end is None else ts < pd.Timestamp(span_end, tz='UTC').value
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(ts[keep], utc=True),
+            'ticker':    np.asarray(self.tickers, dtype=object)[a['ticker'][lo:hi][keep]],
+            'signal':    SIGNAL_LABELS[a['signal'][lo:hi][keep]],
+            'conv':      np.asarray(a['conv'][lo:hi][keep]),
+        })
+
+    def panel_until(self, span_end: str = None) -> PricePanel:
+        """The price panel limited to days before `span_end`: a row slice of the mapped arrays."""
+        if span_end is None:
+            return self.panel
+        p = self.panel
+        k = int(np.searchsorted(p.days, np.datetime64(span_end, 'D')))
+        return PricePanel(p.tickers, p.days[:k], p.open[:k], p.high[:k], p.low[:k], p.close[:k])
+
+    def price_cache(self, span_end: str = None) -> dict:
+        """Per-ticker frames for backtrader, built once per span and process."""
+        if span_end not in self._spans:
+            self._spans[span_end] = self.panel_until(span_end).to_price_cache()
+        return self._spans[span_end]
+
+    def signal_days(self) -> np.ndarray:
+        """Sorted distinct UTC signal dates across all keys."""
+        return np.unique(self.arrays['ts'].astype('datetime64[ns]').astype('datetime64[D]'))
+
+    def fingerprints(self, window: int, q_low: float, q_high: float):
+        """(signals, prices) sha256 fingerprints for the result cache."""
+        lo, hi = self.ranges[(window, q_low, q_high)]
+        sig = hashlib.sha256(json.dumps(self.tickers).encode())
+        for name in ('ts', 'ticker', 'signal', 'conv'):
+            sig.update(np.ascontiguousarray(self.arrays[name][lo:hi]).tobytes())
+        if not hasattr(self, '_prices_fp'):
+            h = hashlib.sha256(json.dumps(self.panel.tickers).encode())
+            for name in ('days', 'open', 'high', 'low', 'close'):
+                h.update(np.ascontiguousarray(self.arrays[name]).tobytes())
+            self._prices_fp = h.hexdigest()
+        return sig.hexdigest(), self._prices_fp
 
-    results.append({
+
+# ─── Evaluation ──────────────────────────────────────────────────────────────
+
+_inputs = None     # SharedInputs of the current (worker) process
+_engine = 'backtrader'
+
+
+def _init_worker(root: str, engine: str):
+    global _inputs, _engine
+    _inputs, _engine = SharedInputs.open(root), engine
+
+
+def evaluate(task) -> dict:
+    """
+    Backtest one grid point against the process's shared inputs. A sixth
+    task element `span_end` restricts signals and prices to earlier days.
+    """
+    window, ql, qh, sl, tp = task[:5]
+    span_end    = task[5] if len(task) > 5 else None
+    df          = _inputs.signals(window, ql, qh, span_end)
+    if df.empty:
+        perf = {'cagr': None, 'sharpe': None, 'max_dd': None, 'trades': 0, 'win_rate': None}
+    elif _engine == 'native':
+        perf = summarize_performance(*run_backtest(df, stop_loss=sl, take_profit=tp,
+                                                   engine='native', panel=_inputs.panel_until(span_end)))
+    else:
+        perf = summarize_performance(*run_backtest(df, stop_loss=sl, take_profit=tp,
+                                                   external_price_cache=_inputs.price_cache(span_end)))
+    return {
         'window':      window,
         'q_low':       ql,
         'q_high':      qh,
         'stop_loss':   sl,
         'take_profit': tp,
         'signal_count': int((df['signal'] != 'Neutral').sum()),
-        **perf
-    })
+        **perf,
+        'span_end':    span_end,
+    }
+
+
+def task_params(task, engine: str) -> dict:
+    return {**dict(zip(TASK_FIELDS, tuple(task) + (None,) * (6 - len(task)))), 'engine': engine}
+
+
+def run_grid(tasks, root: str, workers: int = None, engine: str = 'backtrader',
+             out_path: str = RESULTS_CSV, cache: SearchCache = None) -> pd.DataFrame:
+    """
+    Evaluate `tasks` and stream each result row to `out_path` (if given) as
+    it finishes. workers=1 runs serially in this process, in grid order;
+    otherwise a process pool maps the shared inputs once per worker. The
+    file is rewritten in task order at the end, so serial and parallel runs
+    can be diffed directly.
+
+    With a SearchCache, tasks already evaluated on the same signals and
+    prices are served from it and every new row is stored as soon as it
+    arrives, so an interrupted run resumes where it stopped.
+    """
+    inputs  = SharedInputs.open(root)
+    keys    = {}
+    if cache is not None:
+        fps  = {}
+        for task in tasks:
+            if task[:3] not in fps:
+                fps[task[:3]] = inputs.fingerprints(*task[:3])
+            keys[task] = result_key(task_params(task, engine), *fps[task[:3]])
+    done    = cache.get_many(keys.values()) if cache is not None else {}
+    todo    = [(i, t) for i, t in enumerate(tasks) if keys.get(t) not in done]
+    workers = min(workers or os.cpu_count() or 1, max(len(todo), 1))
+    results = {}
+    if out_path:
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    f      = open(out_path, 'w', newline='') if out_path else None
+    writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS, extrasaction='ignore') if f else None
+    if writer:
+        writer.writeheader()
+
+    def record(i, row, fresh=True):
+        results[i] = row
+        if fresh and cache is not None:
+            cache.put(keys[tasks[i]], task_params(tasks[i], engine), row)
+        if writer:
+            writer.writerow(row)
+            f.flush()
+        if fresh:
+            sharpe = f"{row['sharpe']:.4f}" if row['sharpe'] is not None else 'n/a'
+            print(f"[{len(results)}/{len(tasks)}] W={row['window']}  Q=({row['q_low']:.3f},{row['q_high']:.3f})  "
+                  f"SL={row['stop_loss']:.4f}  TP={row['take_profit']:.4f} → Sharpe {sharpe}")
 
-    print(f"W={window}  Q=({ql:.3f},{qh:.3f})  SL={sl:.4f}  TP={tp:.4f} → Sharpe {perf['sharpe']:.4f}")
+    try:
+        for i, task in enumerate(tasks):
+            if keys.get(task) in done:
+                record(i, done[keys[task]], fresh=False)
+        if len(results):
+            print(f"{len(results)}/{len(tasks)} configurations served from {cache.path}")
+
+        if workers == 1:
+            _init_worker(root, engine)
+            for i, task in todo:
+                record(i, evaluate(task))
+        elif todo:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(root, engine)) as pool:
+                futures = {pool.submit(evaluate, task): i for i, task in todo}
+                for fut in as_completed(futures):
+                    record(futures[fut], fut.result())
+    finally:
+        if f:
+            f.close()
+
+    out = pd.DataFrame([results[i] for i in sorted(results)], columns=RESULT_COLUMNS + ['span_end'])
+    if out_path:
+        out[RESULT_COLUMNS].to_csv(out_path, index=False)
+    return out
+
+
+def _rank(out: pd.DataFrame) -> np.ndarray:
+    """Row order by Sharpe, best first; missing Sharpe last."""
+    return np.argsort(-pd.to_numeric(out['sharpe'], errors='coerce').fillna(-np.inf).to_numpy(),
+                      kind='stable')
+
+
+def successive_halving(candidates, root: str, eta: int = 3, min_budget: float = 1 / 9,
+                       out_path: str = RESULTS_CSV, **kw) -> pd.DataFrame:
+    """
+    Successive halving over date subsets: evaluate every candidate on the
+    first `min_budget` share of signal days, keep the best 1/eta by Sharpe,
+    multiply the share by eta and repeat until the survivors run on the full
+    range. Only the final rung is written to `out_path`.
+    """
+    days  = SharedInputs.open(root).signal_days()
+    rungs = max(1, int(math.floor(math.log(1 / min_budget, eta) + 1e-9)) + 1)
+    alive = list(candidates)
+    for r in range(rungs):
+        share = float(eta) ** (r - rungs + 1)
+        last  = r == rungs - 1
+        if last or not len(days):
+            span_end = None
+        else:
+            n        = max(1, int(math.ceil(share * len(days))))
+            span_end = str(days[min(n, len(days) - 1)]) if n < len(days) else None
+        print(f"\nRung {r + 1}/{rungs}: {len(alive)} configurations on "
+              f"{'all days' if span_end is None else 'days before ' + span_end}")
+        out = run_grid([tuple(c[:5]) + ((span_end,) if span_end else ()) for c in alive], root,
+                       out_path=out_path if last else None, **kw)
+        if last:
+            return out
+        keep  = max(1, int(math.ceil(len(alive) / eta)))
+        alive = [alive[i] for i in _rank(out)[:keep]]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Grid search over windows, quantiles, SL and TP.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--serial', action='store_true',
+                        help='run every grid point in this process, in grid order')
+    parser.add_argument('--engine', choices=['backtrader', 'native'], default='backtrader',
+                        help='backtest engine (see vector_backtest.py)')
+    parser.add_argument('--strategy', choices=['grid', 'random', 'halving'], default='grid',
+                        help='exhaustive grid, random sample, or successive halving over date subsets')
+    parser.add_argument('--samples', type=int, default=None,
+                        help='random configurations to draw (random; halving starts from the grid if unset)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--eta', type=int, default=3, help='halving rate')
+    parser.add_argument('--min-budget', type=float, default=1 / 9,
+                        help='share of signal days in the first halving rung')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='recompute everything instead of reusing data/search_cache.sqlite')
+    args = parser.parse_args()
+    workers = 1 if args.serial else args.workers
+    cache   = None if args.no_cache else SearchCache()
+
+    # 1) Build a shared price cache (so we don’t re‑download every backtest)
+    price_cache = load_price_cache()
+
+    # 2) Screen tickers using standalone 3‑day signals
+    baseline = load_signals(3)
+    good_tickers = screen_tickers(
+        baseline,
+        stop_loss_pct=0.0225,
+        take_profit_pct=0.045,
+        price_cache=price_cache,
+        min_sharpe=0.0,
+        workers=workers
+    )
+    print(f"Screened tickers: {len(baseline['ticker'].unique())} → {len(good_tickers)} kept")
 
-# 4) Save and show top 10 by Sharpe
-out = pd.DataFrame(results)
-os.makedirs('data', exist_ok=True)
-out.to_csv('data/grid_search.csv', index=False)
+    # 3) Search over (window, SL, TP, q_low, q_high); prices and signals are
+    #    written once to memory-mapped arrays shared by all workers
+    if args.strategy == 'random' or (args.strategy == 'halving' and args.samples):
+        tasks = random_tasks(args.samples or 20, args.seed)
+    else:
+        tasks = grid_tasks()
+    root = tempfile.mkdtemp(prefix='grid_search_')
+    try:
+        SharedInputs.create(root, price_panel(price_cache), signal_sets(good_tickers))
+        t0 = time.perf_counter()
+        if args.strategy == 'halving':
+            out = successive_halving(tasks, root, eta=args.eta, min_budget=args.min_budget,
+                                     workers=workers, engine=args.engine, cache=cache)
+        else:
+            out = run_grid(tasks, root, workers=workers, engine=args.engine, cache=cache)
+        print(f"\n{len(out)} results in {time.perf_counter() - t0:.1f}s → {RESULTS_CSV}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
 
-print("\nTop 10 by Sharpe:")
-print(out.sort_values('sharpe', ascending=False).head(10).to_string(index=False))
\ No newline at end of file
+    # 4) Show top 10 by Sharpe
+    print("\nTop 10 by Sharpe:")
+    print(out[RESULT_COLUMNS].sort_values('sharpe', ascending=False).head(10).to_string(index=False))
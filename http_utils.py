@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# ─── Rate limits ───────────────────────────────────────────────────────────────
+# requests/second allowed per host key; EDGAR fair access is 10 req/s across
+# all of sec.gov, so data.sec.gov and www.sec.gov share one bucket.
+HOST_RATE_LIMITS = {
+    "sec.gov":   10.0,
+    "yahoo.com": 20.0,
+}
+HTTP_TIMEOUT = 30   # seconds; a stalled connection must not hold a fetch worker forever
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire()` blocks until a token is available,
+    refilling at `rate` tokens/second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate     = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens  = self.capacity
+        self._last    = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                now          = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last   = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters      = {}
+_limiters_lock = threading.Lock()
+
+
+def host_key(url_or_host: str) -> str:
+    """Reduce a URL or hostname to its registered domain, e.g. 'sec.gov'."""
+    host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+    return ".".join((host or "").lower().split(".")[-2:])
+
+
+def get_limiter(url_or_host: str):
+    """Return the shared TokenBucket for a host, or None if it is unlimited."""
+    key  = host_key(url_or_host)
+    rate = HOST_RATE_LIMITS.get(key)
+    if rate is None:
+        return None
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = TokenBucket(rate)
+        return _limiters[key]
+
+
+def throttle(url_or_host: str):
+    """Block until the host's rate limiter lets one request through."""
+    limiter = get_limiter(url_or_host)
+    if limiter is not None:
+        limiter.acquire()
+
+# ─── Pooled sessions ───────────────────────────────────────────────────────────
+POOL_MAXSIZE = 32  # keep-alive connections per host
+
+_sessions      = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url_or_host: str) -> requests.Session:
+    """Return the shared keep-alive Session for a host key, creating it on first use."""
+    key = host_key(url_or_host)
+    with _sessions_lock:
+        if key not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+        return _sessions[key]
+
+# ─── Per-source fetch statistics ───────────────────────────────────────────────
+
+class FetchStats:
+    """Thread-safe per-source request counts, error counts and latencies."""
+
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._errors    = defaultdict(int)
+
+    def record(self, source: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self._latencies[source].append(seconds)
+            if not ok:
+                self._errors[source] += 1
+
+    @contextmanager
+    def timed(self, source: str):
+        """Time the enclosed block; an exception counts as an error and is re-raised."""
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(source, time.perf_counter() - t0, ok)
+
+    def summary(self) -> pd.DataFrame:
+        with self._lock:
+            rows = []
+            for source, lat in sorted(self._latencies.items()):
+                s = pd.Series(lat)
+                rows.append({
+                    "source":   source,
+                    "requests": len(lat),
+                    "errors":   self._errors[source],
+                    "mean_s":   s.mean(),
+                    "p95_s":    s.quantile(0.95),
+                    "total_s":  s.sum(),
+                })
+        return pd.DataFrame(rows, columns=["source", "requests", "errors", "mean_s", "p95_s", "total_s"])
+
+    def report(self):
+        df = self.summary()
+        if df.empty:
+            return
+        print("Fetch stats:")
+        print(df.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+
+# shared stats for the current process
+stats = FetchStats()
+
+
+def http_get(url: str, source: str, **kwargs) -> requests.Response:
+    """
+    Rate-limited, timed GET on the host's pooled session; HTTP error
+    statuses count as errors. Requests time out after HTTP_TIMEOUT seconds
+    unless the caller passes its own `timeout`.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    throttle(url)
+    t0 = time.perf_counter()
+    try:
+        r = get_session(url).get(url, **kwargs)
+    except Exception:
+        stats.record(source, time.perf_counter() - t0, ok=False)
+        raise
+    stats.record(source, time.perf_counter() - t0, ok=r.ok)
+    return r
@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import argparse
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+DEDUP_THRESHOLD = 0.8      # estimated Jaccard similarity to count as near-duplicates
+NUM_PERM        = 128      # MinHash signature length
+SHINGLE_SIZE    = 5        # character shingles
+SIG_CHUNK       = 2 ** 15  # shingles hashed per chunk
+
+_MASK32   = np.uint64(0xFFFFFFFF)
+_SHIFT32  = np.uint64(32)
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize_for_dedup(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    return " ".join(_PUNCT_RE.sub(" ", str(text).lower()).split())
+
+
+def _shingle_hashes(texts: List[str], k: int):
+    """
+    32-bit hashes of every k-byte shingle, computed for all texts at once on
+    one concatenated byte buffer. Returns (hashes, segment starts); texts
+    shorter than k contribute one zero-padded shingle.
+    """
+    encoded = [t.encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    buf     = np.frombuffer(b"".join(b + b"\0" * k for b in encoded), dtype=np.uint8)
+    starts  = np.concatenate(([0], np.cumsum(lengths + k)[:-1]))
+    counts  = np.maximum(lengths - k + 1, 1)
+    seg     = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    pos     = np.repeat(starts - seg, counts) + np.arange(counts.sum())
+
+    h = np.zeros(len(pos), dtype=np.uint64)
+    for j in range(k):
+        h = (h * np.uint64(16777619) + buf[pos + j]) & _MASK32
+    h ^= h >> np.uint64(15)
+    h = (h * np.uint64(0x2C1B3C6D)) & _MASK32
+    h ^= h >> np.uint64(12)
+    return h, seg
+
+
+def minhash_signatures(texts: List[str], num_perm: int = NUM_PERM,
+                       shingle: int = SHINGLE_SIZE, seed: int = 1) -> np.ndarray:
+    """
+    (len(texts), num_perm) MinHash signatures over character shingles. Each
+    permutation is a multiply-shift hash ((a*x + b) mod 2**64) >> 32.
+    """
+    rng = np.random.default_rng(seed)
+    a   = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b   = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+    sig = np.empty((len(texts), num_perm), dtype=np.uint32)
+
+    # chunk by text so each chunk holds about SIG_CHUNK shingles; one
+    # permutation at a time keeps the working set in cache
+    lo = 0
+    approx = np.array([max(len(t) - shingle + 1, 1) for t in texts], dtype=np.int64)
+    bounds = np.cumsum(approx)
+    while lo < len(texts):
+        budget = (bounds[lo - 1] if lo else 0) + SIG_CHUNK
+        hi     = max(int(np.searchsorted(bounds, budget, side="right")), lo + 1)
+        h, seg = _shingle_hashes(texts[lo:hi], shingle)
+        for p in range(num_perm):
+            perm = ((a[p] * h + b[p]) >> _SHIFT32).astype(np.uint32)
+            sig[lo:hi, p] = np.minimum.reduceat(perm, seg)
+        lo = hi
+    return sig
+
+
+def _lsh_params(threshold: float, num_perm: int):
+    """(bands, rows) with rows * bands == num_perm and the LSH S-curve knee just below `threshold`."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        knee  = (1.0 / bands) ** (1.0 / rows)
+        if knee <= threshold and (best is None or knee > best[2]):
+            best = (bands, rows, knee)
+    return best[:2] if best else (num_perm, 1)
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+class NearDuplicateClusters:
+    """
+    Near-duplicate clustering of a list of texts.
+
+    Texts are normalized (case, punctuation, whitespace) and exact repeats
+    collapsed; the remaining unique texts get MinHash signatures, and LSH
+    banding proposes candidates. Within each band bucket every member is
+    compared to the bucket's first text and joined to its cluster when the
+    estimated Jaccard similarity is at least `threshold`. Work is linear in
+    the number of texts (times the number of bands), never pairwise.
+
+    `rep[i]` is the index of the text that represents text i (the first
+    text of its cluster in input order); `representatives` lists them.
+    """
+
+    def __init__(self, texts: List[str], threshold: float = DEDUP_THRESHOLD,
+                 num_perm: int = NUM_PERM, shingle: int = SHINGLE_SIZE, seed: int = 1):
+        self.threshold = threshold
+        norm    = [normalize_for_dedup(t) for t in texts]
+        first   = {}
+        uniq_of = np.fromiter((first.setdefault(t, len(first)) for t in norm),
+                              dtype=np.int64, count=len(norm))
+        uniq    = list(first)
+
+        parent = np.arange(len(uniq))
+        if len(uniq) > 1:
+            sig          = minhash_signatures(uniq, num_perm, shingle, seed)
+            bands, rows  = _lsh_params(threshold, num_perm)
+            mult         = np.random.default_rng(seed + 1).integers(1, 1 << 62, size=rows, dtype=np.uint64) | np.uint64(1)
+            nonempty     = np.array([bool(t) for t in uniq])
+            for band in range(bands):
+                block = sig[:, band * rows:(band + 1) * rows].astype(np.uint64)
+                keys  = (block * mult).sum(axis=1)
+                order = np.argsort(keys, kind="stable")
+                ks    = keys[order]
+                new   = np.concatenate(([True], ks[1:] != ks[:-1]))
+                heads = order[np.maximum.accumulate(np.where(new, np.arange(len(order)), 0))]
+                cand  = (heads != order) & nonempty[order] & nonempty[heads]
+                m, h  = order[cand], heads[cand]
+                if not len(m):
+                    continue
+                sim = (sig[m] == sig[h]).mean(axis=1)
+                for i, j in zip(m[sim >= threshold], h[sim >= threshold]):
+                    ri, rj = _find(parent, i), _find(parent, j)
+                    if ri != rj:
+                        parent[max(ri, rj)] = min(ri, rj)
+            roots = np.array([_find(parent, i) for i in range(len(uniq))], dtype=np.int64)
+        else:
+            roots = parent
+
+        # representative = first input index whose unique text belongs to the cluster root
+        first_idx = np.full(len(uniq), len(texts), dtype=np.int64)
+        np.minimum.at(first_idx, uniq_of, np.arange(len(texts)))
+        root_first = np.full(len(uniq), len(texts), dtype=np.int64)
+        np.minimum.at(root_first, roots, first_idx)
+
+        self.n_texts         = len(texts)
+        self.n_exact_unique  = len({str(t).strip() for t in texts})
+        self.rep             = root_first[roots[uniq_of]] if len(texts) else np.zeros(0, dtype=np.int64)
+        self.representatives = np.unique(self.rep)
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.representatives)
+
+    def calls_saved(self) -> int:
+        """Scoring calls avoided compared with the exact-text cache key."""
+        return self.n_exact_unique - self.n_clusters
+
+    def report(self) -> str:
+        return (f"Near-duplicate clustering @ {self.threshold:g}: {self.n_texts} texts, "
+                f"{self.n_exact_unique} distinct, {self.n_clusters} clusters "
+                f"-> {self.calls_saved()} scoring calls saved")
+
+
+# ─── Benchmark ─────────────────────────────────────────────────────────────────
+
+def _synthetic_texts(n_base: int, seed: int = 0):
+    """
+    `n_base` distinct random headlines followed by a case/punctuation
+    variant and a trailing-word variant of each. Returns (texts, base index
+    of every text).
+    """
+    rng    = np.random.default_rng(seed)
+    vocab  = np.array(["".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), rng.integers(3, 9)))
+                       for _ in range(20_000)])
+    base   = [" ".join(vocab[rng.integers(0, len(vocab), rng.integers(8, 15))]) for _ in range(n_base)]
+    punct  = [t.upper().replace(" ", ", ", 1) + "!" for t in base]
+    suffix = [f"{t} {vocab[rng.integers(0, len(vocab))]}" for t in base]
+    return base + punct + suffix, np.tile(np.arange(n_base), 3)
+
+
+def benchmark(n_base: int = 50_000, threshold: float = DEDUP_THRESHOLD, seed: int = 0,
+              path: str = os.path.join("data", "clean_data.csv")) -> pd.DataFrame:
+    """
+    Throughput and quality on synthetic near-duplicates (3 * `n_base`
+    texts): seconds, texts/s, recall of the case/punctuation and
+    trailing-word variants, false merges of distinct headlines and calls
+    saved; plus the calls saved on the texts in `path`, if it exists.
+    """
+    texts, group = _synthetic_texts(n_base, seed)
+    t0  = time.perf_counter()
+    cl  = NearDuplicateClusters(texts, threshold)
+    sec = time.perf_counter() - t0
+    rep_of_base = cl.rep[:n_base]
+    rows = [{
+        "corpus":        f"synthetic x{len(texts)}",
+        "texts":         len(texts),
+        "seconds":       round(sec, 2),
+        "texts_per_s":   round(len(texts) / sec),
+        "recall_punct":  (cl.rep[n_base:2 * n_base] == rep_of_base).mean(),
+        "recall_suffix": (cl.rep[2 * n_base:] == rep_of_base).mean(),
+        "false_merges":  n_base - len(np.unique(rep_of_base)),
+        "calls_saved":   cl.calls_saved(),
+    }]
+    if os.path.exists(path):
+        real = pd.read_csv(path)["text"].fillna("").astype(str).tolist()
+        for th in sorted({threshold, 0.6}):
+            t0 = time.perf_counter()
+            cl = NearDuplicateClusters(real, th)
+            rows.append({"corpus": f"{os.path.basename(path)} @ {th:g}", "texts": len(real),
+                         "seconds": round(time.perf_counter() - t0, 2),
+                         "calls_saved": cl.calls_saved()})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate clustering: throughput and calls saved.")
+    parser.add_argument("--benchmark", action="store_true", help="run the benchmark (the default)")
+    parser.add_argument("--n", type=int, default=50_000, help="distinct synthetic headlines (x3 texts)")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    args = parser.parse_args()
+    print(benchmark(args.n, args.threshold).to_string(index=False))
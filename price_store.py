@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import random
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yfinance as yf
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+PRICE_DIR       = os.getenv("PRICE_STORE_DIR", os.path.join("data", "prices"))
+PRICE_COLUMNS   = ["open", "high", "low", "close", "volume"]
+OFFLINE         = os.getenv("PRICE_STORE_OFFLINE", "") not in ("", "0")
+DOWNLOAD_CHUNK   = 200     # tickers per yf.download call
+DOWNLOAD_THREADS = 16      # concurrent symbol requests inside one call
+DOWNLOAD_RETRIES = 2       # extra rounds for tickers that failed
+BACKOFF_BASE     = 1.0     # seconds; doubled per round, full jitter
+BACKOFF_MAX      = 30.0
+_COVERAGE_KEY   = b"price_store.coverage"
+
+
+def _day(value) -> date:
+    return pd.Timestamp(value).date()
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=np.float64) for c in PRICE_COLUMNS},
+                        index=pd.DatetimeIndex([], name="date"))
+
+
+def normalize_prices(hist: pd.DataFrame) -> pd.DataFrame:
+    """
+    yfinance OHLCV → float64 `PRICE_COLUMNS` on a tz-naive, sorted, unique
+    daily index (the exchange's trading date), with incomplete rows dropped.
+    """
+    if hist is None or hist.empty:
+        return _empty()
+    df  = hist.rename(columns=str.lower)[PRICE_COLUMNS].astype(np.float64).dropna()
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    df.index = idx.normalize().rename("date")
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df
+
+
+def _download_chunk(tickers: List[str], start: str, end: str, threads: int) -> Dict[str, pd.DataFrame]:
+    """One threaded yf.download; {ticker: frame} for the tickers that came back with bars."""
+    raw = yf.download(tickers, start=start, end=end, group_by="ticker", auto_adjust=False,
+                      threads=max(1, min(threads, len(tickers))), progress=False)
+    if raw is None or raw.empty:
+        return {}
+    out = {}
+    if isinstance(raw.columns, pd.MultiIndex):
+        # yfinance keys the columns by the upper-cased symbol
+        level = set(raw.columns.get_level_values(0))
+        for ticker in tickers:
+            key = ticker if ticker in level else ticker.upper()
+            if key in level:
+                out[ticker] = normalize_prices(raw[key])
+    elif len(tickers) == 1:
+        out[tickers[0]] = normalize_prices(raw)
+    return {t: f for t, f in out.items() if not f.empty}
+
+
+def _download_isolated(tickers: List[str], start: str, end: str, threads: int) -> Dict[str, pd.DataFrame]:
+    """`_download_chunk`, bisecting a call that raises until the failure is pinned to single symbols."""
+    try:
+        return _download_chunk(tickers, start, end, threads)
+    except Exception as exc:
+        if len(tickers) == 1:
+            print(f"Price download {start}..{end} failed for {tickers[0]}: {exc}")
+            return {}
+    mid = len(tickers) // 2
+    return {**_download_isolated(tickers[:mid], start, end, threads),
+            **_download_isolated(tickers[mid:], start, end, threads)}
+
+
+def download_prices(tickers: List[str], start: str, end: str, chunk_size: int = DOWNLOAD_CHUNK,
+                    retries: int = DOWNLOAD_RETRIES,
+                    threads: int = DOWNLOAD_THREADS) -> Dict[str, pd.DataFrame]:
+    """
+    Bulk OHLCV for `tickers` over [start, end) in a few threaded yf.download
+    calls of up to `chunk_size` tickers each. Returns {ticker: frame} for
+    the tickers that came back with data.
+
+    Failures are per ticker: a call that raises is split in halves until
+    the bad symbols are isolated, and tickers that come back missing or
+    empty are retried (together) up to `retries` more times after a
+    backoff, so one bad symbol or a throttled request cannot sink the rest
+    of the universe.
+    """
+    frames, pending = {}, list(dict.fromkeys(tickers))
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))))
+        for i in range(0, len(pending), chunk_size):
+            frames.update(_download_isolated(pending[i:i + chunk_size], start, end, threads))
+        pending = [t for t in pending if t not in frames]
+        if not pending:
+            break
+    return frames
+
+
+class PriceStore:
+    """
+    Local per-ticker OHLCV store: one Parquet file per ticker under `root`,
+    with the covered date range [start, end) kept in the file's metadata.
+
+    A request is served from disk; only the missing edges of the covered
+    range are downloaded (before its start, after its end), and the gaps of
+    all tickers in one `get_many` call that share the same missing range go
+    out together through `download_prices` (a few chunked, threaded calls
+    with per-ticker retries); weekend-only gaps are not fetched. Coverage
+    never extends past today, so later requests pick up new bars. Files
+    are replaced atomically, so concurrent processes never read a
+    half-written file.
+
+    Frames are kept in memory once loaded and returned as positional slices
+    (views, no copy). With `offline=True` nothing is downloaded: only what
+    is already on disk (e.g. test fixtures) is served.
+    """
+
+    def __init__(self, root: str = PRICE_DIR, offline: bool = OFFLINE, downloader=None):
+        self.root       = root
+        self.offline    = offline
+        self.downloader = downloader or download_prices
+        self._frames    = {}     # ticker -> (frame, (cov_start, cov_end) or None)
+        self._tried     = set()  # (ticker, gap) already requested by this process
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.replace('/', '_')}.parquet")
+
+    # --- disk -----------------------------------------------------------------
+    def _load(self, ticker: str):
+        if ticker not in self._frames:
+            path = self._path(ticker)
+            if os.path.exists(path):
+                table    = pq.read_table(path)
+                meta     = (table.schema.metadata or {}).get(_COVERAGE_KEY)
+                coverage = tuple(_day(d) for d in json.loads(meta)) if meta else None
+                frame    = table.to_pandas()
+                self._frames[ticker] = (frame, coverage)
+            else:
+                self._frames[ticker] = (_empty(), None)
+        return self._frames[ticker]
+
+    def _save(self, ticker: str, frame: pd.DataFrame, coverage):
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        meta  = dict(table.schema.metadata or {})
+        if coverage:
+            meta[_COVERAGE_KEY] = json.dumps([d.isoformat() for d in coverage]).encode()
+        path = self._path(ticker)
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table.replace_schema_metadata(meta), tmp)
+        os.replace(tmp, path)
+        self._frames[ticker] = (frame, coverage)
+
+    def put(self, ticker: str, hist: pd.DataFrame, start=None, end=None):
+        """
+        Merge `hist` into the store (e.g. fixtures for offline runs). The
+        covered range becomes [start, end), by default the span of the bars.
+        """
+        frame, coverage = self._load(ticker)
+        new   = normalize_prices(hist)
+        merged = pd.concat([frame, new]) if len(frame) else new
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        if start is None or end is None:
+            if new.empty:
+                return
+            start = start or new.index[0]
+            end   = end or new.index[-1] + pd.Timedelta(days=1)
+        span = (_day(start), _day(end))
+        if coverage:
+            span = (min(span[0], coverage[0]), max(span[1], coverage[1]))
+        self._save(ticker, merged, span)
+
+    # --- gaps -----------------------------------------------------------------
+    def missing(self, ticker: str, start, end) -> List[Tuple[date, date]]:
+        """Date ranges [s, e) that must be downloaded to cover [start, end)."""
+        start, end = _day(start), min(_day(end), _today() + timedelta(days=1))
+        if start >= end:
+            return []
+        _, coverage = self._load(ticker)
+        if not coverage:
+            return [(start, end)]
+        gaps = []
+        if start < coverage[0]:
+            gaps.append((start, coverage[0]))
+        if end > coverage[1]:
+            gaps.append((coverage[1], end))
+        return gaps
+
+    def _fill(self, gaps: Dict[Tuple[date, date], List[str]]):
+        """Download each distinct gap once for all its tickers and merge the bars in."""
+        for (s, e), tickers in gaps.items():
+            if not np.busday_count(s, e):
+                # weekend-only edge: nothing to fetch, the range is covered as is
+                for ticker in tickers:
+                    self.put(ticker, _empty(), s, min(e, _today()))
+                continue
+            try:
+                fetched = self.downloader(sorted(tickers), s.isoformat(), e.isoformat())
+            except Exception as exc:
+                print(f"Price download {s}..{e} failed for {len(tickers)} tickers: {exc}")
+                continue
+            for ticker in tickers:
+                if ticker not in fetched:
+                    print(f"No prices returned for {ticker} {s}..{e}")
+                    continue
+                # the covered range stops at today: today's bar may still change
+                self.put(ticker, fetched[ticker], s, min(e, _today()))
+
+    # --- reads ----------------------------------------------------------------
+    def _slice(self, ticker: str, start, end) -> pd.DataFrame:
+        frame, _ = self._load(ticker)
+        idx = frame.index.values
+        lo  = np.searchsorted(idx, np.datetime64(_day(start), "ns"), side="left")
+        hi  = np.searchsorted(idx, np.datetime64(_day(end), "ns"), side="left")
+        return frame.iloc[lo:hi]
+
+    def get_many(self, tickers: Iterable[str], start, end) -> Dict[str, pd.DataFrame]:
+        """{ticker: OHLCV over [start, end)}, downloading missing edges in bulk first."""
+        tickers = list(dict.fromkeys(tickers))
+        if not self.offline:
+            gaps = {}
+            for ticker in tickers:
+                for gap in self.missing(ticker, start, end):
+                    if (ticker, gap) not in self._tried:
+                        self._tried.add((ticker, gap))
+                        gaps.setdefault(gap, []).append(ticker)
+            self._fill(gaps)
+        return {t: self._slice(t, start, end) for t in tickers}
+
+    def get(self, ticker: str, start, end) -> pd.DataFrame:
+        return self.get_many([ticker], start, end)[ticker]
+
+    def coverage(self, ticker: str):
+        return self._load(ticker)[1]
+
+
+@lru_cache(maxsize=None)
+def default_store() -> PriceStore:
+    """
+    The process-wide store over PRICE_DIR (PRICE_STORE_DIR to point it at
+    fixtures; offline if PRICE_STORE_OFFLINE is set).
+    """
+    return PriceStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the local price store.")
+    parser.add_argument("tickers", nargs="*", help="tickers (default: all tickers in data/signals_*d.csv)")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    args = parser.parse_args()
+
+    tickers = args.tickers
+    if not tickers:
+        tickers = sorted({t for w in (1, 3, 5) if os.path.exists(f"data/signals_{w}d.csv")
+                          for t in pd.read_csv(f"data/signals_{w}d.csv", usecols=["ticker"])["ticker"]})
+    frames = default_store().get_many(tickers, args.start, args.end)
+    print(f"{sum(not f.empty for f in frames.values())}/{len(tickers)} tickers with prices in {PRICE_DIR}")
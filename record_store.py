@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone, timedelta
+
+import pandas as pd
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+STORE_DIR       = os.path.join("data", "store")
+STORE_COLUMNS   = ["record_id", "timestamp", "ticker", "source", "text", "url"]
+WATERMARK_GRACE = timedelta(days=2)  # late arrivals still merged behind a watermark
+
+
+def source_family(source: str) -> str:
+    """Collapse a record's `source` to the fetcher it came from."""
+    source = str(source)
+    if source.startswith("reddit.com/"):
+        return "reddit"
+    if source.startswith("SEC-EDGAR"):
+        return "sec"
+    return "yahoo"
+
+
+def record_ids(df: pd.DataFrame) -> pd.Series:
+    """Stable content key per record: sha1 of timestamp, ticker, source and text."""
+    ts   = df["timestamp"].map(lambda t: t.isoformat())
+    cols = [ts] + [df[c].fillna("").astype(str) for c in ("ticker", "source", "text")]
+    keys = cols[0].str.cat(cols[1:], sep="\x1f")
+    return keys.map(lambda k: hashlib.sha1(k.encode("utf-8")).hexdigest())
+
+
+class RecordStore:
+    """
+    Append-only, date-partitioned store of fetched records.
+
+      <root>/date=YYYY-MM-DD/part-<run>.csv   records whose timestamp falls on that UTC day
+      <root>/_watermarks.json                 newest timestamp stored per source family
+
+    Part files are only ever added, never rewritten; a run dedups its batch
+    against the partitions it touches and writes the remainder as new parts.
+    Retention is applied when reading (`view`), not by deleting data.
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # --- watermarks ---------------------------------------------------------
+    @property
+    def _watermark_path(self) -> str:
+        return os.path.join(self.root, "_watermarks.json")
+
+    def watermarks(self) -> dict:
+        """Source family -> newest stored timestamp."""
+        try:
+            with open(self._watermark_path) as f:
+                return {k: pd.Timestamp(v) for k, v in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_watermarks(self, marks: dict):
+        tmp = f"{self._watermark_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({k: v.isoformat() for k, v in marks.items()}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self._watermark_path)
+
+    # --- partitions ---------------------------------------------------------
+    def _partition_dir(self, day) -> str:
+        return os.path.join(self.root, f"date={day.isoformat()}")
+
+    def _days(self) -> list:
+        days = []
+        for name in os.listdir(self.root):
+            if name.startswith("date="):
+                days.append(datetime.strptime(name[5:], "%Y-%m-%d").date())
+        return sorted(days)
+
+    def _read_partition(self, day, usecols=None) -> pd.DataFrame:
+        d = self._partition_dir(day)
+        if not os.path.isdir(d):
+            return pd.DataFrame(columns=usecols or STORE_COLUMNS)
+        parts = [pd.read_csv(os.path.join(d, fn), usecols=usecols)
+                 for fn in sorted(os.listdir(d)) if fn.endswith(".csv")]
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=usecols or STORE_COLUMNS)
+
+    def read(self, start=None, end=None) -> pd.DataFrame:
+        """All stored records with start <= timestamp < end (either bound optional)."""
+        days = [d for d in self._days()
+                if (start is None or d >= start.date()) and (end is None or d <= end.date())]
+        frames = [self._read_partition(d) for d in days]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+        df["text"]      = df["text"].fillna("")  # CSV reads '' back as NaN
+        if start is not None:
+            df = df[df["timestamp"] >= start]
+        if end is not None:
+            df = df[df["timestamp"] < end]
+        return df.sort_values("timestamp")
+
+    def view(self, days: int, now: datetime = None) -> pd.DataFrame:
+        """Retention window: records from the last `days` days."""
+        now = now or datetime.now(timezone.utc)
+        return self.read(start=now - timedelta(days=days))
+
+    # --- ingest -------------------------------------------------------------
+    def append(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Merge a fetched batch and return only the records that were new (the
+        delta), with a `record_id` column. Records older than their source's
+        watermark minus WATERMARK_GRACE are treated as already seen.
+        """
+        if df.empty:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        batch = df.copy()
+        for c in STORE_COLUMNS[2:]:
+            if c not in batch:
+                batch[c] = None
+        batch["timestamp"] = pd.to_datetime(batch["timestamp"], utc=True, errors="coerce")
+        batch = batch.dropna(subset=["timestamp"])
+        batch["record_id"] = record_ids(batch)
+        batch = batch.drop_duplicates("record_id")[STORE_COLUMNS]
+
+        marks  = self.watermarks()
+        family = batch["source"].map(source_family)
+        stale  = pd.Series(False, index=batch.index)
+        for fam, mark in marks.items():
+            stale |= (family == fam) & (batch["timestamp"] < mark - WATERMARK_GRACE)
+        batch  = batch[~stale]
+
+        run    = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        delta  = []
+        for day, rows in batch.groupby(batch["timestamp"].dt.date):
+            seen = set(self._read_partition(day, usecols=["record_id"])["record_id"])
+            new  = rows[~rows["record_id"].isin(seen)]
+            if new.empty:
+                continue
+            d = self._partition_dir(day)
+            os.makedirs(d, exist_ok=True)
+            new.to_csv(os.path.join(d, f"part-{run}.csv"), index=False)
+            delta.append(new)
+
+        if not delta:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        delta = pd.concat(delta, ignore_index=True).sort_values("timestamp")
+        for fam, ts in delta.groupby(delta["source"].map(source_family))["timestamp"].max().items():
+            marks[fam] = max(ts, marks[fam]) if fam in marks else ts
+        self._save_watermarks(marks)
+        return delta
@@ -0,0 +1,284 @@
+import os
+import re
+import time
+import zlib
+import argparse
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+LOCAL_MODEL_PATH  = os.path.join("data", "local_sentiment.npz")
+N_FEATURES        = 2 ** 18        # hashed unigram + bigram space
+LEXICON_WEIGHT    = 0.5            # prior weight of a lexicon word
+CONF_SCALE        = 0.3            # |score| at which the local model is fully confident
+CASCADE_THRESHOLD = 0.5            # escalate texts whose confidence is below this
+SIGNAL_BAND       = 0.1            # Long/Short/Neutral cut used by signals.py
+
+# Finance-tuned seed lexicon (a small subset in the spirit of Loughran-McDonald)
+POSITIVE_WORDS = """
+beat beats beating exceed exceeds exceeded outperform outperforms outperformed
+surge surges surged soar soars soared rally rallies rallied jump jumps jumped
+gain gains gained rise rises rising rose climb climbs climbed boost boosts boosted
+record strong stronger strongest robust growth grow grows growing grew expand expands
+expansion profit profits profitable profitability upgrade upgrades upgraded
+bullish buy buys raise raises raised hike top tops win wins won winner winners
+improve improves improved improvement accelerate accelerating momentum upside
+opportunity opportunities optimistic positive favorable attractive undervalued
+dividend dividends buyback repurchase approval approved partnership breakthrough
+""".split()
+
+NEGATIVE_WORDS = """
+miss misses missed fall falls fell falling drop drops dropped plunge plunges plunged
+slump slumps slumped sink sinks sank tumble tumbles tumbled crash crashes crashed
+decline declines declined declining loss losses lose loses losing lost weak weaker
+weakness downgrade downgrades downgraded bearish sell selloff sells cut cuts cutting
+layoff layoffs lawsuit lawsuits sue sued fraud probe investigation investigations
+subpoena bankruptcy default defaults impairment restatement resign resigns resigned
+warn warns warning warnings recall recalls risk risks risky concern concerns worry
+worries fear fears pressure pressured headwind headwinds slowdown slow slowing
+disappoint disappoints disappointing disappointed overvalued negative volatile
+halt halted delist delisted penalty fine fined breach shortfall dilution
+""".split()
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?|\d+(?:\.\d+)?%?")
+
+
+class Scorer(ABC):
+    """
+    Sentiment backend interface. `score_with_confidence` returns scores in
+    [-1, 1] and confidences in [0, 1], both aligned with the input texts.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def score_with_confidence(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        return self.score_with_confidence(texts)[0]
+
+
+# ─── Local hashed linear model ─────────────────────────────────────────────────
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word/number tokens plus adjacent-pair bigrams."""
+    words = _TOKEN_RE.findall(str(text).lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashedLinearScorer(Scorer):
+    """
+    Offline scorer: a linear model over hashed unigrams and bigrams.
+
+    Each text becomes a sparse binary vector (scaled by 1/sqrt(#features));
+    the score is its dot product with `weights`, clipped to [-1, 1]. Weights
+    start from the seed lexicon and can be refit against LLM-scored texts
+    with `fit` (ridge regression towards the lexicon prior). Confidence is
+    0 when no known feature fires and otherwise grows with |score| up to
+    CONF_SCALE.
+    """
+
+    name = "local"
+
+    def __init__(self, weights: np.ndarray = None, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self._index     = {}
+        self.weights    = weights if weights is not None else self.lexicon_prior()
+
+    def _hash(self, token: str) -> int:
+        idx = self._index.get(token)
+        if idx is None:
+            idx = self._index[token] = zlib.crc32(token.encode("utf-8")) % self.n_features
+        return idx
+
+    def lexicon_prior(self) -> np.ndarray:
+        w = np.zeros(self.n_features, dtype=np.float64)
+        for word in POSITIVE_WORDS:
+            w[self._hash(word)] = LEXICON_WEIGHT
+        for word in NEGATIVE_WORDS:
+            w[self._hash(word)] = -LEXICON_WEIGHT
+        return w
+
+    def featurize(self, texts: List[str]):
+        """CSR-style (indices, indptr, data) arrays for the texts."""
+        indices, indptr, data = [], [0], []
+        for text in texts:
+            cols = sorted({self._hash(t) for t in tokenize(text)})
+            indices.extend(cols)
+            indptr.append(len(indices))
+            data.extend([1.0 / np.sqrt(len(cols))] * len(cols) if cols else [])
+        return (np.asarray(indices, dtype=np.int64),
+                np.asarray(indptr, dtype=np.int64),
+                np.asarray(data, dtype=np.float64))
+
+    @staticmethod
+    def _rows(indptr: np.ndarray) -> np.ndarray:
+        return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+    def _predict(self, X, w: np.ndarray) -> np.ndarray:
+        indices, indptr, data = X
+        return np.bincount(self._rows(indptr), weights=w[indices] * data, minlength=len(indptr) - 1)
+
+    def score_with_confidence(self, texts: List[str]):
+        X       = self.featurize(texts)
+        indices, indptr, _ = X
+        raw     = self._predict(X, self.weights)
+        hits    = np.bincount(self._rows(indptr), weights=(self.weights[indices] != 0).astype(float),
+                              minlength=len(indptr) - 1)
+        scores  = np.clip(raw, -1.0, 1.0)
+        conf    = np.where(hits > 0, np.minimum(1.0, np.abs(scores) / CONF_SCALE), 0.0)
+        return scores, conf
+
+    def fit(self, texts: List[str], y, l2: float = 1.0, iters: int = 200, tol: float = 1e-6):
+        """
+        Ridge regression towards the lexicon prior, solved with conjugate
+        gradients on the sparse normal equations (NumPy only).
+        """
+        X                  = self.featurize(texts)
+        indices, indptr, data = X
+        rows               = self._rows(indptr)
+        prior              = self.lexicon_prior()
+        y                  = np.asarray(y, dtype=np.float64)
+
+        def Xt(u):
+            return np.bincount(indices, weights=data * u[rows], minlength=self.n_features)
+
+        def A(v):
+            return Xt(self._predict(X, v)) + l2 * v
+
+        v = np.zeros(self.n_features)
+        r = Xt(y - self._predict(X, prior))
+        p, rs = r.copy(), r @ r
+        for _ in range(iters):
+            if rs <= tol:
+                break
+            Ap    = A(p)
+            alpha = rs / (p @ Ap)
+            v    += alpha * p
+            r    -= alpha * Ap
+            rs_new = r @ r
+            p     = r + (rs_new / rs) * p
+            rs    = rs_new
+        self.weights = prior + v
+        return self
+
+    def save(self, path: str = LOCAL_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        nz = np.flatnonzero(self.weights)
+        np.savez_compressed(path, n_features=self.n_features, idx=nz, w=self.weights[nz])
+
+    @classmethod
+    def load(cls, path: str = LOCAL_MODEL_PATH):
+        """Fitted model from `path`, or the lexicon-only model if there is none."""
+        if not os.path.exists(path):
+            return cls()
+        f = np.load(path)
+        w = np.zeros(int(f["n_features"]))
+        w[f["idx"]] = f["w"]
+        return cls(w, int(f["n_features"]))
+
+
+# ─── Cascade ───────────────────────────────────────────────────────────────────
+
+class CascadeScorer(Scorer):
+    """
+    Score everything locally and send only texts whose local confidence is
+    below `threshold` to the `remote` scorer, whose answers are taken as
+    fully confident.
+    """
+
+    name = "cascade"
+
+    def __init__(self, local: Scorer, remote: Scorer, threshold: float = CASCADE_THRESHOLD):
+        self.local     = local
+        self.remote    = remote
+        self.threshold = threshold
+        self.escalated = 0
+
+    def score_with_confidence(self, texts: List[str]):
+        scores, conf = self.local.score_with_confidence(texts)
+        unsure = np.flatnonzero(conf < self.threshold)
+        self.escalated = len(unsure)
+        if len(unsure):
+            remote = self.remote.score([texts[i] for i in unsure])
+            scores = scores.copy()
+            conf   = conf.copy()
+            scores[unsure] = remote
+            conf[unsure]   = 1.0
+        print(f"Cascade: {len(texts) - len(unsure)} scored locally, {len(unsure)} escalated")
+        return scores, conf
+
+
+# ─── Agreement benchmark ───────────────────────────────────────────────────────
+
+def _bucket(x: np.ndarray) -> np.ndarray:
+    return np.where(x > SIGNAL_BAND, 1, np.where(x < -SIGNAL_BAND, -1, 0))
+
+
+def agreement(pred: np.ndarray, ref: np.ndarray) -> dict:
+    """Agreement of predicted vs reference scores."""
+    pred, ref = np.asarray(pred, float), np.asarray(ref, float)
+    corr = np.corrcoef(pred, ref)[0, 1] if pred.std() > 0 and ref.std() > 0 else np.nan
+    return {
+        "pearson":      corr,
+        "mae":          np.abs(pred - ref).mean(),
+        "bucket_agree": (_bucket(pred) == _bucket(ref)).mean(),
+        "sign_agree":   (np.sign(pred) == np.sign(ref)).mean(),
+    }
+
+
+def benchmark(path: str = os.path.join("data", "sentiment_scored.csv"),
+              score_col: str = "SentimentScore", folds: int = 5,
+              thresholds=(0.25, 0.5, 0.75, 1.0), seed: int = 0) -> pd.DataFrame:
+    """
+    Agreement of the local backends with the LLM labels in `path`. The fitted
+    model is evaluated out-of-fold (k-fold); cascade rows assume escalated
+    texts get the LLM label, so they show agreement vs. the share of API calls kept.
+    """
+    df     = pd.read_csv(path).dropna(subset=[score_col])
+    texts  = df["text"].astype(str).tolist()
+    y      = df[score_col].to_numpy(float)
+    folds_ = np.random.default_rng(seed).permutation(len(df)) % folds
+
+    t0 = time.perf_counter()
+    lex_scores, lex_conf = HashedLinearScorer().score_with_confidence(texts)
+    lex_secs = time.perf_counter() - t0
+
+    oof_scores, oof_conf = np.zeros(len(df)), np.zeros(len(df))
+    for k in range(folds):
+        train, test = folds_ != k, folds_ == k
+        model = HashedLinearScorer().fit([t for t, m in zip(texts, train) if m], y[train])
+        s, c  = model.score_with_confidence([t for t, m in zip(texts, test) if m])
+        oof_scores[test], oof_conf[test] = s, c
+
+    rows = [
+        {"backend": "lexicon", "escalated": 0.0, "texts_per_s": len(texts) / lex_secs,
+         **agreement(lex_scores, y)},
+        {"backend": f"hashed-linear ({folds}-fold)", "escalated": 0.0, **agreement(oof_scores, y)},
+    ]
+    for th in thresholds:
+        unsure = oof_conf < th
+        mixed  = np.where(unsure, y, oof_scores)
+        rows.append({"backend": f"cascade@{th:g}", "escalated": unsure.mean(), **agreement(mixed, y)})
+    return pd.DataFrame(rows, columns=["backend", "escalated", "texts_per_s",
+                                       "pearson", "mae", "bucket_agree", "sign_agree"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local sentiment model: fit and benchmark.")
+    parser.add_argument("--fit", action="store_true",
+                        help=f"fit the hashed model on data/sentiment_scored.csv and save it to {LOCAL_MODEL_PATH}")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="report agreement with the LLM scores in data/sentiment_scored.csv")
+    args = parser.parse_args()
+
+    if args.fit:
+        df = pd.read_csv(os.path.join("data", "sentiment_scored.csv")).dropna(subset=["SentimentScore"])
+        HashedLinearScorer().fit(df["text"].astype(str).tolist(), df["SentimentScore"]).save()
+        print(f"Saved local model fitted on {len(df)} texts to {LOCAL_MODEL_PATH}")
+    if args.benchmark or not args.fit:
+        print(benchmark().to_string(index=False, float_format=lambda x: f"{x:.3f}"))
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+SEARCH_DB       = os.path.join("data", "search_cache.sqlite")
+SQL_BATCH       = 500     # keys per SELECT ... IN (...)
+BUSY_TIMEOUT_MS = 30000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key     TEXT PRIMARY KEY,
+    params  TEXT NOT NULL,
+    row     TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def result_key(params: dict, *fingerprints: str) -> str:
+    """sha256 of the canonical JSON of `params` plus the input fingerprints."""
+    basis = "\x1f".join((json.dumps(params, sort_keys=True),) + fingerprints)
+    return hashlib.sha256(basis.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    Persistent memo of evaluated search configurations in SQLite (WAL mode).
+
+    Each backtest result row is stored under `result_key(params, signals
+    fingerprint, prices fingerprint)` the moment it finishes, so an
+    interrupted search loses nothing, and a rerun over a larger grid only
+    evaluates the configurations it has not seen on the same inputs.
+    """
+
+    def __init__(self, path: str = SEARCH_DB):
+        self.path   = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, dict]:
+        """{key: result row} for the keys that are stored."""
+        keys, found = list(dict.fromkeys(keys)), {}
+        conn = self._conn()
+        for i in range(0, len(keys), SQL_BATCH):
+            chunk = keys[i:i + SQL_BATCH]
+            rows  = conn.execute(
+                f"SELECT key, row FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, row in rows:
+                found[key] = json.loads(row)
+        return found
+
+    def put(self, key: str, params: dict, row: dict):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(params, sort_keys=True), json.dumps(row), time.time()))
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
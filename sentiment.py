@@ -1,83 +1,369 @@
 import os
+import re
 import json
 import time
+import argparse
 from typing import List
 from dotenv import load_dotenv
 import openai
+import numpy as np
 import pandas as pd
 
+from sentiment_engine import CompletionEngine
+from sentiment_cache import SentimentCache, normalize_text
+from near_duplicates import NearDuplicateClusters
+from scorers import Scorer, HashedLinearScorer, CascadeScorer, CASCADE_THRESHOLD
+from artifact_store import save_artifact
+
 # Load environment variables and set API key
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Caching file for sentiment calls
-CACHE_FILE = os.path.join("data", "sentiment_cache.json")
-
-# Ensure cache exists
-if not os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, 'w') as f:
-        json.dump({}, f)
+# Sentiment cache; bump PROMPT_VERSION whenever a prompt changes so old
+# scores are not reused for the new prompt
+MODEL          = "gpt-3.5-turbo"
+PROMPT_VERSION = "v1"
+CACHE_DB       = os.path.join("data", "sentiment_cache.sqlite")
+LEGACY_CACHE   = os.path.join("data", "sentiment_cache.json")
 
-# Load cache
-with open(CACHE_FILE, 'r') as f:
-    _cache = json.load(f)
+# Batched scoring: texts are packed into one request until the prompt reaches
+# roughly BATCH_TOKEN_BUDGET tokens (estimated at CHARS_PER_TOKEN) or
+# BATCH_MAX_TEXTS texts; texts longer than BATCH_MAX_TEXT_CHARS are truncated.
+BATCH_TOKEN_BUDGET   = 3000
+BATCH_MAX_TEXTS      = 50
+BATCH_MAX_TEXT_CHARS = 2000
+CHARS_PER_TOKEN      = 4
 
+cache = SentimentCache(CACHE_DB, MODEL, PROMPT_VERSION)
+cache.migrate_json(LEGACY_CACHE)
 
-def get_sentiment(text: str) -> float:
-    """
-    Returns a sentiment score between -1 (negative) and +1 (positive) for the given text.
-    Caches results in sentiment_cache.json to avoid duplicate API calls.
-    """
-    key = text.strip()
-    if key in _cache:
-        return _cache[key]
 
-    # Build prompt
-    prompt = (
+def _single_prompt(text: str) -> str:
+    return (
         "On a scale from -1 to 1, rate the sentiment of the following text. "
         "Return only the number.\n\n"
         f"Text: \"{text}\"\n"
         "Sentiment:"
     )
 
+
+def parse_score(content: str):
+    """Score from a single-text reply, or None if it is not a number in [-1, 1]."""
+    try:
+        score = float((content or "").strip())
+    except ValueError:
+        return None
+    return score if -1.0 <= score <= 1.0 else None
+
+
+def get_sentiment(text: str) -> float:
+    """
+    Returns a sentiment score between -1 (negative) and +1 (positive) for the given text.
+    Caches results in sentiment_cache.sqlite to avoid duplicate API calls; an
+    unparsable reply scores 0.0 but is not cached, so it is retried next time.
+    """
+    cached = cache.get(text)
+    if cached is not None:
+        return cached
+
     # Call OpenAI
     response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
+        model=MODEL,
+        messages=[{"role": "user", "content": _single_prompt(text)}],
         temperature=0.0,
         max_tokens=5
     )
-    try:
-        score_str = response.choices[0].message.content.strip()
-        score = float(score_str)
-    except Exception:
-        score = 0.0
+    score = parse_score(response.choices[0].message.content)
+    if score is None:
+        return 0.0
 
     # Cache and persist
-    _cache[key] = score
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(_cache, f, indent=2)
+    cache.put(text, score)
 
     # Avoid rate limits
     time.sleep(0.2)
     return score
 
 
-def batch_sentiment(df: pd.DataFrame, text_col: str = "text", score_col: str = "SentimentScore") -> pd.DataFrame:
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(texts: List[str], token_budget: int = BATCH_TOKEN_BUDGET,
+                 max_texts: int = BATCH_MAX_TEXTS) -> List[List[str]]:
+    """Split texts into consecutive batches whose estimated prompt size fits `token_budget`."""
+    batches, cur, used = [], [], 0
+    for text in texts:
+        cost = _estimate_tokens(text[:BATCH_MAX_TEXT_CHARS]) + 4  # index + separators
+        if cur and (used + cost > token_budget or len(cur) >= max_texts):
+            batches.append(cur)
+            cur, used = [], 0
+        cur.append(text)
+        used += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _batch_prompt(texts: List[str]) -> str:
+    items = "\n".join(json.dumps({"i": i, "text": t[:BATCH_MAX_TEXT_CHARS]}) for i, t in enumerate(texts))
+    return (
+        "On a scale from -1 to 1, rate the sentiment of each of the following texts. "
+        "Each line is a JSON object with an index `i` and a `text`. "
+        "Return only a JSON object mapping every index (as a string) to its score, "
+        'e.g. {"0": 0.4, "1": -0.2}.\n\n'
+        f"{items}"
+    )
+
+
+def parse_batch_response(content: str, n: int) -> dict:
+    """
+    Parse an index-keyed JSON response into {index: score}. Indices that are
+    missing, out of range or not a number in [-1, 1] are left out.
+    """
+    m = re.search(r"\{.*\}", content or "", re.S)
+    if not m:
+        return {}
+    try:
+        raw = json.loads(m.group(0))
+    except ValueError:
+        return {}
+    scores = {}
+    for k, v in raw.items() if isinstance(raw, dict) else ():
+        try:
+            i, score = int(k), float(v)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < n and -1.0 <= score <= 1.0:
+            scores[i] = score
+    return scores
+
+
+def _batch_request(texts: List[str]) -> dict:
+    return {
+        "messages":        [{"role": "user", "content": _batch_prompt(texts)}],
+        "max_tokens":      10 * len(texts) + 20,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _score_batch(texts: List[str]) -> dict:
+    """One chat completion for a batch of texts; returns {index: score} for the indices that came back."""
+    try:
+        response = openai.chat.completions.create(
+            model=MODEL, temperature=0.0, **_batch_request(texts))
+        content = response.choices[0].message.content
+    except Exception as e:
+        print(f"Batch of {len(texts)} failed: {e}")
+        return {}
+    return parse_batch_response(content, len(texts))
+
+
+def get_sentiments(texts: List[str], token_budget: int = BATCH_TOKEN_BUDGET) -> List[float]:
+    """
+    Score many texts with batched requests. Uncached texts are de-duplicated
+    and packed into index-keyed batches; any index missing from a response is
+    retried on its own through get_sentiment. Cache reads are one batched
+    lookup and each batch's scores are written in one transaction.
+    """
+    keys   = [normalize_text(t) for t in texts]
+    scores = cache.get_many(set(keys))
+    todo   = list(dict.fromkeys(k for k in keys if k not in scores))
+
+    missing = []
+    for batch in pack_batches(todo, token_budget):
+        got = _score_batch(batch)
+        cache.put_many({key: got[i] for i, key in enumerate(batch) if i in got})
+        for i, key in enumerate(batch):
+            if i in got:
+                scores[key] = got[i]
+            else:
+                missing.append(key)
+
+    if missing:
+        print(f"Retrying {len(missing)} texts individually")
+    for key in missing:
+        scores[key] = get_sentiment(key)
+    return [scores[k] for k in keys]
+
+
+def get_sentiments_async(texts: List[str], batched: bool = True,
+                         token_budget: int = BATCH_TOKEN_BUDGET, engine: CompletionEngine = None) -> List[float]:
     """
-    Adds a sentiment score column to the DataFrame by applying get_sentiment in batches.
+    Score many texts concurrently through a CompletionEngine (bounded
+    concurrency, RPM/TPM pacing, backoff on 429/5xx). Scores come back in
+    input order. Texts whose request failed or whose reply did not parse are
+    returned as NaN and left out of the cache, so a later run retries them.
     """
-    scores = []
-    for text in df[text_col].astype(str).tolist():
-        score = get_sentiment(text)
-        scores.append(score)
-    df[score_col] = scores
+    engine = engine or CompletionEngine(model=MODEL, api_key=openai.api_key)
+    keys   = [normalize_text(t) for t in texts]
+    scores = cache.get_many(set(keys))
+    todo   = list(dict.fromkeys(k for k in keys if k not in scores))
+    fresh  = {}
+
+    singles = todo
+    if batched and todo:
+        batches  = pack_batches(todo, token_budget)
+        contents = engine.run_sync([_batch_request(b) for b in batches])
+        singles  = []
+        for batch, content in zip(batches, contents):
+            got = parse_batch_response(content, len(batch)) if content is not None else {}
+            for i, key in enumerate(batch):
+                if i in got:
+                    fresh[key] = got[i]
+                else:
+                    singles.append(key)
+        if singles:
+            print(f"Retrying {len(singles)} texts individually")
+
+    contents = engine.run_sync([
+        {"messages": [{"role": "user", "content": _single_prompt(k)}], "max_tokens": 5}
+        for k in singles
+    ])
+    for key, content in zip(singles, contents):
+        score = parse_score(content) if content is not None else None
+        if score is not None:
+            fresh[key] = score
+
+    cache.put_many(fresh)
+    scores.update(fresh)
+    print(f"Scored {len(fresh)}/{len(todo)} uncached texts "
+          f"({engine.stats['requests']} requests, {engine.stats['retries']} retries)")
+    return [scores.get(k, float("nan")) for k in keys]
+
+
+class LLMScorer(Scorer):
+    """Remote LLM backend: get_sentiment, batched or on the async engine."""
+
+    name = "llm"
+
+    def __init__(self, batched: bool = False, concurrent: bool = False,
+                 token_budget: int = BATCH_TOKEN_BUDGET):
+        self.batched      = batched
+        self.concurrent   = concurrent
+        self.token_budget = token_budget
+
+    def score_with_confidence(self, texts: List[str]):
+        if self.concurrent:
+            scores = get_sentiments_async(texts, self.batched, self.token_budget)
+        elif self.batched:
+            scores = get_sentiments(texts, self.token_budget)
+        else:
+            scores = [get_sentiment(text) for text in texts]
+        return np.asarray(scores, dtype=float), np.ones(len(texts))
+
+
+def make_scorer(backend: str = "llm", batched: bool = False, concurrent: bool = False,
+                token_budget: int = BATCH_TOKEN_BUDGET,
+                threshold: float = CASCADE_THRESHOLD) -> Scorer:
+    """Build a scorer: 'llm', 'local' (offline hashed model) or 'cascade' (local, LLM when unsure)."""
+    if backend == "local":
+        return HashedLinearScorer.load()
+    llm = LLMScorer(batched, concurrent, token_budget)
+    if backend == "cascade":
+        return CascadeScorer(HashedLinearScorer.load(), llm, threshold)
+    return llm
+
+
+def batch_sentiment(df: pd.DataFrame, text_col: str = "text", score_col: str = "SentimentScore",
+                    batched: bool = False, token_budget: int = BATCH_TOKEN_BUDGET,
+                    concurrent: bool = False, scorer: Scorer = None,
+                    dedup_threshold: float = None) -> pd.DataFrame:
+    """
+    Adds a sentiment score column to the DataFrame using `scorer` (default:
+    the LLM via get_sentiment). With `batched`, uncached texts are sent many
+    per request (see get_sentiments); with `concurrent`, requests run on the
+    async engine (see get_sentiments_async). With `dedup_threshold`, only one
+    representative per near-duplicate cluster is scored and its score is
+    copied to the other members.
+    """
+    scorer = scorer or LLMScorer(batched, concurrent, token_budget)
+    texts  = df[text_col].astype(str).tolist()
+    if dedup_threshold is None:
+        df[score_col] = scorer.score(texts)
+        return df
+    clusters = NearDuplicateClusters(texts, dedup_threshold)
+    print(clusters.report())
+    reps   = clusters.representatives
+    scores = pd.Series(scorer.score([texts[i] for i in reps]), index=reps)
+    df[score_col] = scores.reindex(clusters.rep).to_numpy()
     return df
 
 
+def score_incremental(
+    new_path: str = os.path.join("data", "new_data.csv"),
+    clean_path: str = os.path.join("data", "clean_data.csv"),
+    out_path: str = os.path.join("data", "sentiment_scored.csv"),
+    score_col: str = "SentimentScore",
+    batched: bool = False,
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    concurrent: bool = False,
+    scorer: Scorer = None,
+    dedup_threshold: float = None,
+) -> pd.DataFrame:
+    """
+    Score only the delta from `data_pipeline.py --incremental` (new_data.csv),
+    plus any clean rows that have no score yet, and reuse earlier scores by
+    `record_id` for the rest of the retention view in clean_data.csv. Rows
+    left unscored (NaN) by a failed request count as not scored yet.
+    """
+    clean = pd.read_csv(clean_path)
+    new   = pd.read_csv(new_path)
+
+    prev = pd.read_csv(out_path) if os.path.exists(out_path) else pd.DataFrame()
+    if "record_id" in prev and score_col in prev:
+        scores = prev.set_index("record_id")[score_col].dropna()
+    else:
+        scores = pd.Series(dtype=float)
+
+    backfill = clean[~clean["record_id"].isin(scores.index) & ~clean["record_id"].isin(new["record_id"])]
+    todo     = pd.concat([new, backfill], ignore_index=True)
+    if not todo.empty:
+        todo   = batch_sentiment(todo, score_col=score_col, batched=batched,
+                                 token_budget=token_budget, concurrent=concurrent,
+                                 scorer=scorer, dedup_threshold=dedup_threshold)
+        scores = pd.concat([scores, todo.set_index("record_id")[score_col]])
+    scores = scores[~scores.index.duplicated(keep="last")]
+
+    clean[score_col] = clean["record_id"].map(scores)
+    save_artifact("sentiment_scored", clean, out_path)
+    print(f"Scored {len(todo)} new rows ({len(clean)} in view)")
+    return clean
+
+
 if __name__ == '__main__':
-    # Example usage
-    raw = pd.read_csv(os.path.join("data", "clean_data.csv"))
-    out = batch_sentiment(raw)
-    out.to_csv(os.path.join("data", "sentiment_scored.csv"), index=False)
-    print("Sentiment scoring complete. Output saved to data/sentiment_scored.csv")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score sentiment of the cleaned data.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="score only data/new_data.csv and merge into sentiment_scored.csv")
+    parser.add_argument("--batched", action="store_true",
+                        help="pack many texts into each API request")
+    parser.add_argument("--batch-tokens", type=int, default=BATCH_TOKEN_BUDGET,
+                        help="approximate prompt token budget per batched request")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="run requests concurrently on the async engine with retries")
+    parser.add_argument("--cache-max-age-days", type=float, default=None,
+                        help="evict cached scores older than this many days")
+    parser.add_argument("--cache-max-rows", type=int, default=None,
+                        help="keep at most this many cached scores (newest first)")
+    parser.add_argument("--backend", choices=("llm", "local", "cascade"), default="llm",
+                        help="scorer: remote LLM, offline local model, or local with LLM fallback")
+    parser.add_argument("--cascade-threshold", type=float, default=CASCADE_THRESHOLD,
+                        help="local confidence below which the cascade asks the LLM")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="score one text per near-duplicate cluster (estimated Jaccard, e.g. 0.8)")
+    args = parser.parse_args()
+    scorer = make_scorer(args.backend, args.batched, args.concurrent,
+                         args.batch_tokens, args.cascade_threshold)
+
+    if args.cache_max_age_days is not None or args.cache_max_rows is not None:
+        removed = cache.evict(args.cache_max_rows, args.cache_max_age_days)
+        print(f"Evicted {removed} cached scores")
+
+    if args.incremental:
+        score_incremental(scorer=scorer, dedup_threshold=args.dedup_threshold)
+    else:
+        # Example usage
+        raw = pd.read_csv(os.path.join("data", "clean_data.csv"))
+        out = batch_sentiment(raw, scorer=scorer, dedup_threshold=args.dedup_threshold)
+        save_artifact("sentiment_scored", out, os.path.join("data", "sentiment_scored.csv"))
+    print("Sentiment scoring complete. Output saved to data/sentiment_scored.csv")
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+SENTIMENT_DB    = os.path.join("data", "sentiment_cache.sqlite")
+LEGACY_JSON     = os.path.join("data", "sentiment_cache.json")
+SQL_BATCH       = 500     # keys per SELECT ... IN (...)
+BUSY_TIMEOUT_MS = 30000   # wait this long for another writer's lock
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    key            TEXT PRIMARY KEY,
+    score          REAL NOT NULL,
+    model          TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    created        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_created ON scores(created);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Collapse all whitespace runs to single spaces and trim."""
+    return " ".join(str(text).split())
+
+
+def cache_key(text: str, model: str, prompt_version: str) -> str:
+    """sha256 of the normalized text, model and prompt version."""
+    basis = "\x1f".join((normalize_text(text), model, prompt_version))
+    return hashlib.sha256(basis.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    Persistent sentiment score cache in SQLite (WAL mode), keyed by
+    `cache_key(text, model, prompt_version)` so a model or prompt change
+    never serves stale scores.
+
+    Lookups and writes are batched (`get_many` / `put_many`); every write
+    is its own short transaction, so concurrent writers (threads or
+    processes) only wait on each other for the lock, bounded by
+    BUSY_TIMEOUT_MS. Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str = SENTIMENT_DB, model: str = "gpt-3.5-turbo",
+                 prompt_version: str = "v1"):
+        self.path           = path
+        self.model          = model
+        self.prompt_version = prompt_version
+        self._local         = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def key(self, text: str) -> str:
+        return cache_key(text, self.model, self.prompt_version)
+
+    # --- lookups ------------------------------------------------------------
+    def get_many(self, texts: Iterable[str]) -> Dict[str, float]:
+        """{text: score} for the texts that are cached."""
+        by_key = {}
+        for text in texts:
+            by_key.setdefault(self.key(text), []).append(text)
+        keys, found = list(by_key), {}
+        conn = self._conn()
+        for i in range(0, len(keys), SQL_BATCH):
+            chunk = keys[i:i + SQL_BATCH]
+            rows  = conn.execute(
+                f"SELECT key, score FROM scores WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, score in rows:
+                for text in by_key[key]:
+                    found[text] = score
+        return found
+
+    def get(self, text: str):
+        return self.get_many([text]).get(text)
+
+    def __contains__(self, text: str) -> bool:
+        return self.get(text) is not None
+
+    # --- writes -------------------------------------------------------------
+    def put_many(self, scores: Dict[str, float], model: str = None, prompt_version: str = None):
+        """Insert or replace many scores in one transaction."""
+        if not scores:
+            return
+        model          = model or self.model
+        prompt_version = prompt_version or self.prompt_version
+        now            = time.time()
+        rows = [(cache_key(t, model, prompt_version), float(s), model, prompt_version, now)
+                for t, s in scores.items()]
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)", rows)
+
+    def put(self, text: str, score: float):
+        self.put_many({text: score})
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    # --- maintenance --------------------------------------------------------
+    def evict(self, max_rows: int = None, max_age_days: float = None) -> int:
+        """Drop entries older than `max_age_days`, then the oldest beyond `max_rows`."""
+        removed = 0
+        with self._conn() as conn:
+            if max_age_days is not None:
+                cutoff   = time.time() - max_age_days * 86400
+                removed += conn.execute("DELETE FROM scores WHERE created < ?", (cutoff,)).rowcount
+            if max_rows is not None:
+                removed += conn.execute(
+                    "DELETE FROM scores WHERE key IN ("
+                    "  SELECT key FROM scores ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (max_rows,)).rowcount
+        return removed
+
+    def migrate_json(self, json_path: str = LEGACY_JSON, model: str = None,
+                     prompt_version: str = None) -> int:
+        """
+        One-time import of the old {text: score} JSON cache. Recorded in the
+        meta table, so later calls are no-ops; the JSON file is left untouched.
+        """
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE name = 'migrated_json'").fetchone():
+            return 0
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path) as f:
+                legacy = json.load(f)
+        except ValueError as e:
+            print(f"Skipping unreadable sentiment cache {json_path}: {e}")
+            return 0
+        scores = {t: s for t, s in legacy.items() if isinstance(s, (int, float))}
+        self.put_many(scores, model, prompt_version)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_json', ?)", (json_path,))
+        print(f"Migrated {len(scores)} cached scores from {json_path}")
+        return len(scores)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
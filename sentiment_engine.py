@@ -0,0 +1,198 @@
+import re
+import time
+import random
+import asyncio
+from typing import List, Optional
+
+import openai
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+DEFAULT_MODEL       = "gpt-3.5-turbo"
+DEFAULT_RPM         = 3500    # requests per minute
+DEFAULT_TPM         = 90000   # prompt + completion tokens per minute
+DEFAULT_CONCURRENCY = 16      # requests in flight
+MAX_RETRIES         = 6
+BACKOFF_BASE        = 0.5     # seconds; doubled per attempt, full jitter
+BACKOFF_MAX         = 30.0
+CHARS_PER_TOKEN     = 4
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value) -> Optional[float]:
+    """Parse a rate-limit reset value such as '1s', '6m0s' or '20ms' into seconds."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(str(value))
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough prompt + completion token count for one chat completion request."""
+    chars = sum(len(m.get("content", "")) for m in kwargs.get("messages", ()))
+    return chars // CHARS_PER_TOKEN + 1 + int(kwargs.get("max_tokens") or 0)
+
+
+class RateLimiter:
+    """
+    Async token buckets for requests/minute and tokens/minute. Response
+    `x-ratelimit-*` headers tighten the local buckets to what the server
+    reports, and a 429 pauses every caller until the server's reset time.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.rpm          = float(rpm)
+        self.tpm          = float(tpm)
+        self._requests    = self.rpm
+        self._tokens      = self.tpm
+        self._last        = time.monotonic()
+        self._pause_until = 0.0
+        self._lock        = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed        = now - self._last
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens   = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+        self._last     = now
+
+    async def acquire(self, tokens: int):
+        tokens = min(float(tokens), self.tpm)
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._pause_until - now
+                if wait <= 0:
+                    if self._requests >= 1 and self._tokens >= tokens:
+                        self._requests -= 1
+                        self._tokens   -= tokens
+                        return
+                    wait = max((1 - self._requests) * 60.0 / self.rpm,
+                               (tokens - self._tokens) * 60.0 / self.tpm)
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back all callers for `seconds`."""
+        self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def update(self, headers):
+        """Sync the buckets with the server's view of the remaining budget."""
+        if headers is None:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            if kind == "requests":
+                self._requests = min(self._requests, remaining)
+            else:
+                self._tokens = min(self._tokens, remaining)
+            if remaining <= 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self.pause(reset)
+
+
+def _retry_after(headers) -> Optional[float]:
+    if headers is None:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms is not None:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+class CompletionEngine:
+    """
+    Run many chat completions concurrently: at most `concurrency` in flight,
+    paced by a RateLimiter, retrying 429 / 5xx / connection errors with
+    exponential backoff and full jitter.
+
+    `run` takes one dict of `chat.completions.create` kwargs per request
+    (`model` and `temperature=0` are filled in) and returns the message
+    contents in input order, with None for requests that still failed after
+    `max_retries` or hit a non-retryable error. Point `base_url` at a local
+    OpenAI-compatible server to exercise it offline.
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, rpm: float = DEFAULT_RPM,
+                 tpm: float = DEFAULT_TPM, concurrency: int = DEFAULT_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES, base_url: str = None,
+                 api_key: str = None, timeout: float = 60.0):
+        self.model       = model
+        self.rpm         = rpm
+        self.tpm         = tpm
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_url    = base_url
+        self.api_key     = api_key
+        self.timeout     = timeout
+        self.stats       = {"requests": 0, "retries": 0, "failed": 0}
+
+    def _backoff(self, attempt: int, headers=None) -> float:
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        hint  = _retry_after(headers)
+        return max(delay, hint) if hint else delay
+
+    async def _complete(self, client, limiter: RateLimiter, sem: asyncio.Semaphore, kwargs: dict):
+        kwargs = {"model": self.model, "temperature": 0.0, **kwargs}
+        cost   = estimate_tokens(kwargs)
+        async with sem:
+            for attempt in range(self.max_retries + 1):
+                await limiter.acquire(cost)
+                self.stats["requests"] += 1
+                try:
+                    raw = await client.chat.completions.with_raw_response.create(**kwargs)
+                except openai.APIStatusError as e:
+                    headers = e.response.headers if e.response is not None else None
+                    limiter.update(headers)
+                    if e.status_code != 429 and e.status_code < 500:
+                        print(f"Completion failed ({e.status_code}): {e}")
+                        break
+                    delay = self._backoff(attempt, headers)
+                    if e.status_code == 429:
+                        limiter.pause(delay)
+                except openai.APIConnectionError:
+                    delay = self._backoff(attempt)
+                else:
+                    limiter.update(raw.headers)
+                    try:
+                        return raw.parse().choices[0].message.content
+                    except Exception as e:
+                        # empty `choices` (content-filtered) or a malformed body: not worth a retry
+                        print(f"Completion unusable: {e!r}")
+                        break
+                if attempt < self.max_retries:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(delay)
+        self.stats["failed"] += 1
+        return None
+
+    async def run(self, requests: List[dict]) -> List[Optional[str]]:
+        if not requests:
+            return []
+        client  = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                     max_retries=0, timeout=self.timeout)
+        limiter = RateLimiter(self.rpm, self.tpm)
+        sem     = asyncio.Semaphore(self.concurrency)
+        async with client:
+            return list(await asyncio.gather(*(self._complete(client, limiter, sem, kw) for kw in requests)))
+
+    def run_sync(self, requests: List[dict]) -> List[Optional[str]]:
+        return asyncio.run(self.run(requests))
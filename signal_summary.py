@@ -0,0 +1,227 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import ArtifactStore
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+SUMMARY_FREQ     = "1h"    # dashboard chart resolution
+PANEL_MAX_POINTS = 200     # time buckets per series sent to the browser
+PANEL_MAX_CELLS  = 6000    # heatmap cells sent to the browser
+PANEL_MAX_ROWS   = 100     # tickers on the heatmap (most active first beyond that)
+
+
+def hourly_aggregates(signals: pd.DataFrame, freq: str = SUMMARY_FREQ) -> pd.DataFrame:
+    """
+    Per (ticker, hour): mean agg_score and count of non-Neutral signals over
+    all windows, the buckets the dashboard charts. Hours without rows are
+    left out, as `resample(...).dropna()` would.
+    """
+    ts    = pd.to_datetime(signals["timestamp"], utc=True)
+    order = np.argsort(ts.dt.as_unit("ns").array.asi8, kind="stable")   # time order within a bucket, as resample sums it
+    df = pd.DataFrame({
+        "ticker":       signals["ticker"].astype(str).to_numpy()[order],
+        "timestamp":    ts.dt.floor(freq).array.take(order),
+        "avg_score":    signals["agg_score"].to_numpy(np.float64)[order],
+        "signal_count": (signals["signal"] != "Neutral").to_numpy(np.int64)[order],
+    })
+    out = (df.groupby(["ticker", "timestamp"], sort=True)
+             .agg(avg_score=("avg_score", "mean"), signal_count=("signal_count", "sum"))
+             .dropna(subset=["avg_score"])
+             .reset_index())
+    return out
+
+
+def ticker_kpis(signals: pd.DataFrame) -> pd.DataFrame:
+    """One row per ticker: mean agg_score, non-Neutral signal count, rows, first and last timestamp."""
+    df = pd.DataFrame({
+        "ticker":    signals["ticker"].astype(str).to_numpy(),
+        "timestamp": pd.to_datetime(signals["timestamp"], utc=True),
+        "agg_score": signals["agg_score"].to_numpy(np.float64),
+        "active":    (signals["signal"] != "Neutral").to_numpy(np.int64),
+    })
+    return (df.groupby("ticker", sort=True)
+              .agg(avg_score=("agg_score", "mean"), signal_count=("active", "sum"),
+                   rows=("agg_score", "size"), first_ts=("timestamp", "min"),
+                   last_ts=("timestamp", "max"))
+              .reset_index())
+
+
+def daily_panel(signals: pd.DataFrame):
+    """
+    Dense daily arrays of `signals` over the calendar days they span:
+    (windows, tickers, days, scores[w, d, t] = ticker t's last agg_score of
+    day d for window w as float32, NaN without a row that day,
+    counts[w, d] = non-Neutral signals of window w on day d).
+    """
+    ts      = pd.to_datetime(signals["timestamp"], utc=True)
+    day     = ts.dt.tz_localize(None).dt.floor("D").to_numpy().astype("datetime64[D]")
+    w_code, windows = pd.factorize(signals["window"].to_numpy(np.int64), sort=True)
+    t_code, tickers = pd.factorize(signals["ticker"].astype(str).to_numpy(), sort=True)
+    W, T = len(windows), len(tickers)
+    days = np.arange(day.min(), day.max() + 1) if len(day) else np.empty(0, "datetime64[D]")
+    d_code = (day - days[0]).astype(np.int64) if len(day) else np.empty(0, np.int64)
+    D = len(days)
+
+    # last row per (window, day, ticker) in time order
+    cell  = (w_code * D + d_code) * T + t_code
+    order = np.lexsort((ts.dt.as_unit("ns").array.asi8, cell))
+    last  = order[np.r_[cell[order][1:] != cell[order][:-1], True]] if len(order) else order
+    scores = np.full(W * D * T, np.nan, dtype=np.float32)
+    scores[cell[last]] = signals["agg_score"].to_numpy(np.float64)[last]
+
+    active = (signals["signal"] != "Neutral").to_numpy()
+    counts = np.bincount((w_code * D + d_code)[active], minlength=W * D).astype(np.int32)
+    return ([int(w) for w in windows], list(tickers), days,
+            scores.reshape(W, D, T), counts.reshape(W, D))
+
+
+def write_summaries(store: ArtifactStore, signals: pd.DataFrame, source: str = None):
+    """
+    Write the dashboard summaries of `signals` (all windows) to `store`.
+    `source` identifies the signals they were built from (default: the
+    current signals dataset) and is recorded in the panel's meta, which is
+    written last.
+    """
+    if source is None:
+        source = store.version("signals")
+    store.write("signal_hourly", hourly_aggregates(signals))
+    store.write("signal_kpis", ticker_kpis(signals))
+    windows, tickers, days, scores, counts = daily_panel(signals)
+    store.write_arrays("signal_panel", {"days": days, "scores": scores, "counts": counts},
+                       {"windows": windows, "tickers": tickers, "source": source})
+
+
+def signals_mtime(store: ArtifactStore, csv_paths=()) -> float:
+    """When the signals were last written: the dataset, else the newest CSV export (0.0 if none)."""
+    if store.exists("signals"):
+        return store.mtime("signals")
+    return max((os.path.getmtime(p) for p in csv_paths if os.path.exists(p)), default=0.0)
+
+
+def signals_version(store: ArtifactStore, csv_paths=()) -> str:
+    """
+    Id of the current signals: the dataset's version, else the name, size
+    and mtime of each CSV export ("" if there are none).
+    """
+    if store.exists("signals"):
+        return store.version("signals")
+    return ";".join(f"{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns}"
+                    for p, st in ((p, os.stat(p)) for p in csv_paths if os.path.exists(p)))
+
+
+def refresh_summaries(store: ArtifactStore, csv_paths=()) -> bool:
+    """
+    Rebuild the summaries if they were built from other signals than the
+    current ones (or are missing); `csv_paths` are the per-window signals
+    CSVs read when there is no signals dataset. Returns whether they were
+    rebuilt.
+    """
+    source = signals_version(store, csv_paths)
+    if not source or store.read_meta("signal_panel").get("source") == source:
+        return False
+    columns = ["window", "timestamp", "ticker", "agg_score", "signal"]
+    if store.exists("signals"):
+        signals = store.read("signals", columns=columns)
+    else:
+        signals = pd.concat([store.read("signals", columns=columns, csv_path=p)
+                             for p in csv_paths if os.path.exists(p)], ignore_index=True)
+    write_summaries(store, signals, source)
+    return True
+
+
+# ─── Overview panel ────────────────────────────────────────────────────────────
+
+def downsample(values: np.ndarray, max_points: int, reduce=np.nanmean):
+    """
+    Reduce axis 0 of `values` in equal consecutive blocks so at most
+    `max_points` rows remain. Returns (block size, reduced values); the
+    trailing block is padded with NaN.
+    """
+    n = values.shape[0]
+    k = max(1, -(-n // max(max_points, 1)))
+    m = -(-n // k) * k
+    v = values.astype(np.float64)
+    if m > n:
+        v = np.concatenate([v, np.full((m - n,) + v.shape[1:], np.nan)])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN blocks stay NaN
+        return k, reduce(v.reshape((m // k, k) + v.shape[1:]), axis=1)
+
+
+class SignalPanel:
+    """
+    The dense daily panel written by write_summaries, memory-mapped.
+    `scores[w, d, t]` is ticker t's last agg_score on day d for window w
+    (NaN without a row that day) and `counts[w, d]` the non-Neutral signals
+    of window w on day d across the universe.
+
+    The overview queries slice the panel by day range and return long
+    frames already reduced to what a chart can show: at most `max_points`
+    time buckets and `max_cells` heatmap cells, whatever the history or
+    universe size.
+    """
+
+    def __init__(self, store: ArtifactStore):
+        arrays, meta  = store.read_arrays("signal_panel")
+        self.windows  = meta["windows"]
+        self.tickers  = np.asarray(meta["tickers"], dtype=object)
+        self.days     = arrays["days"]
+        self.scores   = arrays["scores"]
+        self.counts   = arrays["counts"]
+
+    def day_range(self, start, end) -> slice:
+        """Rows of days start..end (inclusive dates)."""
+        lo = np.searchsorted(self.days, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(self.days, np.datetime64(end, "D"), side="right")
+        return slice(int(lo), int(hi))
+
+    def heatmap(self, window: int, rows: slice, max_cells: int = PANEL_MAX_CELLS,
+                max_tickers: int = PANEL_MAX_ROWS) -> pd.DataFrame:
+        """
+        Long (date, ticker, score) frame: mean daily score per time bucket
+        for the `max_tickers` tickers with the most days of data in range.
+        """
+        s      = self.scores[self.windows.index(window), rows]
+        seen   = (~np.isnan(s)).sum(axis=0)
+        cols   = np.flatnonzero(seen)
+        cols   = cols[np.argsort(-seen[cols], kind="stable")[:max_tickers]]
+        cols.sort()
+        if not len(cols):
+            return pd.DataFrame(columns=["date", "ticker", "score"])
+        k, v   = downsample(s[:, cols], max(1, max_cells // len(cols)))
+        dates  = self.days[rows][::k]
+        d, t   = np.nonzero(~np.isnan(v))
+        return pd.DataFrame({"date": pd.to_datetime(dates[d]), "ticker": self.tickers[cols][t],
+                             "score": v[d, t]})
+
+    def movers(self, window: int, rows: slice, n: int = 10) -> pd.DataFrame:
+        """
+        Change in agg_score from each ticker's first to its last value in
+        range (tickers with values on at least two days), largest |change|
+        first, top `n`.
+        """
+        s     = np.asarray(self.scores[self.windows.index(window), rows], dtype=np.float64)
+        valid = ~np.isnan(s)
+        if not s.size:
+            return pd.DataFrame(columns=["ticker", "start", "end", "change"])
+        first = valid.argmax(axis=0)
+        last  = s.shape[0] - 1 - valid[::-1].argmax(axis=0)
+        cols  = np.flatnonzero(valid.sum(axis=0) >= 2)
+        start = s[first[cols], cols]
+        end   = s[last[cols], cols]
+        out   = pd.DataFrame({"ticker": self.tickers[cols], "start": start, "end": end,
+                              "change": end - start})
+        return out.iloc[np.argsort(-np.abs(out["change"].to_numpy()), kind="stable")[:n]].reset_index(drop=True)
+
+    def signal_counts(self, rows: slice, max_points: int = PANEL_MAX_POINTS) -> pd.DataFrame:
+        """Long (date, window, signals) frame: non-Neutral signals per time bucket and window."""
+        k, v  = downsample(self.counts[:, rows].T, max_points, reduce=np.nansum)
+        dates = self.days[rows][::k]
+        return pd.DataFrame({
+            "date":    pd.to_datetime(np.repeat(dates, len(self.windows))),
+            "window":  np.tile([f"{w}d" for w in self.windows], len(dates)),
+            "signals": v.reshape(-1).astype(np.int64),
+        })
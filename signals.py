@@ -1,12 +1,84 @@
 import os
+import time
+import argparse
+from datetime import timedelta
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from backtest import run_backtest
+from pandas.api.indexers import BaseIndexer
+from backtest import run_backtest, fetch_price_data
 from metrics import summarize_performance
+from artifact_store import ArtifactStore
+from signal_summary import write_summaries
 
 # Thresholds for basic rolling signals
 LONG_THRESHOLD = 0.1
 SHORT_THRESHOLD = -0.1
 
+class _WindowBounds(BaseIndexer):
+    """Rolling indexer that hands precomputed [start, end) bounds to pandas."""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.start, self.end
+
+
+def compute_signals(df: pd.DataFrame, windows=(1, 3, 5),
+                    agg_col: str = "SentimentScore",
+                    signal_col: str = "signal") -> pd.DataFrame:
+    """
+    Rolling average sentiment per ticker for every window in one pass, with
+    Long/Short/Neutral labels. Rows are ordered as generate_signals orders
+    them (tickers sorted, then by timestamp) and stacked window by window
+    with a `window` column.
+
+    Rows are grouped once and window bounds come from a `searchsorted` on
+    each ticker's timestamps; a single `rolling(...).mean()` over all
+    tickers then uses pandas' own accumulator, so the values are
+    bit-identical to a per-ticker time-based rolling mean.
+    """
+    ts     = pd.to_datetime(df["timestamp"], utc=True)
+    codes, tickers = pd.factorize(df["ticker"], sort=True)
+    keep   = codes >= 0
+    pos    = np.flatnonzero(keep)
+    order  = pos[np.argsort(codes[keep], kind="stable")]
+    codes  = codes[order]
+    t      = ts.dt.as_unit("ns").array.asi8[order]
+
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    # within each ticker, sort by timestamp the way `sort_index` does
+    # (keep the order if already monotonic, else a quicksort argsort)
+    unsorted = np.flatnonzero((np.diff(t) < 0) & (codes[1:] == codes[:-1]))
+    naive    = ts.dt.tz_localize(None).to_numpy()
+    for g in np.unique(np.searchsorted(bounds, unsorted, side="right") - 1):
+        lo, hi = bounds[g], bounds[g + 1]
+        perm   = np.argsort(naive[order[lo:hi]], kind="quicksort")
+        order[lo:hi], t[lo:hi] = order[lo:hi][perm], t[lo:hi][perm]
+
+    values      = pd.to_numeric(df[agg_col], errors="coerce").to_numpy(np.float64)[order]
+    end         = np.arange(1, len(order) + 1, dtype=np.int64)
+
+    frames = []
+    for w in windows:
+        span  = np.int64(pd.Timedelta(days=w).value)
+        start = np.empty(len(order), dtype=np.int64)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            start[lo:hi] = lo + np.searchsorted(t[lo:hi], t[lo:hi] - span, side="right")
+        agg = (pd.Series(values)
+                 .rolling(_WindowBounds(start=start, end=end), min_periods=1)
+                 .mean()
+                 .to_numpy())
+        frames.append(pd.DataFrame({
+            "window":    w,
+            "timestamp": ts.array.take(order),
+            "ticker":    tickers.to_numpy()[codes],
+            "agg_score": agg,
+            signal_col:  np.select([agg > LONG_THRESHOLD, agg < SHORT_THRESHOLD],
+                                   ["Long", "Short"], "Neutral"),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
 def generate_signals(df: pd.DataFrame, window_days: int = 1,
                      agg_col: str = "SentimentScore",
                      signal_col: str = "signal") -> pd.DataFrame:
@@ -14,54 +86,104 @@ def generate_signals(df: pd.DataFrame, window_days: int = 1,
     Compute rolling average sentiment over a time window per ticker,
     then assign Long/Short/Neutral signals.
     """
-    df = df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    sig = compute_signals(df, (window_days,), agg_col, signal_col)
+    return sig[["timestamp", "ticker", "agg_score", signal_col]]
 
-    def roll_group(group):
-        g = group.set_index("timestamp").sort_index()
-        g["agg_score"] = g[agg_col].rolling(f"{window_days}d").mean()
-        return g.reset_index()
 
-    frames = []
-    for ticker, group in df.groupby("ticker"):
-        rolled = roll_group(group)
-        rolled["ticker"] = ticker
-        frames.append(rolled)
-    rolled_df = pd.concat(frames, ignore_index=True)
+class ConvictionTable:
+    """
+    Per-ticker agg_score quantiles for a set of levels, computed once, so
+    conviction signals for any (q_low, q_high) pair of those levels are
+    pure array lookups: no merge and no row-wise apply.
+    """
+
+    def __init__(self, df: pd.DataFrame, levels):
+        self.levels = sorted(set(levels))
+        table = (
+            df.groupby("ticker")["agg_score"]
+              .quantile(self.levels)
+              .unstack()
+        )
+        rows       = table.index.get_indexer(df["ticker"])
+        self.df    = df[rows >= 0]          # tickers without a group (NaN) drop out, as in the merge
+        self.rows  = rows[rows >= 0]
+        self.table = table
+        self.agg   = self.df["agg_score"].to_numpy(np.float64)
 
-    rolled_df[signal_col] = rolled_df["agg_score"].apply(
-        lambda s: "Long" if s > LONG_THRESHOLD
-                  else ("Short" if s < SHORT_THRESHOLD else "Neutral")
-    )
-    return rolled_df[["timestamp", "ticker", "agg_score", signal_col]]
+    def signals(self, q_low: float, q_high: float) -> pd.DataFrame:
+        """Rows with p_low/p_high, `conv` and the conviction `signal` for one quantile pair."""
+        p_low  = self.table[q_low].to_numpy(np.float64)[self.rows]
+        p_high = self.table[q_high].to_numpy(np.float64)[self.rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            conv = np.minimum(np.abs((self.agg - p_low) / (p_high - p_low)), 1.0)
+
+        df = self.df.copy()
+        df["p_low"]  = p_low
+        df["p_high"] = p_high
+        df["conv"]   = np.where(np.isnan(conv), 0.0, conv)
+        df["signal"] = np.select([self.agg >= p_high, self.agg <= p_low], ["Long", "Short"], "Neutral")
+        return df
+
+
+@lru_cache(maxsize=None)
+def load_conviction_table(window: int, levels: tuple, dir: str = "data") -> ConvictionTable:
+    """ConvictionTable over the window's saved signals, read and computed once per window."""
+    return ConvictionTable(load_signals(window, dir), levels)
 
 
 def add_conviction_signals(df: pd.DataFrame, q_low: float, q_high: float) -> pd.DataFrame:
     """
     Add per-ticker percentile thresholds, compute conviction factor, and assign new signals.
     """
-    df = df.copy()
-    percs = (
-        df.groupby("ticker")["agg_score"]
-          .quantile([q_low, q_high])
-          .unstack()
-          .rename(columns={q_low: "p_low", q_high: "p_high"})
-    )
-    df = df.merge(percs, left_on="ticker", right_index=True)
-
-    df["conv"] = (
-        (df["agg_score"] - df["p_low"])
-         .div(df["p_high"] - df["p_low"])
-         .abs()
-         .clip(upper=1.0)
-    ).fillna(0.0)
-
-    df["signal"] = df.apply(
-        lambda r: "Long"  if r["agg_score"] >= r["p_high"]
-                  else ("Short" if r["agg_score"] <= r["p_low"] else "Neutral"),
-        axis=1
-    )
-    return df
+    return ConvictionTable(df, (q_low, q_high)).signals(q_low, q_high)
+
+
+def _screen_one(task) -> dict:
+    """Standalone backtest of one ticker against its own price history only."""
+    ticker, sig, hist, stop_loss_pct, take_profit_pct, engine = task
+    row = {"ticker": ticker, "signal_count": int((sig["signal"] != "Neutral").sum())}
+    try:
+        if hist is None:
+            ts   = pd.to_datetime(sig["timestamp"], utc=True)
+            hist = fetch_price_data(ticker, ts.min().date().isoformat(),
+                                    (ts.max().date() + timedelta(days=1)).isoformat())
+        if hist is None or hist.empty:
+            return {**row, "cagr": None, "sharpe": None, "max_dd": None, "trades": 0, "win_rate": None}
+        res = run_backtest(sig, stop_loss_pct, take_profit_pct,
+                           external_price_cache={ticker: hist}, engine=engine)
+        return {**row, **summarize_performance(*res)}
+    except Exception as e:
+        print(f"Screening {ticker} failed: {e}")
+        return {**row, "cagr": None, "sharpe": None, "max_dd": None, "trades": 0, "win_rate": None}
+
+
+def screen_ticker_metrics(
+    signals_df: pd.DataFrame,
+    stop_loss_pct: float,
+    take_profit_pct: float,
+    price_cache: dict = None,
+    workers: int = None,
+    engine: str = "backtrader",
+) -> pd.DataFrame:
+    """
+    Standalone backtest metrics per ticker (one row per ticker, indexed by
+    ticker). Each backtest sees only its own ticker's prices, taken from
+    `price_cache` or downloaded in the worker, so the total work grows
+    linearly with the universe. Tickers run across a process pool of
+    `workers` processes (all cores by default); workers=1 runs in-process.
+    """
+    cols  = ["timestamp", "ticker", "signal"] + (["conv"] if "conv" in signals_df else [])
+    tasks = [(ticker, grp[cols], (price_cache or {}).get(ticker), stop_loss_pct, take_profit_pct, engine)
+             for ticker, grp in signals_df.groupby("ticker")]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+
+    if workers == 1:
+        rows = [_screen_one(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_screen_one, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    return pd.DataFrame(rows, columns=["ticker", "signal_count", "cagr", "sharpe", "max_dd",
+                                       "trades", "win_rate"]).set_index("ticker")
 
 
 def screen_tickers(
@@ -69,11 +191,23 @@ def screen_tickers(
     stop_loss_pct: float,
     take_profit_pct: float,
     price_cache: dict = None,
-    min_sharpe: float = 0.0
+    min_sharpe: float = 0.0,
+    workers: int = None,
+    isolated: bool = True,
 ) -> list:
     """
     Screen out tickers whose standalone backtest Sharpe is below min_sharpe.
+
+    By default each ticker is backtested on its own prices in parallel (see
+    screen_ticker_metrics); isolated=False keeps the old serial run with a
+    feed for every entry of the shared price cache.
     """
+    if isolated:
+        perf = screen_ticker_metrics(signals_df, stop_loss_pct, take_profit_pct,
+                                     price_cache=price_cache, workers=workers)
+        sharpe = pd.to_numeric(perf["sharpe"], errors="coerce")
+        return perf.index[sharpe >= min_sharpe].tolist()
+
     keep = []
     for ticker, grp in signals_df.groupby("ticker"):
         cerebro, strat, start_date, end_date = run_backtest(
@@ -88,48 +222,132 @@ def screen_tickers(
     return keep
 
 
-def load_sentiment(path="data/sentiment_scored.csv") -> pd.DataFrame:
-    """Load your cleaned & scored DataFrame."""
-    return pd.read_csv(path, parse_dates=["timestamp"])
+def _artifacts(dir: str) -> ArtifactStore:
+    return ArtifactStore(os.path.join(dir, "artifacts"))
 
 
-def load_signals(window: int, dir: str = "data") -> pd.DataFrame:
+def load_sentiment(path=None, links_path="data/article_tickers.csv") -> pd.DataFrame:
     """
-    Load the previously saved signals_{window}d.csv file.
+    Load your cleaned & scored DataFrame: the sentiment_scored artifact, or
+    the CSV at `path` if given. News articles are scored once per article;
+    when the article->ticker link table exists each scored article is fanned
+    out to every ticker it was fetched for.
     """
-    path = os.path.join(dir, f"signals_{window}d.csv")
-    return pd.read_csv(path, parse_dates=["timestamp"])
+    if path is None:
+        df = _artifacts("data").read("sentiment_scored", csv_path="data/sentiment_scored.csv")
+    else:
+        df = pd.read_csv(path, parse_dates=["timestamp"])
+    if "article_id" not in df.columns or not os.path.exists(links_path):
+        return df
+    links    = pd.read_csv(links_path)
+    is_art   = df["article_id"].notna() & df["article_id"].isin(links["article_id"])
+    articles = df[is_art].drop(columns="ticker").merge(links, on="article_id")
+    out      = pd.concat([df[~is_art], articles[df.columns]], ignore_index=True)
+    return out.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+def load_signals(window: int, dir: str = "data", **filters) -> pd.DataFrame:
+    """
+    Load the previously saved signals of one window from the signals
+    dataset (signals_{window}d.csv if there is none yet). `filters` are
+    pushed down to the read, e.g. ticker="AAPL" or start/end.
+    """
+    return _artifacts(dir).read("signals", csv_path=os.path.join(dir, f"signals_{window}d.csv"),
+                                window=window, **filters)
 
 
 def save_all_signals(
     windows=(1, 3, 5),
-    sentiment_path="data/sentiment_scored.csv",
+    sentiment_path=None,
     out_dir="data"
 ):
     """
-    Compute signals for each window, save individual CSVs, and
-    also produce a combined signals.csv with a 'window' column.
+    Compute signals for all windows in one pass and save them as one
+    dataset partitioned by window and date, plus the per-window
+    signals_{w}d.csv exports. The dataset replaces the old combined
+    signals.csv, which duplicated the per-window files. The dashboard's
+    per-ticker hourly aggregates and KPIs are written alongside.
     """
     df = load_sentiment(sentiment_path)
     os.makedirs(out_dir, exist_ok=True)
 
-    combined_frames = []
-    for w in windows:
-        sig = generate_signals(df, window_days=w)
-        sig["window"] = w
-        # save individual file
+    combined = compute_signals(df, windows)[["window", "timestamp", "ticker", "agg_score", "signal"]]
+    store    = _artifacts(out_dir)
+    store.write("signals", combined)
+    write_summaries(store, combined)
+    print(f"Saved signals for windows {', '.join(map(str, windows))} to {store.path('signals')}")
+
+    for w, sig in combined.groupby("window", sort=False):
         filepath = os.path.join(out_dir, f"signals_{w}d.csv")
-        sig.to_csv(filepath, index=False)
+        sig[["timestamp", "ticker", "agg_score", "signal", "window"]].to_csv(filepath, index=False)
         print(f"Saved {filepath}")
-        combined_frames.append(sig)
 
-    # concatenate all windows into one master file
-    combined = pd.concat(combined_frames, ignore_index=True)
-    combined = combined[["window", "timestamp", "ticker", "agg_score", "signal"]]
-    combined_path = os.path.join(out_dir, "signals.csv")
-    combined.to_csv(combined_path, index=False)
-    print(f"Saved combined signals file to {combined_path}")
+
+# ─── Benchmark against the per-ticker loop ─────────────────────────────────────
+
+def _loop_signals(df: pd.DataFrame, window_days: int, agg_col: str = "SentimentScore") -> pd.DataFrame:
+    """The former generate_signals: per-ticker time-based rolling mean and a row-wise label (reference)."""
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    frames = []
+    for ticker, group in df.groupby("ticker"):
+        g = group.set_index("timestamp").sort_index()
+        g["agg_score"] = g[agg_col].rolling(f"{window_days}D").mean()
+        g = g.reset_index()
+        g["ticker"] = ticker
+        frames.append(g)
+    out = pd.concat(frames, ignore_index=True)
+    out["signal"] = out["agg_score"].apply(
+        lambda s: "Long" if s > LONG_THRESHOLD else ("Short" if s < SHORT_THRESHOLD else "Neutral"))
+    return out[["timestamp", "ticker", "agg_score", "signal"]]
+
+
+def benchmark(windows=(1, 3, 5), scale: int = 100, dir: str = "data") -> pd.DataFrame:
+    """
+    compute_signals vs the per-ticker loop on today's scored sentiment and
+    on `scale` copies of it laid end to end in time: seconds for
+    all windows, speedup, and whether every agg_score and label is
+    identical. `exports_match` says whether the current signals_{w}d.csv
+    files regenerate byte for byte.
+    """
+    df   = load_sentiment()
+    ts   = pd.to_datetime(df["timestamp"], utc=True)
+    span = ts.max() - ts.min() + pd.Timedelta(days=max(windows) + 1)
+    rows = []
+    for k in sorted({1, scale}):
+        data = df if k == 1 else pd.concat(
+            [df.assign(timestamp=ts + i * span) for i in range(k)], ignore_index=True)
+        t0   = time.perf_counter()
+        fast = compute_signals(data, windows)
+        t1   = time.perf_counter()
+        ref  = [_loop_signals(data, w) for w in windows]
+        t2   = time.perf_counter()
+        same = all(
+            np.array_equal(got["agg_score"].to_numpy(), exp["agg_score"].to_numpy(), equal_nan=True)
+            and (got["signal"].to_numpy() == exp["signal"].to_numpy()).all()
+            and got["ticker"].tolist() == exp["ticker"].tolist()
+            for got, exp in ((fast[fast["window"] == w], r) for w, r in zip(windows, ref)))
+        rows.append({"rows": len(data), "vectorized_s": round(t1 - t0, 3), "loop_s": round(t2 - t1, 3),
+                     "speedup": round((t2 - t1) / (t1 - t0), 1), "identical": same})
+
+    sig = compute_signals(df, windows)
+    exports = []
+    for w in windows:
+        path = os.path.join(dir, f"signals_{w}d.csv")
+        csv  = sig[sig["window"] == w][["timestamp", "ticker", "agg_score", "signal", "window"]].to_csv(index=False)
+        exports.append(os.path.exists(path) and open(path).read() == csv)
+    out = pd.DataFrame(rows)
+    out["exports_match"] = all(exports)
+    return out
 
 
 if __name__ == "__main__":
-    save_all_signals()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compute and save rolling sentiment signals.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time compute_signals against the per-ticker loop and check the outputs, then exit")
+    parser.add_argument("--scale", type=int, default=100, help="copies of today's rows for the benchmark")
+    args = parser.parse_args()
+    if args.benchmark:
+        print(benchmark(scale=args.scale).to_string(index=False))
+    else:
+        save_all_signals()
\ No newline at end of file
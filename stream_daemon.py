@@ -0,0 +1,475 @@
+import os
+import json
+import queue
+import signal
+import argparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from record_store import record_ids, WATERMARK_GRACE
+from signals import LONG_THRESHOLD, SHORT_THRESHOLD
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+STREAM_DIR       = os.path.join("data", "stream")
+STREAM_WINDOWS   = (1, 3, 5)
+STREAM_BUCKET    = "1s"     # rolling-state resolution; second timestamps stay exact
+POLL_INTERVALS   = {"yahoo": 60.0, "reddit": 15.0, "sec": 300.0}   # seconds
+CHECKPOINT_EVERY = 30.0     # seconds between state checkpoints
+PROCESS_RETRIES  = 3        # retries of a poll whose scoring failed (e.g. an API error)
+RETRY_BACKOFF    = 5.0      # seconds; doubled per retry
+SEC_MAX_FILINGS  = 3        # latest 8-Ks looked at per ticker and poll
+STREAM_COLUMNS   = ["window", "timestamp", "ticker", "agg_score", "signal"]
+_CHECKPOINT_VERSION = 1
+
+
+def signal_label(agg: float) -> str:
+    """Long/Short/Neutral for one agg_score, as compute_signals labels it (NaN is Neutral)."""
+    if agg > LONG_THRESHOLD:
+        return "Long"
+    if agg < SHORT_THRESHOLD:
+        return "Short"
+    return "Neutral"
+
+
+# ─── Rolling state ─────────────────────────────────────────────────────────────
+
+class RollingWindow:
+    """
+    Rolling mean of one ticker's scores over (t - span, t], t the newest
+    timestamp seen, the window compute_signals averages over. Scores are
+    kept as a deque of time buckets [start, last, sum, count] with running
+    totals, so adding a score and reading the mean are O(1) (amortized:
+    each bucket is dropped once). A bucket leaves the window when its last
+    score does, so the result matches the batch window exactly whenever no
+    bucket straddles the window edge (always, for timestamps at the bucket
+    resolution).
+
+    A score older than the newest one (a late arrival) is merged into its
+    bucket if still inside the window and ignored otherwise.
+    """
+
+    __slots__ = ("span", "bucket", "buckets", "total", "count", "newest")
+
+    def __init__(self, span: int, bucket: int):
+        self.span    = span       # ns
+        self.bucket  = bucket     # ns
+        self.buckets = deque()
+        self.total   = 0.0
+        self.count   = 0
+        self.newest  = None
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else float("nan")
+
+    def add(self, ts: int, score: float) -> float:
+        """Add `score` at `ts` (ns since the epoch; a NaN score only advances the clock); returns the mean."""
+        if self.newest is None or ts >= self.newest:
+            self.newest = ts
+            self._expire(ts - self.span)
+        elif ts <= self.newest - self.span:
+            return self.mean
+        if score == score:
+            self._insert(ts, score)
+        return self.mean
+
+    def _expire(self, edge: int):
+        b = self.buckets
+        while b and b[0][1] <= edge:
+            _, _, s, n = b.popleft()
+            self.total -= s
+            self.count -= n
+        if not self.count:
+            self.total = 0.0    # no rounding residue carried into the next window
+
+    def _insert(self, ts: int, score: float):
+        key = ts - ts % self.bucket
+        b, i = self.buckets, len(self.buckets) - 1
+        while i >= 0 and b[i][0] > key:     # in-order scores stop at once
+            i -= 1
+        if i >= 0 and b[i][0] == key:
+            cell     = b[i]
+            cell[1]  = max(cell[1], ts)
+            cell[2] += score
+            cell[3] += 1
+        else:
+            b.insert(i + 1, [key, ts, score, 1])
+        self.total += score
+        self.count += 1
+
+    def to_list(self) -> list:
+        return [self.newest, self.total, self.count, list(self.buckets)]
+
+    @classmethod
+    def from_list(cls, data: list, span: int, bucket: int) -> "RollingWindow":
+        w = cls(span, bucket)
+        w.newest, w.total, w.count = data[0], data[1], data[2]
+        w.buckets = deque(data[3])
+        return w
+
+
+class RollingSentiment:
+    """
+    Per-ticker, per-window rolling sentiment updated one record at a time:
+    `update` folds a scored record into each window of its ticker and
+    returns the new agg_score and Long/Short/Neutral label per window, with
+    no pass over history. Records applied in timestamp order give the same
+    agg_score as compute_signals on the same records.
+    """
+
+    def __init__(self, windows=STREAM_WINDOWS, bucket=STREAM_BUCKET):
+        self.windows = tuple(int(w) for w in windows)
+        self.bucket  = int(pd.Timedelta(bucket).value)
+        self.spans   = [int(pd.Timedelta(days=w).value) for w in self.windows]
+        self.state   = {}   # ticker -> [RollingWindow per window]
+
+    def update(self, ticker: str, ts: int, score: float) -> list:
+        """[(window, agg_score, signal)] for `ticker` after adding `score` at `ts` (ns)."""
+        state = self.state.get(ticker)
+        if state is None:
+            state = self.state[ticker] = [RollingWindow(s, self.bucket) for s in self.spans]
+        out = []
+        for w, roll in zip(self.windows, state):
+            agg = roll.add(ts, score)
+            out.append((w, agg, signal_label(agg)))
+        return out
+
+    def snapshot(self) -> pd.DataFrame:
+        """Latest agg_score and signal per (window, ticker), stamped with the ticker's newest record."""
+        rows = [(w, roll.newest, ticker, roll.mean)
+                for ticker in sorted(self.state)
+                for w, roll in zip(self.windows, self.state[ticker])]
+        df = pd.DataFrame(rows, columns=STREAM_COLUMNS[:4])
+        df["timestamp"] = pd.to_datetime(df["timestamp"].astype("int64"), utc=True)
+        df["signal"]    = [signal_label(a) for a in df["agg_score"]]
+        return df.sort_values(["window", "ticker"], kind="stable").reset_index(drop=True)
+
+    def to_dict(self) -> dict:
+        return {"windows": list(self.windows), "bucket": self.bucket,
+                "tickers": {t: [roll.to_list() for roll in state] for t, state in self.state.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RollingSentiment":
+        rs = cls(data["windows"], pd.Timedelta(data["bucket"], unit="ns"))
+        rs.state = {t: [RollingWindow.from_list(d, s, rs.bucket) for d, s in zip(state, rs.spans)]
+                    for t, state in data["tickers"].items()}
+        return rs
+
+
+# ─── Feeds ─────────────────────────────────────────────────────────────────────
+
+class Feed:
+    """
+    A polled source: `fetch(cursor)` returns (records, cursor), records
+    being a frame of timestamp/ticker/source/text[/url] rows. The cursor is
+    the feed's own resume point (e.g. Reddit watermarks); it is checkpointed
+    only once the records fetched with it have been applied.
+    """
+
+    def __init__(self, name: str, interval: float, fetch: Callable):
+        self.name     = name
+        self.interval = interval
+        self.fetch    = fetch
+
+
+def file_feed(name: str, path: str, interval: float = 1.0) -> Feed:
+    """
+    Stand-in feed over a JSON-lines file of records: each poll returns the
+    lines appended since the last one (the cursor is the byte offset), so a
+    test or replay script drives the daemon by appending to the file.
+    """
+    def fetch(offset):
+        offset = offset or 0
+        if not os.path.exists(path):
+            return pd.DataFrame(), offset
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end  = data.rfind(b"\n") + 1        # a half-written last line waits for the next poll
+        recs = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return pd.DataFrame(recs), offset + end
+    return Feed(name, interval, fetch)
+
+
+def yahoo_feed(tickers: list, interval: float = POLL_INTERVALS["yahoo"]) -> Feed:
+    """Latest Yahoo Finance headlines for every ticker (fetched in parallel, rate-limited per host)."""
+    from data_pipeline import fetch_yahoo_news, FETCH_WORKERS
+
+    def fetch(cursor):
+        with ThreadPoolExecutor(FETCH_WORKERS) as pool:
+            frames = [f for f in pool.map(fetch_yahoo_news, tickers) if not f.empty]
+        return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), cursor
+    return Feed("yahoo", interval, fetch)
+
+
+def reddit_feed(tickers: list, subreddits: list, interval: float = POLL_INTERVALS["reddit"]) -> Feed:
+    """Posts from the subreddits' 'new' listings past the per-subreddit watermarks (the cursor)."""
+    from data_pipeline import iter_reddit_records
+
+    def fetch(cursor):
+        marks  = dict(cursor or {})
+        chunks = list(iter_reddit_records(subreddits, tickers, ("new",), watermarks=marks))
+        return (pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()), marks
+    return Feed("reddit", interval, fetch)
+
+
+def sec_feed(tickers: list, interval: float = POLL_INTERVALS["sec"]) -> Feed:
+    """
+    Latest 8-Ks with key items per ticker. Submissions are conditional GETs
+    and extracted filings are cached, so a poll with nothing new costs one
+    304 per ticker.
+    """
+    from data_pipeline import fetch_sec_transcripts, all_mappings, FETCH_WORKERS, FILING_WORKERS
+
+    ciks = {t: all_mappings.get(t) for t in tickers}
+    ciks = {t: c for t, c in ciks.items() if c}
+
+    def fetch(cursor):
+        with ThreadPoolExecutor(FETCH_WORKERS) as pool, ThreadPoolExecutor(FILING_WORKERS) as filings:
+            frames = list(pool.map(lambda t: fetch_sec_transcripts(ciks[t], t, SEC_MAX_FILINGS, filings),
+                                   ciks))
+        frames = [f for f in frames if not f.empty]
+        return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), cursor
+    return Feed("sec", interval, fetch)
+
+
+# ─── Daemon ────────────────────────────────────────────────────────────────────
+
+class StreamDaemon:
+    """
+    Long-running service mode: every feed is polled on its own schedule in
+    its own thread, and new records are scored and folded into the rolling
+    state (see RollingSentiment) as soon as a poll returns, so a record's
+    signals are out one poll interval plus one scoring call after it is
+    published.
+
+      <state_dir>/signals.csv       every emitted signal row, appended
+      <state_dir>/latest.csv        current agg_score and signal per (window, ticker)
+      <state_dir>/checkpoint.json   rolling state, seen record ids, feed cursors
+
+    Records are deduplicated by record_id across polls and restarts; ids
+    are forgotten once older than the longest window plus WATERMARK_GRACE,
+    and records that old are dropped. The checkpoint is written atomically
+    every `checkpoint_every` seconds and on shutdown, so a restart resumes
+    from it instead of rebuilding history. The batch pipeline stays the
+    source of truth for the published signal datasets.
+    """
+
+    def __init__(self, feeds: List[Feed], scorer, state_dir: str = STREAM_DIR,
+                 windows=STREAM_WINDOWS, bucket=STREAM_BUCKET,
+                 checkpoint_every: float = CHECKPOINT_EVERY):
+        self.feeds            = feeds
+        self.scorer           = scorer
+        self.state_dir        = state_dir
+        self.checkpoint_every = checkpoint_every
+        self.rolling          = RollingSentiment(windows, bucket)
+        self.seen             = {}      # record_id -> timestamp (ns)
+        self.cursors          = {}      # feed name -> cursor of the last applied poll
+        self._stop            = threading.Event()
+        os.makedirs(state_dir, exist_ok=True)
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.state_dir, name)
+
+    # --- checkpoint -----------------------------------------------------------
+    def _load(self):
+        try:
+            with open(self._path("checkpoint.json")) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        state = data["state"]
+        if (data.get("version") != _CHECKPOINT_VERSION or state["windows"] != list(self.rolling.windows)
+                or state["bucket"] != self.rolling.bucket):
+            print("Stream checkpoint was written with other settings; starting from empty state")
+            return
+        self.rolling = RollingSentiment.from_dict(state)
+        self.seen    = data["seen"]
+        self.cursors = data["cursors"]
+        print(f"Restored stream state: {len(self.rolling.state)} tickers, {len(self.seen)} seen records")
+
+    def checkpoint(self):
+        """Atomically write the rolling state, seen ids and feed cursors."""
+        self._forget_seen()
+        path = self._path("checkpoint.json")
+        tmp  = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": _CHECKPOINT_VERSION, "state": self.rolling.to_dict(),
+                       "seen": self.seen, "cursors": self.cursors}, f)
+        os.replace(tmp, path)
+
+    def _horizon(self) -> int:
+        """Records at or before this time (ns) are too old to matter."""
+        newest = max((r.newest for s in self.rolling.state.values() for r in s if r.newest is not None),
+                     default=None)
+        if newest is None:
+            return np.iinfo(np.int64).min
+        return newest - max(self.rolling.spans) - int(pd.Timedelta(WATERMARK_GRACE).value)
+
+    def _forget_seen(self):
+        horizon   = self._horizon()
+        self.seen = {k: ts for k, ts in self.seen.items() if ts > horizon}
+
+    # --- records --------------------------------------------------------------
+    def process(self, records: pd.DataFrame, feed: str = None, cursor=None) -> pd.DataFrame:
+        """
+        Score the unseen records of one poll, fold them into the rolling
+        state in timestamp order and publish the resulting signal rows
+        (returned). `cursor` becomes the feed's resume point.
+        """
+        out = pd.DataFrame(columns=STREAM_COLUMNS)
+        if not records.empty:
+            df = records.copy()
+            for c in ("ticker", "source", "text"):
+                if c not in df:
+                    df[c] = None
+            df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce").dt.as_unit("ns")
+            df = df.dropna(subset=["timestamp", "ticker"])
+            df = df[df["text"].fillna("").astype(str).str.strip().astype(bool)]
+            df["record_id"] = record_ids(df)
+            ts = df["timestamp"].array.asi8
+            df = df[~df["record_id"].isin(self.seen) & (ts > self._horizon())]
+            df = df.drop_duplicates("record_id").sort_values("timestamp", kind="stable")
+            if not df.empty:
+                out = self._apply(df)
+        if feed is not None:
+            self.cursors[feed] = cursor
+        return out
+
+    def _apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        scores = np.asarray(self.scorer.score(df["text"].astype(str).tolist()), dtype=np.float64)
+        rows   = []
+        for rid, ts, ticker, score in zip(df["record_id"], df["timestamp"].array.asi8,
+                                          df["ticker"].astype(str), scores):
+            self.seen[rid] = int(ts)
+            for w, agg, sig in self.rolling.update(ticker, int(ts), float(score)):
+                rows.append((w, ts, ticker, agg, sig))
+        out = pd.DataFrame(rows, columns=STREAM_COLUMNS)
+        out["timestamp"] = pd.to_datetime(out["timestamp"].astype("int64"), utc=True)
+
+        path = self._path("signals.csv")
+        out.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+        latest = self._path("latest.csv")
+        self.rolling.snapshot().to_csv(f"{latest}.tmp", index=False)
+        os.replace(f"{latest}.tmp", latest)
+        print(f"{len(df)} new records -> {len(out)} signal rows")
+        return out
+
+    # --- run ------------------------------------------------------------------
+    def run_once(self) -> pd.DataFrame:
+        """Poll every feed once, apply what came back and checkpoint; returns the signal rows."""
+        outs = []
+        for feed in self.feeds:
+            try:
+                records, cursor = feed.fetch(self.cursors.get(feed.name))
+            except Exception as e:
+                print(f"Stream feed {feed.name} failed: {e}")
+                continue
+            try:
+                outs.append(self.process(records, feed.name, cursor))
+            except Exception as e:
+                print(f"Stream batch from {feed.name} failed, skipped: {e!r}")
+        self.checkpoint()
+        return pd.concat(outs, ignore_index=True) if outs else pd.DataFrame(columns=STREAM_COLUMNS)
+
+    def _poll(self, feed: Feed, polls: queue.Queue):
+        cursor = self.cursors.get(feed.name)
+        while not self._stop.is_set():
+            try:
+                records, cursor = feed.fetch(cursor)
+                polls.put((feed.name, records, cursor, 0))
+            except Exception as e:
+                print(f"Stream feed {feed.name} failed: {e}")
+            self._stop.wait(feed.interval)
+
+    def run(self):
+        """Poll until stop() (or SIGINT/SIGTERM), checkpointing as it goes and on the way out."""
+        polls   = queue.Queue()
+        threads = [threading.Thread(target=self._poll, args=(feed, polls), name=f"feed-{feed.name}",
+                                    daemon=True) for feed in self.feeds]
+        for t in threads:
+            t.start()
+        last = time.monotonic()
+        try:
+            while not self._stop.is_set() or not polls.empty():
+                try:
+                    name, records, cursor, attempt = polls.get(timeout=0.5)
+                except queue.Empty:
+                    name = None
+                if name is not None:
+                    try:
+                        self.process(records, name, cursor)
+                    except Exception as e:
+                        # nothing was applied; requeue the poll after a backoff instead of dying
+                        if attempt < PROCESS_RETRIES:
+                            delay = RETRY_BACKOFF * 2 ** attempt
+                            print(f"Stream batch from {name} failed ({e!r}); retrying in {delay:g}s")
+                            timer = threading.Timer(delay, polls.put, args=((name, records, cursor, attempt + 1),))
+                            timer.daemon = True
+                            timer.start()
+                        else:
+                            print(f"Stream batch from {name} failed {attempt + 1} times, skipped: {e!r}")
+                if time.monotonic() - last >= self.checkpoint_every:
+                    self.checkpoint()
+                    last = time.monotonic()
+        finally:
+            self._stop.set()
+            self.checkpoint()
+
+    def stop(self):
+        self._stop.set()
+
+
+def latest_signals(state_dir: str = STREAM_DIR) -> pd.DataFrame:
+    """Current agg_score and signal per (window, ticker) as published by a running daemon."""
+    return pd.read_csv(os.path.join(state_dir, "latest.csv"), parse_dates=["timestamp"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll sources continuously and keep rolling signals live.")
+    parser.add_argument("--sources", nargs="*", default=list(POLL_INTERVALS), choices=list(POLL_INTERVALS),
+                        help="live sources to poll")
+    parser.add_argument("--replay", nargs="+", default=[], metavar="NAME=PATH",
+                        help="poll a JSON-lines file of records instead of (or besides) a live source")
+    parser.add_argument("--interval", nargs="+", default=[], metavar="NAME=SECONDS",
+                        help="poll interval per feed (defaults: yahoo 60, reddit 15, sec 300, replays 1)")
+    parser.add_argument("--subreddits", nargs="+", default=None)
+    parser.add_argument("--windows", nargs="+", type=int, default=list(STREAM_WINDOWS))
+    parser.add_argument("--bucket", default=STREAM_BUCKET, help="rolling-state resolution, e.g. 1s or 1min")
+    parser.add_argument("--backend", choices=("llm", "local", "cascade"), default="llm")
+    parser.add_argument("--state-dir", default=STREAM_DIR)
+    parser.add_argument("--once", action="store_true", help="poll every feed once and exit")
+    args = parser.parse_args()
+
+    from sentiment import make_scorer
+
+    given     = {k: float(v) for k, v in (s.split("=", 1) for s in args.interval)}
+    intervals = {**POLL_INTERVALS, **given}
+    replays   = dict(s.split("=", 1) for s in args.replay)
+    feeds     = [file_feed(name, path, given.get(name, 1.0)) for name, path in replays.items()]
+    live      = [s for s in args.sources if s not in replays]
+    if live:
+        from data_pipeline import get_nasdaq100_tickers, REDDIT_SUBREDDITS
+        tickers = get_nasdaq100_tickers()
+        build   = {"yahoo":  lambda: yahoo_feed(tickers, intervals["yahoo"]),
+                   "reddit": lambda: reddit_feed(tickers, args.subreddits or REDDIT_SUBREDDITS,
+                                                 intervals["reddit"]),
+                   "sec":    lambda: sec_feed(tickers, intervals["sec"])}
+        feeds  += [build[s]() for s in live]
+
+    daemon = StreamDaemon(feeds, make_scorer(args.backend), args.state_dir, args.windows, args.bucket)
+    if args.once:
+        daemon.run_once()
+    else:
+        signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            daemon.stop()
@@ -0,0 +1,466 @@
+import math
+import time
+import argparse
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# ─── Config ────────────────────────────────────────────────────────────────────
+RISK_FREE_RATE = 0.01    # annual, as in backtrader's SharpeRatio
+DAYS_FACTOR    = 252     # trading days per year for the daily Sharpe
+SIGNAL_CODES   = {"Long": 1, "Short": -1}
+
+
+# ─── Price panel ───────────────────────────────────────────────────────────────
+
+class PricePanel:
+    """
+    Date x ticker OHLC arrays on the union calendar of all tickers.
+
+    A ticker with no bar on a day holds NaN there; `last[t, n]` is the row
+    of ticker n's most recent bar at day t (-1 before its first bar), which
+    is what backtrader shows a strategy for a data feed that has not ticked.
+    `days` are UTC calendar days (datetime64[D]) as backtrader reports them.
+    """
+
+    def __init__(self, tickers: List[str], days: np.ndarray, open_: np.ndarray,
+                 high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        self.tickers = list(tickers)
+        self.days    = np.asarray(days, dtype="datetime64[D]")
+        self.open    = np.asarray(open_, dtype=np.float64)
+        self.high    = np.asarray(high, dtype=np.float64)
+        self.low     = np.asarray(low, dtype=np.float64)
+        self.close   = np.asarray(close, dtype=np.float64)
+
+        rows      = np.arange(len(self.days))[:, None]
+        self.last = np.maximum.accumulate(np.where(np.isnan(self.close), -1, rows), axis=0)
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    @classmethod
+    def from_price_cache(cls, price_cache: Dict[str, pd.DataFrame]) -> "PricePanel":
+        """Align a {ticker: OHLCV frame} cache; empty or missing frames are skipped."""
+        frames = {}
+        for ticker, hist in price_cache.items():
+            if hist is None or hist.empty:
+                continue
+            idx = pd.DatetimeIndex(hist.index)
+            if idx.tz is not None:
+                idx = idx.tz_convert("UTC").tz_localize(None)
+            frame = hist[["open", "high", "low", "close"]].set_axis(idx.normalize())
+            frames[ticker] = frame[~frame.index.duplicated(keep="last")]
+
+        if not frames:
+            empty = np.empty((0, 0))
+            return cls([], np.empty(0, dtype="datetime64[D]"), empty, empty, empty, empty)
+
+        days = frames[next(iter(frames))].index
+        for frame in frames.values():
+            days = days.union(frame.index)
+        cols = {c: np.column_stack([f[c].reindex(days).to_numpy(np.float64) for f in frames.values()])
+                for c in ("open", "high", "low", "close")}
+        return cls(list(frames), days.values.astype("datetime64[D]"),
+                   cols["open"], cols["high"], cols["low"], cols["close"])
+
+    def to_price_cache(self) -> Dict[str, pd.DataFrame]:
+        """{ticker: OHLCV frame} of each ticker's own bars (volume is not kept)."""
+        index = pd.DatetimeIndex(self.days.astype("datetime64[ns]"))
+        cache = {}
+        for n, ticker in enumerate(self.tickers):
+            bars = ~np.isnan(self.close[:, n])
+            cache[ticker] = pd.DataFrame({"open": self.open[bars, n], "high": self.high[bars, n],
+                                          "low": self.low[bars, n], "close": self.close[bars, n],
+                                          "volume": 0.0}, index=index[bars])
+        return cache
+
+
+def signal_grid(signals_df: pd.DataFrame, panel: PricePanel):
+    """
+    (signal code, conviction) arrays on the panel's day x ticker grid, keeping
+    the first row per (UTC date, ticker) as SignalStrategy does. Codes are
+    1 Long, -1 Short and 0 otherwise; conviction is 1.0 without a `conv` column.
+    """
+    T, N = panel.shape
+    code = np.zeros((T, N), dtype=np.int8)
+    conv = np.zeros((T, N), dtype=np.float64)
+    if not len(signals_df) or not N:
+        return code, conv
+
+    sig = signals_df[["timestamp", "ticker", "signal"] + (["conv"] if "conv" in signals_df else [])].copy()
+    sig["timestamp"] = pd.to_datetime(sig["timestamp"], utc=True).dt.tz_localize(None).dt.normalize()
+    if "conv" not in sig:
+        sig["conv"] = 1.0
+    sig = sig.drop_duplicates(["timestamp", "ticker"])
+
+    days = sig["timestamp"].values.astype("datetime64[D]")
+    rows = np.searchsorted(panel.days, days).clip(0, max(T - 1, 0))
+    cols = pd.Index(panel.tickers).get_indexer(sig["ticker"])
+    ok   = (cols >= 0) & (panel.days[rows] == days) if T else np.zeros(len(sig), bool)
+    rows, cols = rows[ok], cols[ok]
+
+    code[rows, cols] = sig["signal"].map(SIGNAL_CODES).fillna(0).to_numpy(np.int8)[ok]
+    conv[rows, cols] = sig["conv"].to_numpy(np.float64)[ok]
+    return code, conv
+
+
+# ─── Result (duck-types cerebro/strategy for summarize_performance) ────────────
+
+class _Analyzer:
+    def __init__(self, analysis: dict):
+        self._analysis = analysis
+
+    def get_analysis(self) -> dict:
+        return self._analysis
+
+
+def sharpe_ratio(values: np.ndarray, start_cash: float):
+    """Daily Sharpe exactly as backtrader's SharpeRatio(timeframe=Days) computes it."""
+    rets, prev = [], start_cash
+    for v in values.tolist():
+        rets.append(v / prev - 1.0)
+        prev = v
+    if not rets:
+        return None
+    rate = pow(1.0 + RISK_FREE_RATE, 1.0 / DAYS_FACTOR) - 1.0
+    free = [r - rate for r in rets]
+    avg  = math.fsum(free) / len(free)
+    std  = math.sqrt(math.fsum([pow(r - avg, 2.0) for r in free]) / len(free))
+    try:
+        return avg / std
+    except ZeroDivisionError:
+        return None
+
+
+class NativeResult:
+    """
+    Outcome of `run_native_backtest`. It answers `broker.getvalue()` and
+    `analyzers.{sharpe,drawdown,trades}.get_analysis()` like a finished
+    cerebro/strategy pair, so `summarize_performance(res, res, ...)` works.
+    """
+
+    def __init__(self, values: np.ndarray, closed: int, won: int, open_trades: int,
+                 start_cash: float):
+        self.values     = values
+        self.start_cash = start_cash
+        self.broker     = self
+
+        if len(values):
+            peak = np.maximum.accumulate(values)
+            dd   = 100.0 * (peak - values) / peak
+            imax = int(np.argmax(dd))
+            drawdown = {"drawdown": float(dd[-1]), "moneydown": float(peak[-1] - values[-1]),
+                        "max": {"drawdown": max(0.0, float(dd[imax])),
+                                "moneydown": max(0.0, float(peak[imax] - values[imax]))}}
+        else:
+            drawdown = {"drawdown": 0.0, "moneydown": 0.0, "max": {"drawdown": 0.0, "moneydown": 0.0}}
+
+        trades = {"total": {"total": closed + open_trades, "open": open_trades, "closed": closed}}
+        if closed:
+            trades["won"]  = {"total": won}
+            trades["lost"] = {"total": closed - won}
+
+        self.analyzers = SimpleNamespace(
+            sharpe=_Analyzer({"sharperatio": sharpe_ratio(values, start_cash)}),
+            drawdown=_Analyzer(drawdown),
+            trades=_Analyzer(trades),
+        )
+
+    def getvalue(self) -> float:
+        return float(self.values[-1]) if len(self.values) else float(self.start_cash)
+
+
+# ─── Engine ────────────────────────────────────────────────────────────────────
+
+def _split(pos: int, size: int):
+    """(opened, closed) parts of an order of `size` against position `pos`."""
+    new = pos + size
+    if not new:
+        return 0, size
+    if not pos or (pos > 0) == (size > 0):
+        return size, 0
+    if (new > 0) == (pos > 0):
+        return 0, size
+    return new, -pos
+
+
+def run_native_backtest(
+    signals_df: pd.DataFrame,
+    panel: PricePanel,
+    stop_loss: float = 0.02,
+    take_profit: float = 0.04,
+    start_cash: float = 100_000,
+    commission: float = 0.001,
+    time_exit_days: int = 5,
+) -> NativeResult:
+    """
+    SignalStrategy on NumPy arrays. Exits, entries and sizing are evaluated
+    for all tickers of a day at once; only the day's orders are walked one by
+    one, because backtrader's broker accepts and fills them against a running
+    cash balance in ticker order.
+
+    Broker semantics follow backtrader's BackBroker: an order submitted on
+    day t is margin-checked at the start of day t+1 against the cash left by
+    the orders before it (priced at the day-t close, commission included,
+    rejected orders still counted) and filled at the open of the ticker's
+    next bar. Opening an exposure that would take cash below zero at the
+    open is dropped, while closing always fills. Portfolio value is cash
+    plus the positions marked to each ticker's latest close.
+    """
+    T, N   = panel.shape
+    sl, tp = stop_loss, take_profit
+    code, conv = signal_grid(signals_df, panel)
+
+    have   = panel.last >= 0
+    view   = np.maximum(panel.last, 0)
+    cols   = np.arange(N)
+    open_  = panel.open[view, cols]
+    high   = panel.high[view, cols]
+    close  = np.where(have, panel.close[view, cols], np.nan)
+    day    = panel.days[view].astype(np.int64)
+    code   = code[view, cols]
+    conv   = conv[view, cols]
+    live   = np.logical_or.accumulate(have.all(axis=1)) if T else np.zeros(0, bool)
+
+    cash    = float(start_cash)
+    size    = np.zeros(N, dtype=np.int64)
+    pprice  = np.zeros(N)                      # position price
+    ep      = np.full(N, np.nan)               # SignalStrategy.entry_price
+    ed      = np.zeros(N, dtype=np.int64)      # SignalStrategy.entry_date (day number)
+    trail   = np.full(N, np.nan)               # SignalStrategy.trail_stop
+    trades  = np.zeros((N, 4))                 # open trade: size, price, pnl, commission
+    values  = np.empty(T)
+    submitted, waiting = [], []
+    closed = won = 0
+
+    for t in range(T):
+        # ── broker: margin-check yesterday's orders against running cash ──
+        if submitted:
+            check = cash
+            for order in submitted:
+                n, sz, created, _ = order
+                check -= sz * created
+                check -= abs(sz) * commission * created
+                if check >= 0.0:
+                    waiting.append(order)
+            submitted = []
+
+        # ── fill accepted orders at the open of their ticker's next bar ──
+        still = []
+        for order in waiting:
+            n, sz, _, created_row = order
+            if panel.last[t, n] <= created_row:
+                still.append(order)
+                continue
+            price = float(open_[t, n])
+            pos   = int(size[n])
+            opened, shut = _split(pos, sz)
+            if shut:
+                p0    = float(pprice[n])
+                cash += (-shut) * p0 + (-shut) * (price - p0)
+                comm  = abs(shut) * commission * price
+                cash -= comm
+                pos  += shut
+                pprice[n] = pprice[n] if pos else 0.0
+                tr    = trades[n]
+                tr[2] += (-shut) * (price - tr[1])
+                tr[3] += comm
+                tr[0] += shut
+                if not tr[0]:
+                    closed += 1
+                    won    += tr[2] - tr[3] >= 0.0
+                    tr[:]   = 0.0
+            if opened:
+                comm  = abs(opened) * commission * price
+                after = cash - opened * price
+                after -= comm
+                if after >= 0.0:
+                    cash = after
+                    tr   = trades[n]
+                    pprice[n] = price if not pos else (pprice[n] * pos + opened * price) / (pos + opened)
+                    tr[1] = (tr[0] * tr[1] + opened * price) / (tr[0] + opened)
+                    tr[3] += comm
+                    tr[0] += opened
+                    pos  += opened
+            size[n] = pos
+        waiting = still
+
+        held = np.flatnonzero(size)
+        if len(held):
+            dvalue = size[held] * close[t, held]
+            unreal = size[held] * (close[t, held] - pprice[held])
+            terms  = np.column_stack([np.where(dvalue > 0, dvalue - unreal, dvalue),
+                                      np.where(dvalue > 0, unreal, 0.0)]).ravel()
+            values[t] = cash + np.cumsum(terms)[-1]
+        else:
+            values[t] = cash + 0.0
+
+        if not live[t]:
+            continue
+
+        # ── strategy: exits, entries and signal exits for every ticker ──
+        price = close[t]
+        valid = np.isfinite(price) & (price > 0)
+        pos   = size.copy()
+        sig   = code[t]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            managed = valid & (pos != 0) & ~np.isnan(ep)
+            is_long = managed & (pos > 0)
+            prev    = np.where(np.isnan(trail), ep * (1 - sl), trail)
+            new     = high[t] * (1 - sl)
+            trail   = np.where(is_long, np.where(new > prev, new, prev), trail)
+            exit_l  = is_long & ((price < trail) | (price / ep - 1 >= tp))
+            ret_s   = ep / price - 1
+            exit_s  = managed & (pos < 0) & ((ret_s <= -sl) | (ret_s >= tp))
+            exit_t  = managed & ~exit_l & ~exit_s & (day[t] - ed >= time_exit_days)
+        exits   = exit_l | exit_s | exit_t
+        rest    = valid & ~exits
+        enter   = rest & (pos == 0) & (sig != 0)
+        reverse = rest & (((pos > 0) & (sig != 1)) | ((pos < 0) & (sig != -1)))
+
+        frac   = np.where(1.0 < conv[t], 1.0, conv[t])
+        with np.errstate(invalid="ignore"):
+            qty = np.fmax(1.0, np.trunc(cash * frac / price))
+        orders = np.zeros(N, dtype=np.int64)
+        orders[enter]          = sig[enter] * qty[enter].astype(np.int64)
+        orders[exits | reverse] = -pos[exits | reverse]
+
+        flat        = exits | reverse
+        ep[flat]    = np.nan
+        trail[flat] = np.nan
+        ep[enter]   = price[enter]
+        ed[enter]   = day[t, enter]
+        long_entry  = enter & (sig > 0)
+        trail[long_entry] = price[long_entry] * (1 - sl)
+
+        submitted = [(int(n), int(orders[n]), float(price[n]), int(panel.last[t, n]))
+                     for n in np.flatnonzero(orders)]
+
+    return NativeResult(values, closed, int(won), int(np.count_nonzero(trades[:, 0])), start_cash)
+
+
+# ─── Parity check and benchmark against backtrader ─────────────────────────────
+
+def synthetic_prices(tickers, start, end, seed: int = 0, gaps: float = 0.0) -> Dict[str, pd.DataFrame]:
+    """
+    Random-walk OHLCV frames on NYSE-style business days (tz-aware, like
+    yfinance). `gaps` drops that share of bars at random per ticker.
+    """
+    rng  = np.random.default_rng(seed)
+    days = pd.bdate_range(start, end, tz="America/New_York")
+    out  = {}
+    for ticker in tickers:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+        open_ = close * np.exp(rng.normal(0, 0.01, len(days)))
+        high  = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, len(days))))
+        low   = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, len(days))))
+        df    = pd.DataFrame({"open": open_, "high": high, "low": low, "close": close,
+                              "volume": rng.integers(1e5, 1e7, len(days)).astype(float)}, index=days)
+        if gaps:
+            df = df[rng.random(len(days)) >= gaps]
+        out[ticker] = df
+    return out
+
+
+def random_signals(tickers, days, seed: int = 0, p=(0.15, 0.1, 0.75), conv: bool = True) -> pd.DataFrame:
+    """One random Long/Short/Neutral signal per ticker and day, with fractional conviction."""
+    rng = np.random.default_rng(seed)
+    n   = len(days) * len(tickers)
+    sig = pd.DataFrame({"timestamp": np.repeat(days, len(tickers)) + pd.Timedelta(hours=15),
+                        "ticker":    np.tile(tickers, len(days)),
+                        "signal":    rng.choice(["Long", "Short", "Neutral"], n, p=list(p))})
+    if conv:
+        sig["conv"] = rng.uniform(0, 0.3, n)
+    return sig
+
+
+def _max_diff(a: dict, b: dict) -> float:
+    diff = 0.0
+    for k in a:
+        if (a[k] is None) != (b[k] is None):
+            return np.inf
+        if a[k] is not None:
+            diff = max(diff, abs(a[k] - b[k]))
+    return diff
+
+
+def parity_check(windows=(1, 3, 5), stops=(0.02, 0.025), takes=(0.04, 0.05),
+                 quantiles=((0.025, 0.075), (0.05, 0.05)), random_cases=((0, 0.0), (1, 0.05)),
+                 tol: float = 1e-9) -> pd.DataFrame:
+    """
+    Run both engines through run_backtest and compare summarize_performance.
+
+    Cases are the bundled signals files (raw, and with conviction sizing from
+    ConvictionTable) on synthetic prices, plus random daily signals for 40
+    tickers over 120 days, `random_cases` giving (seed, share of bars
+    dropped). Returns one row per case with the largest metric difference.
+    """
+    from backtest import run_backtest
+    from metrics import summarize_performance
+    from signals import load_conviction_table, load_signals
+
+    cases = []
+    for window in windows:
+        raw   = load_signals(window)
+        table = load_conviction_table(window, tuple(sorted({q for pair in quantiles for q in pair})))
+        ts    = pd.to_datetime(raw["timestamp"], utc=True)
+        prices = synthetic_prices(sorted(raw["ticker"].unique()), ts.min().date(),
+                                  ts.max().date() + pd.Timedelta(days=30), seed=window)
+        cases.append((f"{window}d raw", raw, prices))
+        cases += [(f"{window}d conv {ql:g}/{qh:g}", table.signals(ql, qh), prices) for ql, qh in quantiles]
+    for seed, gaps in random_cases:
+        tickers = [f"T{i:02d}" for i in range(40)]
+        days    = pd.bdate_range("2024-01-02", periods=120, tz="UTC")
+        prices  = synthetic_prices(tickers, days[0].date(), days[-1].date(), seed, gaps)
+        cases.append((f"random seed={seed} gaps={gaps:g}", random_signals(tickers, days, seed), prices))
+
+    rows = []
+    for label, sig, prices in cases:
+        for sl in stops:
+            for tp in takes:
+                a = summarize_performance(*run_backtest(sig, sl, tp, prices, engine="backtrader"))
+                b = summarize_performance(*run_backtest(sig, sl, tp, prices, engine="native"))
+                diff = _max_diff(a, b)
+                rows.append({"signals": label, "stop_loss": sl, "take_profit": tp,
+                             "trades": a["trades"], "sharpe": a["sharpe"],
+                             "max_diff": diff, "match": diff <= tol})
+    return pd.DataFrame(rows)
+
+
+def benchmark(n_tickers: int = 200, n_days: int = 250, seed: int = 0) -> dict:
+    """Seconds per backtest for both engines on random signals."""
+    from backtest import run_backtest
+
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    days    = pd.bdate_range("2024-01-02", periods=n_days, tz="UTC")
+    prices  = synthetic_prices(tickers, days[0].date(), days[-1].date(), seed)
+    sig     = random_signals(tickers, days, seed, p=(0.1, 0.05, 0.85))
+    timings = {}
+    for engine in ("backtrader", "native"):
+        t0 = time.perf_counter()
+        run_backtest(sig, 0.02, 0.04, prices, engine=engine)
+        timings[engine] = time.perf_counter() - t0
+    timings["speedup"] = timings["backtrader"] / timings["native"]
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Native backtest engine: parity and speed vs backtrader.")
+    parser.add_argument("--parity", action="store_true",
+                        help="compare metrics with backtrader on the bundled signals and synthetic prices")
+    parser.add_argument("--benchmark", action="store_true", help="time both engines on random signals")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=250)
+    args = parser.parse_args()
+
+    if args.parity or not args.benchmark:
+        res = parity_check()
+        print(res.to_string(index=False))
+        print(f"\n{int(res['match'].sum())}/{len(res)} cases match "
+              f"(largest difference {res['max_diff'].max():.3g})")
+    if args.benchmark:
+        print(benchmark(args.tickers, args.days))